@@ -0,0 +1,83 @@
+"""Micro-benchmark for BotUtilities.get_submission, which on_message runs on every message.
+
+Compares the precompiled classifier against the original (splitlines per check, patterns
+looked up by string on every call) over a corpus of typical guild chat and shared puzzle
+results, and checks that both classify every message the same way. Chat dominates real
+traffic, so its per-message cost is the number that matters.
+
+Run from the repository root:
+    python -m benchmarks.classify_messages
+"""
+import re, timeit
+from utils.bot_utilities import BotUtilities, NYTGame
+
+CHAT = [
+    "lol",
+    "good morning everyone",
+    "that one was rough today",
+    "did anyone else get stuck on the purple group??",
+    "https://www.nytimes.com/games/wordle/index.html",
+    "I can't believe I missed it by one letter 😭😭😭",
+    "Wordle is getting harder lately",
+    "Connections today was brutal\nthe yellow group made no sense",
+    "Strands hint: think about the kitchen",
+    "?ranks week",
+    "?stats @someone",
+    "ok so\n\nhear me out\n\nwhat if we did a tournament",
+    "```\nsome pasted code\nfor i in range(10):\n    print(i)\n```",
+    "> quoting someone\nreply to the quote\nand another line",
+    "🟩🟩🟩🟩🟩",
+    "brb making coffee ☕",
+    "   indented message with\nmultiple\nlines",
+    "Wordle 1,000 was a milestone\nnice\nnice",
+    "meeting notes:\n- item one\n- item two\n- item three\n" * 5,
+    "a" * 2000,
+]
+
+SUBMISSIONS = [
+    "Wordle 1,024 4/6\n\n⬜🟨⬜⬜⬜\n⬜⬜🟩🟨⬜\n🟩🟩🟩⬜⬜\n🟩🟩🟩🟩🟩",
+    "Wordle 987 🎉 2/6\n\n🟨🟩⬜⬜🟩\n🟩🟩🟩🟩🟩",
+    "Wordle 1,100 X/6\n\n⬜⬜⬜⬜⬜\n⬜⬜⬜⬜⬜\n⬜⬜⬜⬜⬜\n⬜⬜⬜⬜⬜\n⬜⬜⬜⬜⬜\n⬜⬜⬜⬜⬜",
+    "Connections\nPuzzle #512\n🟨🟨🟨🟨\n🟩🟩🟩🟩\n🟦🟦🟪🟦\n🟦🟦🟦🟦\n🟪🟪🟪🟪",
+    "Connections \nPuzzle #498\n🟪🟪🟪🟪\n🟦🟦🟦🟦\n🟩🟩🟩🟩\n🟨🟨🟨🟨",
+    "Strands #210\n“Kitchen tools”\n🔵🔵🟡🔵\n🔵💡🔵",
+    "Strands #211\n“Go team!”\n💡🔵🔵🔵\n🟡🔵🔵",
+]
+
+def legacy_get_submission(content: str) -> tuple[NYTGame, str, str]:
+    if content.count("\n") < 2:
+        return None
+    lines = content.splitlines()
+    first_line = lines[0].strip()
+    first_two_lines = '\n'.join(lines[:2])
+    if 'Wordle' in first_line and re.match(r'^Wordle (\d+|\d{1,3}(,\d{3})*)( 🎉)? (\d|X)\/\d$', first_line):
+        return NYTGame.WORDLE, first_line, '\n'.join(lines[1:])
+    elif 'Connections' in first_line and re.match(r'^Connections *(\n)Puzzle #\d+', first_two_lines):
+        return NYTGame.CONNECTIONS, first_two_lines, '\n'.join(lines[2:])
+    elif 'Strands' in first_line and re.match(r'Strands #\d+', first_two_lines):
+        return NYTGame.STRANDS, first_two_lines, '\n'.join(lines[2:])
+    return None
+
+def per_message_ns(classify, messages: list[str]) -> float:
+    def run() -> None:
+        for message in messages:
+            classify(message)
+    number = 2000
+    return min(timeit.repeat(run, number=number, repeat=5)) / (number * len(messages)) * 1e9
+
+def main() -> None:
+    utils = BotUtilities(None)
+    for message in CHAT + SUBMISSIONS:
+        submission = utils.get_submission(message)
+        parsed = None if submission is None else (submission.game, submission.title, submission.grid)
+        assert parsed == legacy_get_submission(message), message
+    assert all(utils.get_submission(message) is not None for message in SUBMISSIONS)
+
+    print(f"{'messages':>12} {'legacy (ns)':>12} {'classifier (ns)':>16} {'speedup':>8}")
+    for name, messages in [('chat', CHAT), ('submissions', SUBMISSIONS)]:
+        legacy = per_message_ns(legacy_get_submission, messages)
+        current = per_message_ns(utils.get_submission, messages)
+        print(f"{name:>12} {legacy:>12.0f} {current:>16.0f} {legacy / current:>7.1f}x")
+
+if __name__ == '__main__':
+    main()
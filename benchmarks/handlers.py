@@ -0,0 +1,356 @@
+"""Benchmark for the ?ranks, ?missing, ?entries, ?view and ?stats command handlers.
+
+Generates a synthetic guild for every requested size: players with their own skill and
+participation rate, who join at different points and paste results with realistic score
+distributions. The guild is loaded into a fresh SQLite database per game. Each
+*CommandHandler method is then driven through a fake commands.Context, with the same
+arguments a member would type. For each command the benchmark reports:
+
+    first    latency of the first call, before the query cache has seen the command
+    p50/95/99 latency over the repeated calls that follow
+    queries  database round trips of the first call and per repeated call
+    peak     largest Python allocation high-water mark of one call (tracemalloc, bot
+             process only; render workers are separate processes)
+
+along with each size's load time and the process's peak RSS. Every call is checked against
+its command's declared query budget (extras={'query_budget': n}), and going over it fails
+the run, so an N+1 regression shows up here before it reaches a guild. The bot's other settings
+(*_MEMORY_STORE, *_PLAYER_TOTALS, *_QUERY_CACHE_*, TABLE_RENDERER, ...) are honoured, so
+configurations can be compared; the table renderer defaults to pillow, which needs no browser.
+
+Run from the repository root:
+    python -m benchmarks.handlers [--sizes 10x100,1000x1000] [--games wordle,strands] [--runs 20] [--output results.json]
+Sizes are <players>x<puzzles per game>; the default covers 10 to 10,000 players and 100 to
+2,000 puzzles. Results are written as JSON (with the commit they were measured on) so runs
+can be compared across commits.
+"""
+import argparse, asyncio, json, os, platform, random, resource, statistics, subprocess, sys, tempfile, time, tracemalloc
+from datetime import datetime, timezone
+from discord.ext import commands
+from cogs.members import MembersCog
+from games.connections import ConnectionsCommandHandler
+from games.strands import StrandsCommandHandler
+from games.wordle import WordleCommandHandler
+from utils.bot_utilities import BotUtilities
+
+SIZES = [(10, 100), (100, 500), (1000, 1000), (10000, 2000)]
+HANDLERS = {'wordle': WordleCommandHandler, 'connections': ConnectionsCommandHandler, 'strands': StrandsCommandHandler}
+RUNS = 20
+SEED = 1
+LOAD_BATCH_SIZE = 10000
+GUILD_ID = 10**18
+STATS_PLAYERS = 3
+
+####################
+#   FAKE DISCORD   #
+####################
+
+class FakeMember():
+    def __init__(self, user_id: int, display_name: str) -> None:
+        self.id: int = user_id
+        self.display_name: str = display_name
+
+class FakeGuild():
+    def __init__(self, guild_id: int, members: list[FakeMember]) -> None:
+        self.id: int = guild_id
+        self.members: list[FakeMember] = members
+
+    async def query_members(self, user_ids: list[int], limit: int, cache: bool) -> list[FakeMember]:
+        return []
+
+class FakeBot():
+    def __init__(self, guild: FakeGuild) -> None:
+        self.guild: FakeGuild = guild
+
+    def get_guild(self, guild_id: int) -> FakeGuild:
+        return self.guild
+
+class FakeMessage():
+    def __init__(self, author: FakeMember) -> None:
+        self.author: FakeMember = author
+        self.reactions: list[str] = []
+
+    async def add_reaction(self, emoji: str) -> None:
+        self.reactions.append(emoji)
+
+class FakeContext():
+    # the parts of commands.Context the handlers use; replies are counted, not sent
+    def __init__(self, author: FakeMember, guild: FakeGuild, command: commands.Command) -> None:
+        self.author: FakeMember = author
+        self.guild: FakeGuild = guild
+        # the cog command being run, for its name and query budget
+        self.command: commands.Command = command
+        self.message: FakeMessage = FakeMessage(author)
+        self.replies: int = 0
+
+    async def reply(self, *args, **kwargs) -> None:
+        self.replies += 1
+
+    async def send(self, *args, **kwargs) -> None:
+        self.replies += 1
+
+####################
+#  SYNTHETIC DATA  #
+####################
+
+class Player():
+    def __init__(self, rng: random.Random, user_id: int, puzzles: int) -> None:
+        self.user_id: int = user_id
+        # -1 (struggles) to 1 (expert)
+        self.skill: float = max(-1.0, min(1.0, rng.gauss(0.0, 0.45)))
+        # most players are casual, a few never miss a day
+        self.participation: float = rng.betavariate(1.2, 1.8)
+        # a quarter of the guild was there from the start, the rest joined later
+        self.joined: int = 0 if rng.random() < 0.25 else rng.randrange(puzzles)
+
+def wordle_result(rng: random.Random, player: Player) -> tuple[str, str]:
+    # 1-6 guesses, 7 for a miss
+    score = min(7, max(1, round(rng.gauss(4.1 - 0.8 * player.skill, 1.0))))
+    rows = []
+    for i in range(min(score, 6)):
+        if i == score - 1:
+            rows.append('🟩' * 5)
+        else:
+            greens = min(4, rng.randint(0, i + 1))
+            yellows = rng.randint(0, 5 - greens)
+            rows.append(''.join(rng.sample('🟩' * greens + '🟨' * yellows + '⬜' * (5 - greens - yellows), 5)))
+    return f"Wordle {{}} {score if score < 7 else 'X'}/6", '\n' + '\n'.join(rows)
+
+def connections_result(rng: random.Random, player: Player) -> tuple[str, str]:
+    # four mistakes end the puzzle, otherwise every group is found
+    colors = ['🟨', '🟩', '🟦', '🟪']
+    rng.shuffle(colors)
+    mistakes = min(4, max(0, round(rng.gauss(1.2 - 1.2 * player.skill, 1.2))))
+    if mistakes < 4:
+        # a solved puzzle ends on its last group
+        guesses = rng.sample(['group'] * 3 + ['mistake'] * mistakes, 3 + mistakes) + ['group']
+    else:
+        found = rng.randint(0, 3)
+        guesses = rng.sample(['group'] * found + ['mistake'] * 3, found + 3) + ['mistake']
+    rows, next_group = [], 0
+    for guess in guesses:
+        if guess == 'group':
+            rows.append(colors[next_group] * 4)
+            next_group += 1
+        else:
+            # one away from the next group
+            color = colors[min(next_group, 3)]
+            other = rng.choice([c for c in colors if c != color])
+            rows.append(''.join(rng.sample(color * 3 + other, 4)))
+    return "Connections\nPuzzle #{}", '\n'.join(rows)
+
+def strands_result(rng: random.Random, player: Player) -> tuple[str, str]:
+    hints = max(0, round(rng.gauss(0.6 - 0.6 * player.skill, 0.9)))
+    words = ['🔵'] * rng.randint(6, 7)
+    words.insert(rng.randint(0, len(words)), '🟡')
+    for _ in range(hints):
+        words.insert(rng.randint(0, len(words)), '💡')
+    return "Strands #{}\n“Synthetic theme”", '\n'.join([''.join(words[i:i + 4]) for i in range(0, len(words), 4)])
+
+RESULTS = {'wordle': wordle_result, 'connections': connections_result, 'strands': strands_result}
+
+def generate_guild(rng: random.Random, players: int, puzzles: int) -> list[Player]:
+    return [Player(rng, 10**17 + i, puzzles) for i in range(players)]
+
+def generate_entries(rng: random.Random, game: str, db, guild: list[Player], puzzle_ids: list[int]) -> list[tuple]:
+    # (guild_id, puzzle_id, user_id, *values) rows, parsed by the game's own parse_entry
+    entries = []
+    for player in guild:
+        for puzzle_id in puzzle_ids[player.joined:]:
+            if rng.random() < player.participation:
+                title, grid = RESULTS[game](rng, player)
+                parsed = db.parse_entry(title.format(f"{puzzle_id:,}"), grid)
+                if parsed is not None:
+                    entries.append((GUILD_ID, parsed[0], str(player.user_id), *parsed[1]))
+    return entries
+
+####################
+#   MEASUREMENT    #
+####################
+
+class QueryCounter():
+    # counts the round trips a handler makes through its DatabasePool
+    def __init__(self, pool) -> None:
+        self.count: int = 0
+        fetchall, transaction = pool.fetchall, pool.transaction
+
+        async def counted_fetchall(*args, **kwargs):
+            self.count += 1
+            return await fetchall(*args, **kwargs)
+
+        async def counted_transaction(*args, **kwargs):
+            self.count += 1
+            return await transaction(*args, **kwargs)
+
+        pool.fetchall, pool.transaction = counted_fetchall, counted_transaction
+
+def get_commands(handler, today: int, puzzle_ids: list[int], players: list[str]) -> list[tuple[str, commands.Command, object, tuple]]:
+    # (name, cog command, handler method, args), typed the way a member would
+    mentions = tuple([f"<@{user_id}>" for user_id in players[:STATS_PLAYERS]])
+    viewed = tuple([str(puzzle_id) for puzzle_id in puzzle_ids[-3:]])
+    return [
+        ('ranks today', MembersCog.get_ranks, handler.get_ranks, ('today',)),
+        ('ranks week', MembersCog.get_ranks, handler.get_ranks, ('week',)),
+        ('ranks 10-day', MembersCog.get_ranks, handler.get_ranks, ('10-day',)),
+        ('ranks all-time', MembersCog.get_ranks, handler.get_ranks, ('all-time',)),
+        ('missing', MembersCog.get_missing, handler.get_missing, (str(today),)),
+        ('entries', MembersCog.get_entries, handler.get_entries, mentions[:1]),
+        ('view', MembersCog.get_entry, handler.get_entry, mentions[:1] + viewed),
+        ('stats', MembersCog.get_stats, handler.get_stats, mentions[:1]),
+        (f'stats x{STATS_PLAYERS}', MembersCog.get_stats, handler.get_stats, mentions),
+    ]
+
+def percentile(values: list[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+async def measure(utils: BotUtilities, game: str, cog_command: commands.Command, command, args: tuple, author: FakeMember, counter: QueryCounter, runs: int) -> dict:
+    async def call() -> tuple[float, int]:
+        ctx = FakeContext(author, utils.bot.guild, cog_command)
+        before = counter.count
+        start = time.perf_counter()
+        # the same hooks the cogs run around a command, which raise once it goes over its query budget
+        utils.perf.start(ctx, game)
+        await command(ctx, *args)
+        utils.perf.finish(ctx)
+        elapsed = (time.perf_counter() - start) * 1000
+        if ctx.replies == 0:
+            raise RuntimeError(f"{command.__name__} {' '.join(args)} did not reply")
+        return elapsed, counter.count - before
+
+    first_ms, first_queries = await call()
+    latencies, queries = [], 0
+    for _ in range(runs):
+        elapsed, count = await call()
+        latencies.append(elapsed)
+        queries += count
+
+    tracemalloc.start()
+    try:
+        await call()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'first_ms': round(first_ms, 3),
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'max_ms': round(max(latencies), 3),
+        'mean_ms': round(statistics.fmean(latencies), 3),
+        'first_queries': first_queries,
+        'queries_per_call': round(queries / runs, 2),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+async def run_size(game: str, players: int, puzzles: int, runs: int, directory: str) -> dict:
+    rng = random.Random(f"{SEED}-{game}-{players}-{puzzles}")
+    guild = generate_guild(rng, players, puzzles)
+    members = [FakeMember(player.user_id, f"Player {i}") for i, player in enumerate(guild)]
+    utils = BotUtilities(FakeBot(FakeGuild(GUILD_ID, members)))
+    utils.perf.assert_query_budgets = True
+
+    prefix = game.upper()
+    os.environ[f'{prefix}_STORAGE'] = 'sqlite'
+    os.environ[f'{prefix}_SQLITE_PATH'] = os.path.join(directory, f"{game}-{players}x{puzzles}.db")
+    handler_type = HANDLERS[game]
+
+    # load through a plain handler, then benchmark a fresh one that builds its caches from the database
+    loader = handler_type(utils)
+    loader.db._use_memory_store, loader.db._use_player_totals = False, False
+    today = loader.db.get_puzzle_by_date(utils.get_todays_date())
+    puzzle_ids = list(range(today - puzzles + 1, today + 1))
+    start = time.perf_counter()
+    entries = generate_entries(rng, game, loader.db, guild, puzzle_ids)
+    generated = time.perf_counter()
+    try:
+        await loader.connect()
+        await loader.db.import_rows([(GUILD_ID, str(member.id), member.display_name) for member in members], [], [])
+        for i in range(0, len(entries), LOAD_BATCH_SIZE):
+            await loader.db.import_rows([], entries[i:i + LOAD_BATCH_SIZE], [])
+    finally:
+        loader.close()
+    loaded = time.perf_counter()
+
+    handler = handler_type(utils)
+    try:
+        await handler.connect()
+        # as on_ready does for every guild the bot is in
+        await handler.load_guilds([GUILD_ID])
+        connected = time.perf_counter()
+        counter = QueryCounter(handler.db._pool)
+        # the most active players, who have the most entries to read
+        counts = {}
+        for _, _, user_id, *_ in entries:
+            counts[user_id] = counts.get(user_id, 0) + 1
+        active = sorted(counts, key=lambda user_id: -counts[user_id])
+        author = FakeMember(int(active[0]), "Benchmark")
+
+        results = {}
+        for name, cog_command, command, args in get_commands(handler, today, puzzle_ids, active):
+            results[name] = await measure(utils, game, cog_command, command, args, author, counter, runs)
+            print(f"  {name:>16} first {results[name]['first_ms']:>9.1f}ms  p50 {results[name]['p50_ms']:>9.1f}ms  "
+                + f"p95 {results[name]['p95_ms']:>9.1f}ms  p99 {results[name]['p99_ms']:>9.1f}ms  "
+                + f"queries {results[name]['first_queries']}/{results[name]['queries_per_call']:g}  peak {results[name]['peak_kb']:>9.0f}KB", flush=True)
+    finally:
+        handler.close()
+        utils.close()
+
+    return {
+        'game': game,
+        'players': players,
+        'puzzles': puzzles,
+        'entries': len(entries),
+        'generate_s': round(generated - start, 3),
+        'load_s': round(loaded - generated, 3),
+        'connect_s': round(connected - loaded, 3),
+        'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'commands': results,
+    }
+
+####################
+#      REPORT      #
+####################
+
+def get_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def parse_sizes(value: str) -> list[tuple[int, int]]:
+    return [tuple([int(part) for part in size.lower().split('x')]) for size in value.split(',')]
+
+async def main(sizes: list[tuple[int, int]], games: list[str], runs: int, output: str) -> None:
+    report = {
+        'commit': get_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'runs': runs,
+        'results': [],
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        for players, puzzles in sizes:
+            for game in games:
+                print(f"== {game}: {players} players, {puzzles} puzzles ==", flush=True)
+                result = await run_size(game, players, puzzles, runs, directory)
+                print(f"  {result['entries']} entries, loaded in {result['load_s']:.1f}s, peak RSS {result['max_rss_mb']:.0f}MB")
+                report['results'].append(result)
+
+    with open(output, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f"\nwrote {output}")
+
+if __name__ == '__main__':
+    os.environ.setdefault('TABLE_RENDERER', 'pillow')
+    # data handlers read their settings when constructed; one database per game here
+    os.environ['SHARED_DATABASE'] = 'false'
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=parse_sizes, default=SIZES, help="comma-separated <players>x<puzzles>")
+    parser.add_argument('--games', type=lambda value: value.split(','), default=list(HANDLERS))
+    parser.add_argument('--runs', type=int, default=RUNS, help="repeated calls per command after the first")
+    parser.add_argument('--output', default=f"handlers-{get_commit() or 'local'}.json")
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes, args.games, args.runs, args.output))
@@ -0,0 +1,71 @@
+"""Index check for the data handlers' read queries.
+
+Connects to every game database configured through the bot's *_MYSQL_* or
+*_STORAGE/*_SQLITE_PATH environment variables, applies the schema migrations,
+then EXPLAINs the queries behind ?ranks, ?missing, ?entries, ?view and ?stats for one player
+in one guild and the last week of puzzles. Each table access is reported as:
+
+    ok    an index is used (the key is printed)
+    warn  an index exists but the optimizer chose a scan (usual for tiny tables)
+    FAIL  the table is scanned and no index could serve the predicate
+
+Queries without a where clause, and the outer table of an anti-join (every player without
+an entry), read whole tables by design and never FAIL.
+
+Run from the repository root:
+    python -m benchmarks.query_plans
+Exits non-zero if any query FAILs.
+"""
+import asyncio, os, sys
+from data.connections import ConnectionsDatabaseHandler
+from data.strands import StrandsDatabaseHandler
+from data.wordle import WordleDatabaseHandler
+from utils.bot_utilities import BotUtilities
+
+HANDLERS = [('WORDLE', WordleDatabaseHandler), ('CONNECTIONS', ConnectionsDatabaseHandler), ('STRANDS', StrandsDatabaseHandler)]
+
+def classify(query: str, row: dict, outer: bool) -> tuple[str, str]:
+    if row.get('key'):
+        return 'ok', row['key']
+    if ' where ' not in query:
+        return 'ok', 'unfiltered read'
+    if outer and ' left join ' in query and query.endswith(' is null'):
+        return 'ok', 'anti-join outer table'
+    if row.get('type') == 'ALL' and not row.get('possible_keys'):
+        return 'FAIL', 'full scan'
+    return 'warn', f"{row.get('type')} (possible: {row.get('possible_keys')})"
+
+async def check(name: str, handler_type: type) -> int:
+    db = handler_type(BotUtilities(None))
+    await db.connect()
+    try:
+        # any guild with entries; every guild's queries are the same shape
+        guilds = await db._fetchall(f"select guild_id from {db._entries_table} limit 1")
+        guild_id = int(guilds[0][0]) if len(guilds) > 0 else 0
+        players = await db.get_all_players(guild_id)
+        puzzles = (await db.get_all_puzzles(guild_id))[-7:] or [db.get_puzzle_by_date(db._utils.get_todays_date())]
+        user_id = players[0] if len(players) > 0 else '0'
+
+        failures = 0
+        print(f"== {name} ({db._mysql_db_name}) ==")
+        for query, rows in await db.get_query_plans(guild_id, user_id, puzzles):
+            print(query)
+            for i, row in enumerate(rows):
+                if row.get('table') is None:
+                    continue
+                status, detail = classify(query, row, i == 0)
+                failures += status == 'FAIL'
+                print(f"  {status:>4}  {row['table']}: {detail}")
+        return failures
+    finally:
+        db.close()
+
+async def main() -> int:
+    failures = 0
+    for name, handler_type in HANDLERS:
+        if os.environ.get(f'{name}_MYSQL_HOST') or os.environ.get(f'{name}_STORAGE', '').lower() == 'sqlite':
+            failures += await check(name, handler_type)
+    return 1 if failures > 0 else 0
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,117 @@
+"""Startup benchmark for bot.py.
+
+Every run starts a fresh interpreter, so nothing is served from an earlier import:
+
+    import  time for `import bot`, from python -X importtime, broken down by top-level package
+    ready   time from spawning the process until on_ready has finished (databases connected,
+            render workers started, lazy modules preloaded)
+
+With DISCORD_TOKEN set, ready includes logging in to the gateway. Without it, on_ready is
+called right after the import, which leaves out the network and isolates the bot's own cost.
+The databases are whatever the usual *_MYSQL_* / *_STORAGE variables configure; point them
+at SQLite files (e.g. WORDLE_STORAGE=sqlite) for a self-contained run.
+
+Run from the repository root:
+    python -m benchmarks.startup [runs]
+"""
+import asyncio, json, os, statistics, subprocess, sys, time
+
+RUNS = 5
+TOP_PACKAGES = 15
+RESULT_PREFIX = 'STARTUP '
+
+def get_env() -> dict[str, str]:
+    return dict(os.environ)
+
+def measure_import() -> tuple[float, dict[str, float]]:
+    # returns the total import time and the self time of each top-level package, in ms
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import bot'],
+        env=get_env(), capture_output=True, text=True, check=True)
+    total, packages = 0.0, {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = [part.strip() for part in line[len('import time:'):].split('|')]
+        package = name.split('.')[0]
+        packages[package] = packages.get(package, 0.0) + int(self_us) / 1000
+        if name == 'bot':
+            total = int(cumulative_us) / 1000
+    return total, packages
+
+def measure_ready() -> tuple[float, dict]:
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, '-m', 'benchmarks.startup', '--child'],
+        env=get_env(), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    try:
+        for line in process.stdout:
+            if line.startswith(RESULT_PREFIX):
+                return (time.perf_counter() - start) * 1000, json.loads(line[len(RESULT_PREFIX):])
+        raise RuntimeError("bot exited before on_ready finished")
+    finally:
+        process.wait()
+
+####################
+#      CHILD       #
+####################
+
+def run_child() -> None:
+    start = time.perf_counter()
+    import bot
+    imported = time.perf_counter()
+    on_ready = bot.on_ready
+
+    def report(online: bool) -> None:
+        result = {'import_ms': (imported - start) * 1000, 'ready_ms': (time.perf_counter() - start) * 1000, 'online': online}
+        print(f"{RESULT_PREFIX}{json.dumps(result)}", flush=True)
+
+    async def timed_on_ready() -> None:
+        await on_ready()
+        report(True)
+        await bot.bot.close()
+
+    async def offline() -> None:
+        try:
+            await on_ready()
+            report(False)
+        finally:
+            bot.connections.close()
+            bot.strands.close()
+            bot.wordle.close()
+            bot.utils.close()
+
+    if os.environ.get('DISCORD_TOKEN'):
+        bot.bot.on_ready = timed_on_ready
+        asyncio.run(bot.main())
+    else:
+        asyncio.run(offline())
+
+####################
+#      REPORT      #
+####################
+
+def main(runs: int) -> None:
+    imports, packages, readies, online = [], {}, [], False
+    for _ in range(runs):
+        total, run_packages = measure_import()
+        imports.append(total)
+        for package, ms in run_packages.items():
+            packages.setdefault(package, []).append(ms)
+        ready, result = measure_ready()
+        readies.append(ready)
+        online = result['online']
+
+    print(f"{runs} runs, python {sys.version.split()[0]}, {'gateway login' if online else 'offline (no DISCORD_TOKEN)'}")
+    print(f"{'':>16} {'median (ms)':>12} {'min (ms)':>10}")
+    print(f"{'time-to-import':>16} {statistics.median(imports):>12.1f} {min(imports):>10.1f}")
+    print(f"{'time-to-ready':>16} {statistics.median(readies):>12.1f} {min(readies):>10.1f}")
+
+    print(f"\nslowest packages to import (median self time, ms)")
+    medians = sorted([(statistics.median(times + [0.0] * (runs - len(times))), package) for package, times in packages.items()], reverse=True)
+    for ms, package in medians[:TOP_PACKAGES]:
+        print(f"{package:>24} {ms:>8.1f}")
+
+if __name__ == '__main__':
+    if sys.argv[1:] == ['--child']:
+        run_child()
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else RUNS)
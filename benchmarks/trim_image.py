@@ -0,0 +1,54 @@
+"""Micro-benchmark for BotUtilities._trim_image.
+
+Compares the vectorized trim against the original per-pixel getpixel loop on
+synthetic leaderboard screenshots: a rendered table sitting at the top of a
+mostly-white browser capture, like bokeh's DataTable export produces.
+
+Run from the repository root:
+    python -m benchmarks.trim_image
+"""
+import timeit
+import pandas as pd
+from PIL import Image
+from utils.bot_utilities import BotUtilities
+from utils.table_renderers import PillowTableRenderer
+
+# (width, height) of the browser capture
+SCREENSHOT_SIZES = [(600, 400), (1000, 800), (1600, 1600)]
+LEADERBOARD_ROWS = 11
+
+def legacy_trim_image(image: Image.Image) -> Image.Image:
+    rgb_image = image.convert('RGB')
+    width, height = image.size
+    for y in reversed(range(height)):
+        for x in range(0, max(15, width)):
+            rgb = rgb_image.getpixel((x, y))
+            if rgb != (255, 255, 255):
+                if x < 10 and rgb in [(254, 254, 254), (240, 240, 240)]:
+                    return rgb_image.crop([5, 5, width, y])
+                else:
+                    return rgb_image.crop([5, 5, width, y + 8])
+    return rgb_image
+
+def build_screenshot(size: tuple[int, int]) -> Image.Image:
+    df = pd.DataFrame(columns=['Rank', 'User', 'Average', '🟩', '🟨', '⬜', '🧩', '🚫'])
+    for i in range(LEADERBOARD_ROWS):
+        df.loc[i] = [i + 1, f"Player {i + 1}", f"{3.2 + i / 20:.2f}/6 ({3.1 + i / 20:.2f}/6)", "3.10", "1.20", "0.50", 6, 1]
+    table = PillowTableRenderer().render(df)
+    screenshot = Image.new('RGBA', size, (255, 255, 255, 255))
+    screenshot.paste(table, (5, 5))
+    return screenshot
+
+def main() -> None:
+    utils = BotUtilities(None)
+    print(f"{'screenshot':>12} {'legacy (ms)':>12} {'vectorized (ms)':>16} {'speedup':>8}")
+    for size in SCREENSHOT_SIZES:
+        screenshot = build_screenshot(size)
+        assert legacy_trim_image(screenshot).tobytes() == utils._trim_image(screenshot).tobytes()
+
+        legacy = min(timeit.repeat(lambda: legacy_trim_image(screenshot), number=3, repeat=3)) / 3
+        vectorized = min(timeit.repeat(lambda: utils._trim_image(screenshot), number=20, repeat=3)) / 20
+        print(f"{size[0]:>5}x{size[1]:<6} {legacy * 1000:>12.2f} {vectorized * 1000:>16.2f} {legacy / vectorized:>7.1f}x")
+
+if __name__ == '__main__':
+    main()
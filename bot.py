@@ -5,6 +5,7 @@ from games.strands import StrandsCommandHandler
 from games.wordle import WordleCommandHandler
 from utils.bot_utilities import BotUtilities
 from utils.help_handler import HelpMenuHandler
+from utils.ingestion_queue import IngestionQueue
 
 # turn off logging for webdriver manager
 os.environ['WDM_LOG_LEVEL'] = '0'
@@ -12,18 +13,21 @@ os.environ['WDM_LOG_LEVEL'] = '0'
 # parse environment variables
 token = os.getenv('DISCORD_TOKEN')
 discord_env = os.getenv('DISCORD_ENV')
-guild_id = os.getenv('GUILD_ID')
+# guilds can be split across processes, e.g. SHARD_COUNT=4 with SHARD_IDS=0,1 in one and 2,3 in another;
+# by default Discord picks the shard count and this process runs all of them
+shard_count = os.getenv('SHARD_COUNT')
+shard_ids = os.getenv('SHARD_IDS')
 
 # build Discord client
 intents = discord.Intents.all()
 intents.members = True
-client = discord.Client(intents=intents)
 activity = discord.Game(name="?help")
 
 # set up the bot
-bot = commands.Bot(command_prefix='?', intents=intents, activity=activity, help_command=None)
-bot.guild_id = int(guild_id) if guild_id.isnumeric() else -1
-bot.utils = BotUtilities(client, bot)
+bot = commands.AutoShardedBot(command_prefix='?', intents=intents, activity=activity, help_command=None,
+    shard_count=int(shard_count) if shard_count else None,
+    shard_ids=[int(shard_id) for shard_id in shard_ids.split(',')] if shard_ids else None)
+bot.utils = BotUtilities(bot)
 bot.help_menu = HelpMenuHandler()
 
 # create games
@@ -31,9 +35,44 @@ bot.connections = ConnectionsCommandHandler(bot.utils)
 bot.strands = StrandsCommandHandler(bot.utils)
 bot.wordle = WordleCommandHandler(bot.utils)
 
+# pasted results are written in batches off the message handler
+bot.ingestion = IngestionQueue()
+
+# expose health metrics over HTTP when METRICS_PORT is set
+async def start_metrics():
+    metrics = bot.utils.metrics
+    games = {'connections': bot.connections, 'strands': bot.strands, 'wordle': bot.wordle}
+
+    def cache_lookups():
+        samples = []
+        for game, handler in games.items():
+            counters = handler.get_query_cache_counters()
+            samples += [({'game': game, 'result': 'hit'}, counters['hits']), ({'game': game, 'result': 'miss'}, counters['misses'])]
+        return samples
+
+    def cache_hit_ratio():
+        samples = []
+        for game, handler in games.items():
+            counters = handler.get_query_cache_counters()
+            lookups = counters['hits'] + counters['misses']
+            samples.append(({'game': game}, counters['hits'] / lookups if lookups > 0 else 0))
+        return samples
+
+    metrics.add_collector('nyt_query_cache_lookups_total', 'counter', "Query cache lookups by game and result.", cache_lookups)
+    metrics.add_collector('nyt_query_cache_hit_ratio', 'gauge', "Query cache hits over lookups since startup, by game.", cache_hit_ratio)
+    metrics.add_collector('nyt_chrome_processes', 'gauge', "Live Chrome processes in the table renderer's driver pool.",
+        lambda: [({}, bot.utils.driver_pool.live_count())])
+    metrics.add_collector('nyt_ingestion_queue_depth', 'gauge', "Pasted results waiting to be written.",
+        lambda: [({}, bot.ingestion.get_depth())])
+    await metrics.start_server()
+
 # load the cogs
 async def main():
     try:
+        try:
+            await start_metrics()
+        except Exception as e:
+            print(f"Failed to start metrics server: {e}")
         async with bot:
             for extension in ['cogs.members', 'cogs.owner']:
                 try:
@@ -43,18 +82,52 @@ async def main():
             await bot.start(token, reconnect=True)
     except asyncio.exceptions.CancelledError as e:
         print('\nCaught user exit, exiting...')
+    finally:
+        # write out whatever was still queued before the databases go away
+        await bot.ingestion.close()
+        await bot.utils.metrics.stop_server()
+        bot.connections.close()
+        bot.strands.close()
+        bot.wordle.close()
+        bot.utils.close()
 
 
 # load the database when ready
 @bot.event
 async def on_ready():
     try:
-        bot.connections.connect()
-        bot.strands.connect()
-        bot.wordle.connect()
+        await bot.connections.connect()
+        await bot.strands.connect()
+        await bot.wordle.connect()
         print("Database loaded & successfully logged in.")
     except Exception as e:
         print(f"Failed to load database: {e}")
+    try:
+        # the in-memory caches of every guild this process serves, so no guild's first command builds them
+        guild_ids = [guild.id for guild in bot.guilds]
+        await bot.connections.load_guilds(guild_ids)
+        await bot.strands.load_guilds(guild_ids)
+        await bot.wordle.load_guilds(guild_ids)
+    except Exception as e:
+        print(f"Failed to load caches: {e}")
+    try:
+        # names can have changed while the bot was offline
+        bot.utils.clear_nicknames()
+        for guild in bot.guilds:
+            await bot.connections.refresh_player_names(guild.id)
+            await bot.strands.refresh_player_names(guild.id)
+            await bot.wordle.refresh_player_names(guild.id)
+    except Exception as e:
+        print(f"Failed to refresh player names: {e}")
+    try:
+        await bot.utils.render_executor.warm_up()
+    except Exception as e:
+        print(f"Failed to start render workers: {e}")
+    try:
+        await bot.utils.warm_up_imports()
+    except Exception as e:
+        print(f"Failed to preload modules: {e}")
 
-# run the bot
-asyncio.run(main())
+# run the bot (render workers re-import this module, so only start it as a script)
+if __name__ == '__main__':
+    asyncio.run(main())
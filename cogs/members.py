@@ -3,12 +3,14 @@ from discord.ext import commands
 from games.base_command_handler import BaseCommandHandler
 from utils.bot_utilities import BotUtilities, NYTGame
 from utils.help_handler import HelpMenuHandler
+from utils.ingestion_queue import IngestionQueue
 
 class MembersCog(commands.Cog, name="Normal Members Commands"):
     # class variables
     bot: commands.Bot
     utils: BotUtilities
     help_menu: HelpMenuHandler
+    ingestion: IngestionQueue
 
     # games
     connections: BaseCommandHandler
@@ -19,6 +21,7 @@ class MembersCog(commands.Cog, name="Normal Members Commands"):
         self.bot = bot
         self.utils = self.bot.utils
         self.help_menu = self.bot.help_menu
+        self.ingestion = self.bot.ingestion
         self.build_help_menu()
 
         self.connections = self.bot.connections
@@ -29,40 +32,88 @@ class MembersCog(commands.Cog, name="Normal Members Commands"):
     #   COMMAND SETUP   #
     #####################
 
-    @commands.guild_only()
+    async def cog_before_invoke(self, ctx: commands.Context) -> None:
+        self.utils.perf.start(ctx, self.utils.get_game_from_channel(ctx.message).name.lower())
+
+    async def cog_after_invoke(self, ctx: commands.Context) -> None:
+        self.utils.perf.finish(ctx)
+
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message) -> None:
+        # guild_only() only applies to commands, so direct messages are turned away here
+        if message.guild is None:
+            return
         try:
-            if message.author.id != self.bot.user.id and message.content.count("\n") >= 2:
-                # parse non-puzzle lines from message
+            if message.author.id != self.bot.user.id:
+                submission = self.utils.get_submission(message.content)
+                game = submission.game.name.lower() if submission is not None else 'none'
+                self.utils.metrics.inc('nyt_messages_classified_total', game=game)
+                if submission is None:
+                    return
                 user_id = str(message.author.id)
-                first_line = message.content.splitlines()[0].strip()
-                first_two_lines = '\n'.join(message.content.splitlines()[:2])
-                # add entry to either Wordle or Connections
-                if 'Wordle' in first_line and self.utils.is_wordle_submission(first_line):
-                    content = '\n'.join(message.content.splitlines()[1:])
-                    if self.wordle.add_entry(user_id, first_line, content):
-                        await message.add_reaction('✅')
-                    else:
-                        await message.add_reaction('❌')
-                elif 'Connections' in first_line and self.utils.is_connections_submission(first_two_lines):
-                    content = '\n'.join(message.content.splitlines()[2:])
-                    if self.connections.add_entry(user_id, first_two_lines, content):
-                        await message.add_reaction('✅')
-                    else:
-                        await message.add_reaction('❌')
-                elif 'Strands' in first_line and self.utils.is_strands_submission(first_two_lines):
-                    content = '\n'.join(message.content.splitlines()[2:])
-                    if self.strands.add_entry(user_id, first_two_lines, content):
-                        await message.add_reaction('✅')
-                    else:
-                        await message.add_reaction('❌')
+                # queue entry for Wordle, Connections or Strands
+                match submission.game:
+                    case NYTGame.WORDLE:
+                        handler = self.wordle
+                    case NYTGame.CONNECTIONS:
+                        handler = self.connections
+                    case NYTGame.STRANDS:
+                        handler = self.strands
+                with self.utils.metrics.time('nyt_ingestion_duration_seconds', game=game):
+                    added = await self.ingestion.submit(handler, message.guild.id, user_id, submission.title, submission.grid)
+                self.utils.metrics.inc('nyt_messages_ingested_total', game=game, result='added' if added else 'invalid')
+                await message.add_reaction('✅' if added else '❌')
+        except Exception as e:
+            print(f"Caught exception: {e}")
+            traceback.print_exception(e)
+
+    # a guild's name index is only built once one of its names is needed, so these compare the
+    # event's before and after instead of asking the index whether anything changed
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member: discord.Member) -> None:
+        self.utils.get_nicknames(member.guild.id).set(member)
+        await self.refresh_player_names(member)
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before: discord.Member, after: discord.Member) -> None:
+        if before.display_name != after.display_name:
+            self.utils.get_nicknames(after.guild.id).set(after)
+            await self.refresh_player_names(after)
+
+    @commands.Cog.listener()
+    async def on_user_update(self, before: discord.User, after: discord.User) -> None:
+        # a global name change shows up as the display name of members without a nickname, in every guild they share
+        if before.display_name == after.display_name:
+            return
+        for guild in after.mutual_guilds:
+            member = guild.get_member(after.id)
+            if member is not None and member.nick is None:
+                self.utils.get_nicknames(guild.id).set(member)
+                await self.refresh_player_names(member)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: discord.Member) -> None:
+        self.utils.get_nicknames(member.guild.id).remove(member.id)
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild: discord.Guild) -> None:
+        try:
+            for handler in [self.connections, self.strands, self.wordle]:
+                await handler.load_guilds([guild.id])
         except Exception as e:
             print(f"Caught exception: {e}")
             traceback.print_exception(e)
 
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild) -> None:
+        # the guild's rows stay in the database; only what this process keeps for it is dropped
+        self.utils.clear_nicknames(guild.id)
+        for handler in [self.connections, self.strands, self.wordle]:
+            handler.unload_guild(guild.id)
+
     @commands.guild_only()
-    @commands.command(name="help")
+    @commands.command(name="help", extras={'query_budget': 0})
     async def help(self, ctx: commands.Context, *args: str) -> None:
         if len(args) == 0:
             await ctx.reply(self.help_menu.get_all())
@@ -72,7 +123,7 @@ class MembersCog(commands.Cog, name="Normal Members Commands"):
             await ctx.reply("Couldn't understand command. Try `?help <command>`.")
 
     @commands.guild_only()
-    @commands.command(name='ranks', help='Show ranks of players in the server')
+    @commands.command(name='ranks', help='Show ranks of players in the server', extras={'query_budget': 2})
     async def get_ranks(self, ctx: commands.Context, *args: str) -> None:
         try:
             match self.utils.get_game_from_channel(ctx.message):
@@ -87,7 +138,7 @@ class MembersCog(commands.Cog, name="Normal Members Commands"):
             traceback.print_exception(e)
 
     @commands.guild_only()
-    @commands.command(name='missing', help='Show all players missing an entry for a puzzle')
+    @commands.command(name='missing', help='Show all players missing an entry for a puzzle', extras={'query_budget': 1})
     async def get_missing(self, ctx: commands.Context, *args: str) -> None:
         try:
             match self.utils.get_game_from_channel(ctx.message):
@@ -102,7 +153,7 @@ class MembersCog(commands.Cog, name="Normal Members Commands"):
             traceback.print_exception(e)
 
     @commands.guild_only()
-    @commands.command(name='entries', help='Show all recorded entries for a player')
+    @commands.command(name='entries', help='Show all recorded entries for a player', extras={'query_budget': 2})
     async def get_entries(self, ctx: commands.Context, *args: str) -> None:
         try:
             match self.utils.get_game_from_channel(ctx.message):
@@ -117,7 +168,7 @@ class MembersCog(commands.Cog, name="Normal Members Commands"):
             traceback.print_exception(e)
 
     @commands.guild_only()
-    @commands.command(name="view", help="Show player's entry for a given puzzle number")
+    @commands.command(name="view", help="Show player's entry for a given puzzle number", extras={'query_budget': 2})
     async def get_entry(self, ctx: commands.Context, *args: str) -> None:
         try:
             match self.utils.get_game_from_channel(ctx.message):
@@ -132,7 +183,7 @@ class MembersCog(commands.Cog, name="Normal Members Commands"):
             traceback.print_exception(e)
 
     @commands.guild_only()
-    @commands.command(name="stats", help="Show basic stats for a player")
+    @commands.command(name="stats", help="Show basic stats for a player", extras={'query_budget': 7})
     async def get_stats(self, ctx: commands.Context, *args: str) -> None:
         try:
             match self.utils.get_game_from_channel(ctx.message):
@@ -150,6 +201,14 @@ class MembersCog(commands.Cog, name="Normal Members Commands"):
     #   HELPER METHODS   #
     ######################
 
+    async def refresh_player_names(self, member: discord.Member) -> None:
+        try:
+            for handler in [self.connections, self.strands, self.wordle]:
+                await handler.refresh_player_names(member.guild.id, [str(member.id)])
+        except Exception as e:
+            print(f"Caught exception: {e}")
+            traceback.print_exception(e)
+
     def build_help_menu(self) -> None:
         self.help_menu.add('ranks', \
                 explanation = "View the leaderboard over time or for a specific puzzle.", \
@@ -177,6 +236,20 @@ class MembersCog(commands.Cog, name="Normal Members Commands"):
                 explanation = "Remove an entry from the database.", \
                 usage = "`?remove [<player>] <puzzle #>`", \
                 owner_only=True)
+        self.help_menu.add('backfill', \
+                explanation = "Import past submissions from a channel's message history.", \
+                usage = "`?backfill [<#channel>] [<MM/DD/YYYY>]`", \
+                notes = "- Defaults to the current channel.\n- Re-running only scans messages newer than the last completed batch.", \
+                owner_only=True)
+        self.help_menu.add('perf', \
+                explanation = "View p50/p95/p99 timings of each command since startup, split into SQL, nickname lookups, rendering and Discord.", \
+                usage = "`?perf [<command>|sql]`", \
+                notes = "- `?perf` will default to every command that has run.\n- `?perf sql` lists the statements with the most total time, with how often each ran.", \
+                owner_only=True)
+        self.help_menu.add('cache', \
+                explanation = "View hit/miss/eviction counters for each game's query cache.", \
+                usage = "`?cache`", \
+                owner_only=True)
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(MembersCog(bot))
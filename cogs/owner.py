@@ -1,8 +1,18 @@
+import discord, time
+from datetime import datetime, timezone
 from discord.ext import commands
 from games.base_command_handler import BaseCommandHandler
 from utils.bot_utilities import BotUtilities, NYTGame
 
 class OwnerCog(commands.Cog, name="Owner-Only Commands"):
+    # backfill tuning
+    BACKFILL_BATCH_SIZE: int = 500
+    BACKFILL_REPORT_SECONDS: float = 5.0
+
+    # ?perf sql: statements listed per database, and how much of each is shown
+    PERF_SQL_STATEMENTS: int = 10
+    PERF_SQL_WIDTH: int = 300
+
     # class variables
     bot: commands.Bot
     utils: BotUtilities
@@ -23,8 +33,16 @@ class OwnerCog(commands.Cog, name="Owner-Only Commands"):
     #   COMMAND SETUP   #
     #####################
 
+    async def cog_before_invoke(self, ctx: commands.Context) -> None:
+        game = self.utils.get_game_from_channel(ctx.message) if ctx.guild is not None else NYTGame.UNKNOWN
+        self.utils.perf.start(ctx, game.name.lower())
+
+    async def cog_after_invoke(self, ctx: commands.Context) -> None:
+        self.utils.perf.finish(ctx)
+
+    @commands.guild_only()
     @commands.is_owner()
-    @commands.command(name="remove", help="Removes one puzzle entry for a player")
+    @commands.command(name="remove", help="Removes one puzzle entry for a player", extras={'query_budget': 3})
     async def remove_entry(self, ctx: commands.Context, *args: str) -> None:
         match self.utils.get_game_from_channel(ctx.message):
             case NYTGame.CONNECTIONS:
@@ -34,8 +52,9 @@ class OwnerCog(commands.Cog, name="Owner-Only Commands"):
             case NYTGame.WORDLE:
                 await self.wordle.remove_entry(ctx, *args)
 
+    @commands.guild_only()
     @commands.is_owner()
-    @commands.command(name='add', help='Manually adds a puzzle entry for a player')
+    @commands.command(name='add', help='Manually adds a puzzle entry for a player', extras={'query_budget': 1})
     async def add_score(self, ctx: commands.Context, *args: str) -> None:
         match self.utils.get_game_from_channel(ctx.message):
             case NYTGame.CONNECTIONS:
@@ -45,5 +64,135 @@ class OwnerCog(commands.Cog, name="Owner-Only Commands"):
             case NYTGame.WORDLE:
                 await self.wordle.add_score(ctx, *args)
 
+    @commands.guild_only()
+    @commands.is_owner()
+    @commands.command(name='backfill', help="Imports past puzzle entries from a channel's history")
+    async def backfill(self, ctx: commands.Context, *args: str) -> None:
+        channel = ctx.message.channel_mentions[0] if len(ctx.message.channel_mentions) > 0 else ctx.channel
+        since = None
+        for arg in args:
+            if self.utils.is_date(arg):
+                since = self.utils.get_date_from_str(arg)
+        games = {NYTGame.WORDLE: self.wordle, NYTGame.CONNECTIONS: self.connections, NYTGame.STRANDS: self.strands}
+
+        # each game's database remembers the last message it committed for this channel,
+        # so a re-run only has to read history newer than the oldest of those marks
+        marks = {game: await handler.get_backfill_mark(channel.id) for game, handler in games.items()}
+        after = None
+        if all(mark is not None for mark in marks.values()):
+            after = discord.Object(id=min(marks.values()))
+        if since is not None:
+            since_time = datetime.combine(since, datetime.min.time(), tzinfo=timezone.utc)
+            if after is None or discord.utils.snowflake_time(after.id) < since_time:
+                after = since_time
+
+        status = await ctx.reply(f"Backfilling {channel.mention}...")
+        pending = {game: [] for game in games}
+        scanned, added, last_id = 0, 0, None
+        start = last_report = time.perf_counter()
+        async for message in channel.history(limit=None, after=after, oldest_first=True):
+            scanned += 1
+            last_id = message.id
+            if message.author.id != self.bot.user.id:
+                submission = self.utils.get_submission(message.content)
+                if submission is not None and (marks[submission.game] is None or message.id > marks[submission.game]):
+                    pending[submission.game].append((str(message.author.id), message.author.display_name, submission.title, submission.grid))
+            if scanned % self.BACKFILL_BATCH_SIZE == 0:
+                added += await self.__flush_backfill(games, pending, marks, channel.guild.id, channel.id, last_id)
+            if time.perf_counter() - last_report >= self.BACKFILL_REPORT_SECONDS:
+                last_report = time.perf_counter()
+                await status.edit(content=f"Backfilling {channel.mention}: {self.__get_backfill_progress(scanned, added, start)}")
+        if last_id is not None:
+            added += await self.__flush_backfill(games, pending, marks, channel.guild.id, channel.id, last_id)
+        await status.edit(content=f"Finished backfilling {channel.mention}: {self.__get_backfill_progress(scanned, added, start)}")
+
+    @commands.is_owner()
+    @commands.command(name='cache', help="Shows each game's query cache counters", extras={'query_budget': 0})
+    async def get_cache(self, ctx: commands.Context, *args: str) -> None:
+        lines = []
+        for name, handler in [('Wordle', self.wordle), ('Connections', self.connections), ('Strands', self.strands)]:
+            counters = handler.get_query_cache_counters()
+            lookups = counters['hits'] + counters['misses']
+            hit_rate = counters['hits'] / lookups if lookups > 0 else 0
+            lines.append(f"**{name}**: {counters['entries']} cached, {counters['hits']:,} hits / {counters['misses']:,} misses ({hit_rate:.0%}), "
+                + f"{counters['evictions']:,} evicted, {counters['expirations']:,} expired, {counters['invalidations']:,} invalidated")
+        await ctx.reply('\n'.join(lines))
+
+    @commands.is_owner()
+    @commands.command(name='perf', help="Shows per-stage command timings since startup", extras={'query_budget': 0})
+    async def get_perf(self, ctx: commands.Context, *args: str) -> None:
+        perf = self.utils.perf
+        if len(args) > 1:
+            await ctx.reply("Couldn't understand command. Try `?perf [<command>|sql]`.")
+            return
+        if len(args) == 1 and args[0] == 'sql':
+            await self.__reply_query_stats(ctx)
+            return
+        names = [args[0].lstrip('?')] if len(args) == 1 else [name for name in perf.get_commands() if name != 'perf']
+        sections = []
+        for name in names:
+            percentiles = perf.get_percentiles(name)
+            if len(percentiles) == 0:
+                continue
+            lines = [f"?{name}: {perf.get_count(name):,} calls (last {min(perf.get_count(name), perf.history_size):,} kept)",
+                f"{'stage':<10} {'p50':>9} {'p95':>9} {'p99':>9}"]
+            for stage, values in percentiles.items():
+                unit = '' if stage == 'queries' else 'ms'
+                lines.append(f"{stage:<10} " + ' '.join([f"{value:>7.1f}{unit:<2}" for value in values]))
+            sections.append('\n'.join(lines))
+        if len(sections) == 0:
+            await ctx.reply(f"No timings recorded{f' for `?{names[0]}`' if len(args) == 1 else ''} yet.")
+            return
+        # one code block per message, within Discord's message length limit
+        message = ''
+        for section in sections:
+            block = f"```\n{section}\n```"
+            if len(message) + len(block) > 2000:
+                await ctx.reply(message)
+                message = ''
+            message += block
+        await ctx.reply(message)
+
+    ######################
+    #   HELPER METHODS   #
+    ######################
+
+    async def __reply_query_stats(self, ctx: commands.Context) -> None:
+        # games in a shared database report the same pool, so each log is listed once
+        logs = {}
+        for handler in [self.wordle, self.connections, self.strands]:
+            log = handler.get_query_log()
+            if log is not None:
+                logs[id(log)] = log
+        lines = []
+        for log in logs.values():
+            for stats in log.get_stats()[:self.PERF_SQL_STATEMENTS]:
+                lines.append(f"{log.name}: {stats.count:,}x, {stats.total_ms:,.0f}ms total, {stats.total_ms / stats.count:.1f}ms avg, "
+                    + f"{stats.max_ms:.0f}ms max\n  {stats.fingerprint[:self.PERF_SQL_WIDTH]}")
+        if len(lines) == 0:
+            await ctx.reply("No queries recorded yet.")
+            return
+        message = ''
+        for line in lines:
+            if len(message) + len(line) + 8 > 2000:
+                await ctx.reply(f"```\n{message}```")
+                message = ''
+            message += line + '\n'
+        await ctx.reply(f"```\n{message}```")
+
+    async def __flush_backfill(self, games: dict[NYTGame, BaseCommandHandler], pending: dict[NYTGame, list], marks: dict[NYTGame, int], guild_id: int, channel_id: int, last_id: int) -> int:
+        added = 0
+        for game, handler in games.items():
+            # never move a game's mark backwards when its earlier run got further than this one
+            mark = max(marks[game] or 0, last_id)
+            added += await handler.add_entries(guild_id, pending[game], channel_id, mark)
+            marks[game] = mark
+            pending[game].clear()
+        return added
+
+    def __get_backfill_progress(self, scanned: int, added: int, start: float) -> str:
+        elapsed = max(time.perf_counter() - start, 1e-6)
+        return f"scanned {scanned:,} messages and added {added:,} entries in {elapsed:.1f}s ({scanned / elapsed:,.0f} messages/s)."
+
 async def setup(bot: commands.Bot):
     await bot.add_cog(OwnerCog(bot))
@@ -0,0 +1,262 @@
+import re, sqlite3
+from typing import Protocol
+from mysql.connector import MySQLConnection, connect
+from mysql.connector.constants import ClientFlag
+from mysql.connector.errors import InterfaceError, OperationalError
+
+class Cursor(Protocol):
+    rowcount: int
+    description: list[tuple]
+
+    def execute(self, query: str, params: tuple = ()) -> None:
+        pass
+
+    def executemany(self, query: str, seq_params: list[tuple]) -> None:
+        pass
+
+    def fetchall(self) -> list[tuple]:
+        pass
+
+class Upsert():
+    def __init__(self, table: str, key_columns: list[str], columns: list[str], rows: list[tuple], update: bool = True) -> None:
+        self.table: str = table
+        self.key_columns: list[str] = key_columns
+        self.columns: list[str] = columns
+        self.rows: list[tuple] = rows
+        # whether an existing row takes the new values, or is left alone
+        self.update: bool = update
+
+    def get_update_columns(self) -> list[str]:
+        return [column for column in self.columns if column not in self.key_columns]
+
+class StorageBackend(Protocol):
+    # errors after which the worker's connection is discarded and the statement retried once
+    disconnect_errors: tuple[type[Exception], ...]
+
+    def connect(self) -> object:
+        pass
+
+    def get_cursor(self, db) -> Cursor:
+        pass
+
+    def begin(self, cur: Cursor) -> None:
+        pass
+
+    def close(self, db) -> None:
+        pass
+
+    def upsert(self, cur: Cursor, upserts: list[Upsert]) -> list[int]:
+        # returns MySQL's affected-rows convention per upsert: 1 inserted, 2 updated, 0 unchanged
+        pass
+
+    def table_exists(self, cur: Cursor, table: str) -> bool:
+        pass
+
+    def create_table(self, cur: Cursor, table: str, columns: list[str], primary_key: list[str], indexes: dict[str, list[str]] = {}) -> None:
+        pass
+
+    def create_view(self, cur: Cursor, view: str, query: str) -> None:
+        pass
+
+    def rename_tables(self, cur: Cursor, renames: list[tuple[str, str]]) -> None:
+        # (old name, new name) pairs, applied in order
+        pass
+
+    def explain(self, cur: Cursor, query: str, params: tuple) -> list[dict]:
+        # one dict per table access with MySQL EXPLAIN's table/type/possible_keys/key fields
+        pass
+
+####################
+#      MYSQL       #
+####################
+
+class MySQLBackend(StorageBackend):
+    def __init__(self, host: str, user: str, password: str, database: str) -> None:
+        if not host:
+            raise Exception("Environment variable for MySQL HOST cannot be empty/null")
+        self.host: str = host
+        self.user: str = user
+        self.password: str = password
+        self.database: str = database
+        self.disconnect_errors = (InterfaceError, OperationalError)
+
+    def connect(self) -> MySQLConnection:
+        return connect(
+            host=self.host,
+            user=self.user,
+            password=self.password,
+            database=self.database,
+            # a read outside a transaction sees every commit, not the snapshot of the worker's first read
+            autocommit=True,
+            # report 0 affected rows for an upsert that changed nothing
+            client_flags=[-ClientFlag.FOUND_ROWS]
+        )
+
+    def get_cursor(self, db: MySQLConnection) -> Cursor:
+        return db.cursor(buffered=True)
+
+    def begin(self, cur: Cursor) -> None:
+        # autocommit is on, so writes open their transaction explicitly
+        cur.execute("start transaction")
+
+    def close(self, db: MySQLConnection) -> None:
+        if db.is_connected():
+            db.close()
+
+    def upsert(self, cur: Cursor, upserts: list[Upsert]) -> list[int]:
+        if all(len(upsert.rows) == 1 for upsert in upserts):
+            # single-row upserts go to the server as one batch, a single round trip
+            query = '; '.join([self.__get_upsert_query(upsert) for upsert in upserts])
+            params = tuple([value for upsert in upserts for value in upsert.rows[0]])
+            if len(upserts) == 1:
+                cur.execute(query, params)
+                return [cur.rowcount]
+            return [result.rowcount for result in cur.execute(query, params, multi=True)]
+
+        rowcounts = []
+        for upsert in upserts:
+            if len(upsert.rows) == 0:
+                rowcounts.append(0)
+            else:
+                cur.executemany(self.__get_upsert_query(upsert), upsert.rows)
+                rowcounts.append(cur.rowcount)
+        return rowcounts
+
+    def table_exists(self, cur: Cursor, table: str) -> bool:
+        cur.execute("select 1 from information_schema.tables where table_schema = database() and table_name = %s", (table,))
+        return len(cur.fetchall()) > 0
+
+    def create_table(self, cur: Cursor, table: str, columns: list[str], primary_key: list[str], indexes: dict[str, list[str]] = {}) -> None:
+        definitions = columns + [f"primary key ({', '.join(primary_key)})"]
+        definitions += [f"key {name} ({', '.join(index_columns)})" for name, index_columns in indexes.items()]
+        cur.execute(f"create table {table} ({', '.join(definitions)}) default charset=utf8mb4")
+
+    def create_view(self, cur: Cursor, view: str, query: str) -> None:
+        cur.execute(f"create or replace view {view} as {query}")
+
+    def rename_tables(self, cur: Cursor, renames: list[tuple[str, str]]) -> None:
+        # one statement, so the swap is atomic
+        cur.execute(f"rename table {', '.join([f'{old} to {new}' for old, new in renames])}")
+
+    def explain(self, cur: Cursor, query: str, params: tuple) -> list[dict]:
+        cur.execute(f"explain {query}", params)
+        names = [column[0] for column in cur.description]
+        return [dict(zip(names, row)) for row in cur.fetchall()]
+
+    def __get_upsert_query(self, upsert: Upsert) -> str:
+        if upsert.update:
+            updates = ', '.join([f"{column} = values({column})" for column in upsert.get_update_columns()])
+        else:
+            updates = f"{upsert.key_columns[0]} = {upsert.key_columns[0]}"
+        return f"insert into {upsert.table} ({', '.join(upsert.columns)}) " \
+            + f"values ({', '.join(['%s'] * len(upsert.columns))}) on duplicate key update {updates}"
+
+####################
+#      SQLITE      #
+####################
+
+class SQLiteCursor():
+    # lets the handlers keep writing mysql-connector's %s placeholders
+    def __init__(self, cur: sqlite3.Cursor) -> None:
+        self._cur: sqlite3.Cursor = cur
+
+    @property
+    def rowcount(self) -> int:
+        return self._cur.rowcount
+
+    @property
+    def description(self) -> list[tuple]:
+        return self._cur.description
+
+    def execute(self, query: str, params: tuple = ()) -> None:
+        self._cur.execute(query.replace('%s', '?'), params)
+
+    def executemany(self, query: str, seq_params: list[tuple]) -> None:
+        self._cur.executemany(query.replace('%s', '?'), seq_params)
+
+    def fetchall(self) -> list[tuple]:
+        return self._cur.fetchall()
+
+class SQLiteBackend(StorageBackend):
+    PLAN_PATTERN = re.compile(r'^(SCAN|SEARCH) (\w+)(?: AS \w+)?(?: USING (?:COVERING )?(?:INDEX (\w+)|(INTEGER PRIMARY KEY|PRIMARY KEY)))?')
+
+    def __init__(self, path: str, busy_timeout_ms: int = 5000) -> None:
+        self.path: str = path
+        self.busy_timeout_ms: int = busy_timeout_ms
+        self.disconnect_errors = ()
+
+    def connect(self) -> sqlite3.Connection:
+        # transactions are opened explicitly in begin(), so run the driver in autocommit mode
+        db = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        db.execute("pragma journal_mode = wal")
+        db.execute("pragma synchronous = normal")
+        db.execute(f"pragma busy_timeout = {self.busy_timeout_ms}")
+        return db
+
+    def get_cursor(self, db: sqlite3.Connection) -> Cursor:
+        return SQLiteCursor(db.cursor())
+
+    def begin(self, cur: Cursor) -> None:
+        # take the write lock up front; WAL readers are never blocked by it
+        cur.execute("begin immediate")
+
+    def close(self, db: sqlite3.Connection) -> None:
+        db.close()
+
+    def upsert(self, cur: Cursor, upserts: list[Upsert]) -> list[int]:
+        rowcounts = []
+        for upsert in upserts:
+            insert = f"insert into {upsert.table} ({', '.join(upsert.columns)}) " \
+                + f"values ({', '.join(['%s'] * len(upsert.columns))}) on conflict do nothing"
+            update_columns = upsert.get_update_columns()
+            # only rewrite rows whose values differ, so an identical resubmission reports 0
+            update = f"update {upsert.table} set {', '.join([f'{column} = %s' for column in update_columns])} " \
+                + f"where {' and '.join([f'{column} = %s' for column in upsert.key_columns])} " \
+                + f"and ({', '.join(update_columns)}) is not ({', '.join(['%s'] * len(update_columns))})"
+
+            rowcount = 0
+            for row in upsert.rows:
+                cur.execute(insert, row)
+                if cur.rowcount > 0:
+                    rowcount += 1
+                elif upsert.update and len(update_columns) > 0:
+                    values = dict(zip(upsert.columns, row))
+                    new_values = [values[column] for column in update_columns]
+                    cur.execute(update, (*new_values, *[values[column] for column in upsert.key_columns], *new_values))
+                    rowcount += 2 * cur.rowcount
+            rowcounts.append(rowcount)
+        return rowcounts
+
+    def table_exists(self, cur: Cursor, table: str) -> bool:
+        cur.execute("select 1 from sqlite_master where type = 'table' and name = %s", (table,))
+        return len(cur.fetchall()) > 0
+
+    def create_table(self, cur: Cursor, table: str, columns: list[str], primary_key: list[str], indexes: dict[str, list[str]] = {}) -> None:
+        definitions = columns + [f"primary key ({', '.join(primary_key)})"]
+        # without rowid clusters rows on the primary key, like InnoDB
+        cur.execute(f"create table {table} ({', '.join(definitions)}) without rowid")
+        for name, index_columns in indexes.items():
+            cur.execute(f"create index {name} on {table} ({', '.join(index_columns)})")
+
+    def create_view(self, cur: Cursor, view: str, query: str) -> None:
+        cur.execute(f"drop view if exists {view}")
+        cur.execute(f"create view {view} as {query}")
+
+    def rename_tables(self, cur: Cursor, renames: list[tuple[str, str]]) -> None:
+        # atomic within the migration's transaction; views naming a renamed table follow it,
+        # so anything reading through views has to recreate them afterwards
+        for old, new in renames:
+            cur.execute(f"alter table {old} rename to {new}")
+
+    def explain(self, cur: Cursor, query: str, params: tuple) -> list[dict]:
+        cur.execute(f"explain query plan {query}", params)
+        plan = []
+        for row in cur.fetchall():
+            match = self.PLAN_PATTERN.match(row[3])
+            if match is None:
+                continue
+            operation, table, index, primary_key = match.groups()
+            key = index or ('PRIMARY' if primary_key else None)
+            access = 'ref' if operation == 'SEARCH' else ('index' if key else 'ALL')
+            plan.append({'table': table, 'type': access, 'possible_keys': key, 'key': key, 'Extra': row[3]})
+        return plan
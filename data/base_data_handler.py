@@ -1,66 +1,227 @@
 from datetime import date
-from typing import Protocol
-from mysql.connector import MySQLConnection, connect
-from mysql.connector.cursor import MySQLCursor
+from enum import Enum, auto
+from typing import TYPE_CHECKING, Awaitable, Callable, Protocol, TypeVar
+from data.backends import Cursor, MySQLBackend, SQLiteBackend, StorageBackend, Upsert
+from data.entry_store import EntryStore
+from data.migrations import MIGRATIONS, SHARED_MIGRATIONS
+from data.player_totals import PlayerTotals
+from data.query_cache import QueryCache
+from data.query_log import QueryLog
+from data.pool import DatabasePool, get_shared_pool
 from utils.bot_utilities import BotUtilities
 
+if TYPE_CHECKING:
+    import pandas as pd
+
+T = TypeVar('T')
+
+class EntryWriteResult(Enum):
+    INVALID = auto()
+    INSERTED = auto()
+    UPDATED = auto()
+    UNCHANGED = auto()
+
 class BaseDatabaseHandler(Protocol):
     _utils: BotUtilities
-    _db: MySQLConnection
-    _cur: MySQLCursor
+    _pool: DatabasePool
+    _backend: StorageBackend
+    _game: str
+    _shared: bool
     _arbitrary_date: date
     _arbitrary_date_puzzle: int
     _mysql_host: str
     _mysql_user: str
     _mysql_pass: str
     _mysql_db_name: str
+    _mysql_pool_size: int
+    _storage: str
+    _sqlite_path: str
+    _stats_type: type
+    _entry_columns: list[tuple[str, type]]
+    _entry_definitions: list[str]
+    _stores: dict[int, EntryStore]
+    _use_memory_store: bool
+    _totals: dict[int, PlayerTotals]
+    _use_player_totals: bool
+    _cache_writes: dict[int, int]
+    _query_cache: QueryCache
 
     def __init__(self, utils: BotUtilities) -> None:
         self._utils = utils
-        self._db = None
-        self._cur = None
+        # in-memory caches are built per guild, the first time one is needed
+        self._stores = {}
+        self._totals = {}
+        self._cache_writes = {}
+        self._pool = None
+        self._backend = None
 
     ####################
     # ABSTRACT METHODS #
     ####################
 
-    def add_entry(self, user_id: str, title: str, puzzle: str) -> bool:
+    def parse_entry(self, title: str, puzzle: str) -> tuple[int, tuple]:
+        pass
+
+    async def _query_leaderboard(self, guild_id: int, puzzle_list: list[int]) -> list[object]:
+        pass
+
+    def _get_totals_contribution(self, values: tuple) -> tuple:
+        pass
+
+    def _get_totals_contributions(self, entries: 'pd.DataFrame') -> 'pd.DataFrame':
+        # vectorized _get_totals_contribution: one row of contributions per entry
         pass
 
     ####################
     #   BASE METHODS   #
     ####################
 
-    def remove_entry(self, user_id: str, puzzle_id: int) -> bool:
-        if not self._db.is_connected():
-            self.connect()
-        self._cur.execute(f"delete from entries where user_id = {user_id} and puzzle_id = {puzzle_id}")
-        self._db.commit()
-        return self._cur.rowcount > 0
+    async def add_entry(self, guild_id: int, user_id: str, title: str, puzzle: str) -> bool:
+        return await self.upsert_entry(guild_id, user_id, title, puzzle) != EntryWriteResult.INVALID
+
+    async def upsert_entry(self, guild_id: int, user_id: str, title: str, puzzle: str) -> EntryWriteResult:
+        entry = self.parse_entry(title, puzzle)
+        if entry is None:
+            return EntryWriteResult.INVALID
+        return await self._upsert_entry(guild_id, user_id, *entry)
+
+    async def add_entries(self, guild_id: int, entries: list[tuple[str, str, str, str]], channel_id: int, message_id: int) -> int:
+        # bulk path for backfills: (user_id, user_name, title, puzzle) submissions from one of the guild's
+        # channels are written in one transaction together with the channel's new high-water mark
+        parsed = []
+        for user_id, user_name, title, puzzle in entries:
+            entry = self.parse_entry(title, puzzle)
+            if entry is not None:
+                parsed.append((user_id, user_name, *entry))
+        users = {user_id: user_name for user_id, user_name, _, _ in parsed}
+
+        def write_entries(cur: Cursor) -> list[int]:
+            return self._backend.upsert(cur, [
+                self._get_user_upsert([(guild_id, user_id, user_name) for user_id, user_name in users.items()]),
+                self._get_entry_upsert([(guild_id, puzzle_id, user_id, *values) for user_id, _, puzzle_id, values in parsed]),
+                self._get_scoped_upsert('backfill_marks', ['channel_id'], ['channel_id', 'message_id'], [(channel_id, message_id)])
+            ])
+
+        rowcounts = await self._transaction(write_entries)
+        if self.__players_changed(rowcounts):
+            self._players_through(guild_id)
+        for user_id, _, puzzle_id, values in parsed:
+            self._write_through(guild_id, user_id, puzzle_id, values)
+        return len(parsed)
+
+    async def add_submissions(self, submissions: list[tuple[int, str, str, str]]) -> list[bool]:
+        # batch path for the ingestion queue: (guild_id, user_id, title, puzzle) submissions, from any
+        # number of guilds, are written in one transaction; returns whether each one was valid, in order
+        parsed = [self.parse_entry(title, puzzle) for _, _, title, puzzle in submissions]
+        rows = [(guild_id, user_id, *entry) for (guild_id, user_id, _, _), entry in zip(submissions, parsed) if entry is not None]
+        if len(rows) > 0:
+            users = {(guild_id, user_id): self._utils.get_nickname(guild_id, user_id) for guild_id, user_id, _, _ in rows}
+
+            def write_entries(cur: Cursor) -> list[int]:
+                return self._backend.upsert(cur, [
+                    self._get_user_upsert([(guild_id, user_id, user_name) for (guild_id, user_id), user_name in users.items()]),
+                    self._get_entry_upsert([(guild_id, puzzle_id, user_id, *values) for guild_id, user_id, puzzle_id, values in rows])
+                ])
+
+            if self.__players_changed(await self._transaction(write_entries)):
+                for guild_id in set([guild_id for guild_id, _, _, _ in rows]):
+                    self._players_through(guild_id)
+            for guild_id, user_id, puzzle_id, values in rows:
+                self._write_through(guild_id, user_id, puzzle_id, values)
+        return [entry is not None for entry in parsed]
+
+    async def export_rows(self) -> tuple[list[tuple], list[tuple], list[tuple]]:
+        # every (guild_id, user_id, name), (guild_id, puzzle_id, user_id, *values) and (channel_id, message_id)
+        # row this game stores
+        column_names = ', '.join([name for name, _ in self._entry_columns])
+        where, params = self._get_scoped_where([], ())
+        users = await self._fetchall(f"select u.guild_id, u.user_id, u.name from users u "
+            + f"join {self._players_table} p on p.guild_id = u.guild_id and p.user_id = u.user_id") \
+            if self._shared else await self._fetchall("select guild_id, user_id, name from users")
+        entries = await self._fetchall(f"select guild_id, puzzle_id, user_id, {column_names} from {self._entries_table}")
+        marks = await self._fetchall(f"select channel_id, message_id from backfill_marks{f' where {where}' if where else ''}", params)
+        return users, entries, marks
+
+    async def import_rows(self, users: list[tuple], entries: list[tuple], marks: list[tuple]) -> None:
+        # rows as returned by export_rows, written in one transaction; existing users keep their name
+        def write_rows(cur: Cursor) -> list[int]:
+            return self._backend.upsert(cur, [
+                self._get_user_upsert(users),
+                self._get_entry_upsert(entries),
+                self._get_scoped_upsert('backfill_marks', ['channel_id'], ['channel_id', 'message_id'], marks)
+            ])
+
+        if self.__players_changed(await self._transaction(write_rows)):
+            for guild_id in set([int(guild_id) for guild_id, _, _ in users] + [int(guild_id) for guild_id, _, _, *_ in entries]):
+                self._players_through(guild_id)
+        for guild_id, puzzle_id, user_id, *values in entries:
+            self._write_through(int(guild_id), str(user_id), puzzle_id, tuple(values))
+
+    async def get_backfill_mark(self, channel_id: int) -> int:
+        where, params = self._get_scoped_where(['channel_id'], (channel_id,))
+        rows = await self._fetchall(f"select message_id from backfill_marks where {where}", params)
+        return int(rows[0][0]) if len(rows) > 0 else None
+
+    async def update_player_names(self, guild_id: int, names: dict[str, str]) -> None:
+        if len(names) == 0:
+            return
+
+        def update_names(cur: Cursor) -> None:
+            cur.executemany("update users set name = %s where guild_id = %s and user_id = %s and name <> %s",
+                [(name, guild_id, user_id, name) for user_id, name in names.items()])
+
+        await self._transaction(update_names)
+
+    async def remove_entry(self, guild_id: int, user_id: str, puzzle_id: int) -> bool:
+        where, params = self._get_scoped_where(['guild_id', 'user_id', 'puzzle_id'], (guild_id, user_id, puzzle_id))
+        rowcount = await self._execute(f"delete from entries where {where}", params)
+        if rowcount > 0:
+            self._remove_through(guild_id, user_id, puzzle_id)
+        return rowcount > 0
+
+    async def user_exists(self, guild_id: int, user_id: str) -> bool:
+        return len(await self._fetchall(f"select 1 from {self._players_table} where guild_id = %s and user_id = %s", (guild_id, user_id))) > 0
+
+    async def entry_exists(self, guild_id: int, user_id: str, puzzle_id: int) -> bool:
+        return len(await self._fetchall(f"select 1 from {self._entries_table} where guild_id = %s and user_id = %s and puzzle_id = %s",
+            (guild_id, user_id, puzzle_id))) > 0
+
+    async def connect(self) -> None:
+        if self._pool is None:
+            self._pool = get_shared_pool() if self._shared else self.__create_pool()
+            self._backend = self._pool.backend
+
+        await self._pool.open()
+        await self._migrate()
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.close()
+
+    ####################
+    #  GAME SCOPING    #
+    ####################
+
+    # with a shared database, every game's rows live in the same tables and each game reads its
+    # slice through views; writes name the game explicitly
 
-    def user_exists(self, user_id: str) -> bool:
-        if not self._db.is_connected():
-            self.connect()
-        self._cur.execute(f"select * from users where user_id = {user_id}")
-        return self._cur.rowcount > 0
+    @property
+    def _entries_table(self) -> str:
+        return f"{self._game}_entries" if self._shared else "entries"
 
-    def entry_exists(self, user_id: str, puzzle_id: int) -> bool:
-        if not self._db.is_connected():
-            self.connect()
-        self._cur.execute(f"select * from entries where user_id = {user_id} and puzzle_id = {puzzle_id}")
-        return self._cur.rowcount > 0
+    @property
+    def _players_table(self) -> str:
+        return f"{self._game}_players" if self._shared else "users"
 
-    def connect(self) -> None:
-        if not self._mysql_host:
-            raise Exception("Environment variable for MySQL HOST cannot be empty/null")
+    def _get_scoped_where(self, columns: list[str], params: tuple) -> tuple[str, tuple]:
+        if self._shared:
+            columns, params = ['game'] + columns, (self._game, *params)
+        return ' and '.join([f"{column} = %s" for column in columns]), params
 
-        self._db = connect(
-            host=self._mysql_host,
-            user=self._mysql_user,
-            password=self._mysql_pass,
-            database=self._mysql_db_name
-        )
-        self._cur = self._db.cursor(buffered=True)
+    def _get_scoped_upsert(self, table: str, key_columns: list[str], columns: list[str], rows: list[tuple]) -> Upsert:
+        if self._shared:
+            return Upsert(table, ['game'] + key_columns, ['game'] + columns, [(self._game, *row) for row in rows])
+        return Upsert(table, key_columns, columns, rows)
 
     ####################
     #  PUZZLE METHODS  #
@@ -75,33 +236,346 @@ class BaseDatabaseHandler(Protocol):
             return list(range(sunday_puzzle_id, sunday_puzzle_id + 7))
         return []
 
-    def get_all_puzzles(self) -> list[int]:
-        if not self._db.is_connected():
-            self.connect()
-        self._cur.execute("select distinct puzzle_id from entries")
-        return [row[0] for row in self._cur.fetchall()]
+    async def get_all_puzzles(self, guild_id: int) -> list[int]:
+        store = await self._get_store(guild_id)
+        if store is not None:
+            return store.get_all_puzzles()
+        return [row[0] for row in await self._fetchall(f"select distinct puzzle_id from {self._entries_table} where guild_id = %s", (guild_id,))]
 
     ####################
     #  PLAYER METHODS  #
     ####################
 
-    def get_all_players(self) -> list[str]:
-        if not self._db.is_connected():
-            self.connect()
-        self._cur.execute("select distinct user_id from users")
-        return [row[0] for row in self._cur.fetchall()]
+    async def get_all_players(self, guild_id: int) -> list[str]:
+        store = await self._get_store(guild_id)
+        if store is not None:
+            return store.get_all_players()
+        return [str(row[0]) for row in await self._fetchall(f"select user_id from {self._players_table} where guild_id = %s", (guild_id,))]
 
-    def get_puzzles_by_player(self, user_id) -> list[int]:
-        if not self._db.is_connected():
-            self.connect()
-        self._cur.execute(f"select distinct puzzle_id from entries where user_id = {user_id}")
-        return [row[0] for row in self._cur.fetchall()]
+    async def get_puzzles_by_player(self, guild_id: int, user_id: str) -> list[int]:
+        store = await self._get_store(guild_id)
+        if store is not None:
+            return store.get_puzzles_by_player(user_id)
+        return [row[0] for row in await self._fetchall(f"select puzzle_id from {self._entries_table} where guild_id = %s and user_id = %s", (guild_id, user_id))]
 
-    def get_players_by_puzzle_id(self, puzzle_id: int) -> list[str]:
-        if not self._db.is_connected():
-            self.connect()
-        self._cur.execute(f"select distinct user_id from entries where puzzle_id = {puzzle_id}")
-        return [row[0] for row in self._cur.fetchall()]
+    async def get_players_by_puzzle_id(self, guild_id: int, puzzle_id: int) -> list[str]:
+        store = await self._get_store(guild_id)
+        if store is not None:
+            return store.get_players_by_puzzle_id(puzzle_id)
+        return [str(row[0]) for row in await self._fetchall(f"select user_id from {self._entries_table} where guild_id = %s and puzzle_id = %s", (guild_id, puzzle_id))]
 
-    def get_entries_by_player(self, user_id: str, puzzle_list: list[int] = []) -> list[object]:
+    async def get_entries_by_player(self, guild_id: int, user_id: str, puzzle_list: list[int] = []) -> list[object]:
         pass
+
+    async def get_missing_players(self, guild_id: int, puzzle_id: int) -> list[str]:
+        async def query() -> list[str]:
+            store = await self._get_store(guild_id)
+            if store is not None:
+                return store.get_missing_players(puzzle_id)
+            # anti-join: the guild's tracked players without an entry for the puzzle
+            rows = await self._fetchall(f"select p.user_id from {self._players_table} p left join {self._entries_table} e "
+                + "on e.guild_id = p.guild_id and e.user_id = p.user_id and e.puzzle_id = %s where p.guild_id = %s and e.user_id is null", (puzzle_id, guild_id))
+            return [str(row[0]) for row in rows]
+        return await self._get_cached(guild_id, 'missing', [puzzle_id], None, query)
+
+    async def get_leaderboard(self, guild_id: int, puzzle_list: list[int]) -> list[object]:
+        if not puzzle_list or len(puzzle_list) == 0:
+            return []
+
+        async def query() -> list[object]:
+            totals = await self._get_totals(guild_id)
+            if totals is not None and totals.covers(puzzle_list):
+                return [self._stats_type(p_id, len(puzzle_list), *player_totals) for p_id, player_totals in totals.get_totals()]
+            return await self._query_leaderboard(guild_id, puzzle_list)
+        return await self._get_cached(guild_id, 'leaderboard', puzzle_list, None, query)
+
+    async def get_players_stats(self, guild_id: int, user_ids: list[str]) -> list[object]:
+        # each player's stats over the puzzles they have entered, in the order given
+        if len(user_ids) == 0:
+            return []
+        user_ids = [str(user_id) for user_id in user_ids]
+
+        async def query() -> list[object]:
+            unique_ids = list(dict.fromkeys(user_ids))
+            store = await self._get_store(guild_id)
+            if store is not None:
+                rows = [(user_id, *row) for user_id in unique_ids for row in store.get_rows_by_player(user_id)]
+            else:
+                column_names = ', '.join([name for name, _ in self._entry_columns])
+                rows = await self._fetchall(f"select user_id, puzzle_id, {column_names} from {self._entries_table} "
+                    + f"where guild_id = %s and user_id in {self._get_in_clause(unique_ids)}", (guild_id, *unique_ids))
+            return self._get_stats_from_rows(rows)
+
+        stats = {player_stats.user_id: player_stats for player_stats in await self._get_cached(guild_id, 'stats', None, user_ids, query)}
+        return [stats[user_id] if user_id in stats else self._stats_type(user_id) for user_id in user_ids]
+
+    ####################
+    # IN-MEMORY CACHES #
+    ####################
+
+    def get_query_cache_counters(self) -> dict[str, int]:
+        return self._query_cache.get_counters()
+
+    def get_query_log(self) -> QueryLog:
+        # per-statement counts and timings of this handler's pool (shared by every game in a shared database)
+        return self._pool.query_log if self._pool is not None else None
+
+    async def load_guilds(self, guild_ids: list[int]) -> None:
+        # builds the in-memory caches of the guilds that don't have them yet, in one read for all of them;
+        # a shard only ever loads the guilds it serves
+        guild_ids = [guild_id for guild_id in dict.fromkeys(guild_ids) if self.__needs_caches(guild_id)]
+        if len(guild_ids) == 0:
+            return
+
+        writes = {guild_id: self._cache_writes.get(guild_id, 0) for guild_id in guild_ids}
+        column_names = ', '.join([name for name, _ in self._entry_columns])
+        in_clause = self._get_in_clause(guild_ids)
+        rows = await self._fetchall(f"select guild_id, puzzle_id, user_id, {column_names} from {self._entries_table} where guild_id in {in_clause}", tuple(guild_ids))
+        players = await self._fetchall(f"select guild_id, user_id from {self._players_table} where guild_id in {in_clause}", tuple(guild_ids))
+
+        guild_rows = {guild_id: [] for guild_id in guild_ids}
+        for guild_id, *row in rows:
+            guild_rows[int(guild_id)].append(row)
+        guild_players = {guild_id: [] for guild_id in guild_ids}
+        for guild_id, user_id in players:
+            guild_players[int(guild_id)].append(str(user_id))
+
+        for guild_id in guild_ids:
+            # a write that committed while this was reading can be missing from it; the next lookup reads again
+            if self._cache_writes.get(guild_id, 0) != writes[guild_id]:
+                continue
+
+            if self._use_memory_store and guild_id not in self._stores:
+                store = EntryStore(self._entry_columns)
+                store.load(guild_players[guild_id], guild_rows[guild_id])
+                self._stores[guild_id] = store
+
+            if self._use_player_totals and guild_id not in self._totals:
+                # leaderboards only rank tracked players
+                tracked = set(guild_players[guild_id])
+                totals = PlayerTotals(self._get_totals_contribution)
+                totals.load([row for row in guild_rows[guild_id] if str(row[1]) in tracked])
+                self._totals[guild_id] = totals
+
+    def unload_guild(self, guild_id: int) -> None:
+        # for a guild the bot has left; its caches are rebuilt from the database if it comes back
+        self._stores.pop(guild_id, None)
+        self._totals.pop(guild_id, None)
+        self._query_cache.invalidate(lambda key: key[1] == guild_id)
+
+    async def _get_store(self, guild_id: int) -> EntryStore:
+        if not self._use_memory_store:
+            return None
+        await self.load_guilds([guild_id])
+        return self._stores.get(guild_id)
+
+    async def _get_totals(self, guild_id: int) -> PlayerTotals:
+        if not self._use_player_totals:
+            return None
+        await self.load_guilds([guild_id])
+        return self._totals.get(guild_id)
+
+    def __needs_caches(self, guild_id: int) -> bool:
+        return (self._use_memory_store and guild_id not in self._stores) or (self._use_player_totals and guild_id not in self._totals)
+
+    # called once a write has committed, so the caches never run ahead of the database
+
+    def _write_through(self, guild_id: int, user_id: str, puzzle_id: int, values: tuple) -> None:
+        self._cache_writes[guild_id] = self._cache_writes.get(guild_id, 0) + 1
+        self._query_cache.invalidate_puzzle(puzzle_id, guild_id)
+        store = self._stores.get(guild_id)
+        if store is not None:
+            store.add_player(user_id)
+            store.upsert(puzzle_id, user_id, values)
+        totals = self._totals.get(guild_id)
+        if totals is not None:
+            totals.apply(user_id, puzzle_id, values)
+
+    def _remove_through(self, guild_id: int, user_id: str, puzzle_id: int) -> None:
+        self._cache_writes[guild_id] = self._cache_writes.get(guild_id, 0) + 1
+        self._query_cache.invalidate_puzzle(puzzle_id, guild_id)
+        if self._shared:
+            # a shared database derives each game's players from its entries
+            self._players_through(guild_id)
+        store = self._stores.get(guild_id)
+        if store is not None:
+            store.remove(user_id, puzzle_id, drop_player=self._shared)
+        totals = self._totals.get(guild_id)
+        if totals is not None:
+            totals.remove(user_id, puzzle_id)
+
+    def _players_through(self, guild_id: int) -> None:
+        # a new player is missing every puzzle they haven't submitted, not just the one being written
+        self._cache_writes[guild_id] = self._cache_writes.get(guild_id, 0) + 1
+        self._query_cache.invalidate(lambda key: key[1] == guild_id and key[2] == 'missing')
+
+    async def _get_cached(self, guild_id: int, query_type: str, puzzle_list: list[int], user_ids: list[str], query: Callable[[], Awaitable[T]]) -> T:
+        # a puzzle_list of None caches a result that every write to the guild invalidates
+        key = (self._game, guild_id, query_type, None if puzzle_list is None else frozenset(puzzle_list), None if user_ids is None else frozenset(user_ids))
+        found, result = self._query_cache.get(key)
+        if not found:
+            writes = self._cache_writes.get(guild_id, 0)
+            result = await query()
+            # a write that committed while this was querying can be missing from it, so it isn't kept
+            if self._cache_writes.get(guild_id, 0) == writes:
+                self._query_cache.put(key, key[3], result, guild_id)
+        # callers sort and rank the lists they get back, so each gets its own
+        return list(result)
+
+    ####################
+    #   STATS ENGINE   #
+    ####################
+
+    def _get_stats_from_rows(self, rows: list[tuple], puzzle_count: int = None) -> list[object]:
+        # rows are (user_id, puzzle_id, *entry columns); every player is totalled in one grouped pass.
+        # without a puzzle_count, each player is measured against the puzzles they entered
+        import pandas as pd
+
+        column_names = [name for name, _ in self._entry_columns]
+        entries = pd.DataFrame(rows, columns=['user_id', 'puzzle_id'] + column_names)
+        if len(entries) == 0:
+            return []
+        totals = self._get_totals_contributions(entries).groupby(entries['user_id'].astype(str), sort=False).sum()
+        # tolist() per column hands the stats types plain ints/floats, which get_mean relies on
+        columns = [totals[column].tolist() for column in totals.columns]
+        return [self._stats_type(user_id, entry_count if puzzle_count is None else puzzle_count, entry_count, *values)
+            for user_id, entry_count, *values in zip(totals.index.tolist(), *columns)]
+
+    async def _get_rows_by_player(self, query: str, guild_id: int, user_id: str, puzzle_list: list[int]) -> list[tuple]:
+        store = await self._get_store(guild_id)
+        if store is not None:
+            return store.get_rows_by_player(user_id, puzzle_list)
+        return await self._fetchall(query, (guild_id, user_id, *puzzle_list))
+
+    ####################
+    #    MIGRATIONS    #
+    ####################
+
+    async def _migrate(self) -> None:
+        def create_migrations_table(cur: Cursor) -> None:
+            if not self._backend.table_exists(cur, 'schema_migrations'):
+                self._backend.create_table(cur, 'schema_migrations', [
+                    'version int not null',
+                    'description varchar(255) not null',
+                    'applied_at timestamp not null default current_timestamp'
+                ], primary_key=['version'])
+
+        await self._transaction(create_migrations_table)
+        applied = set([row[0] for row in await self._fetchall("select version from schema_migrations")])
+        for migration in SHARED_MIGRATIONS if self._shared else MIGRATIONS:
+            if migration.version in applied:
+                continue
+
+            def apply(cur: Cursor) -> None:
+                migration.apply(cur, self._backend, self._entry_definitions)
+                cur.execute("insert into schema_migrations (version, description) values (%s, %s)", (migration.version, migration.description))
+
+            print(f"Migrating {self._pool.name} to schema version {migration.version}: {migration.description}")
+            await self._transaction(apply)
+
+    async def get_query_plans(self, guild_id: int, user_id: str, puzzle_list: list[int]) -> list[tuple[str, list[dict]]]:
+        # runs the handler's read queries against SQL (caches bypassed) and returns each one's EXPLAIN rows
+        queries: list[tuple[str, tuple]] = []
+        fetchall = self._fetchall
+
+        async def record(query: str, params: tuple = ()) -> list[tuple]:
+            queries.append((query, params))
+            return await fetchall(query, params)
+
+        use_memory_store, use_player_totals, query_cache = self._use_memory_store, self._use_player_totals, self._query_cache
+        self._fetchall, self._use_memory_store, self._use_player_totals, self._query_cache = record, False, False, QueryCache(0, 0)
+        try:
+            await self.get_all_puzzles(guild_id)
+            await self.get_all_players(guild_id)
+            await self.get_puzzles_by_player(guild_id, user_id)
+            await self.get_players_by_puzzle_id(guild_id, puzzle_list[0])
+            await self.get_missing_players(guild_id, puzzle_list[0])
+            await self.get_entries_by_player(guild_id, user_id)
+            await self.get_entries_by_player(guild_id, user_id, puzzle_list)
+            await self._query_leaderboard(guild_id, puzzle_list)
+            await self.user_exists(guild_id, user_id)
+            await self.entry_exists(guild_id, user_id, puzzle_list[0])
+        finally:
+            self._fetchall, self._use_memory_store, self._use_player_totals, self._query_cache = fetchall, use_memory_store, use_player_totals, query_cache
+
+        plans = []
+        for query, params in queries:
+            plans.append((query, await self._pool.explain(query, params)))
+        return plans
+
+    ####################
+    #  ENTRY WRITES    #
+    ####################
+
+    async def _upsert_entry(self, guild_id: int, user_id: str, puzzle_id: int, values: tuple) -> EntryWriteResult:
+        user_name = self._utils.get_nickname(guild_id, user_id)
+
+        def write_entry(cur: Cursor) -> tuple[list[int], EntryWriteResult]:
+            rowcounts = self._backend.upsert(cur, [
+                self._get_user_upsert([(guild_id, user_id, user_name)]),
+                self._get_entry_upsert([(guild_id, puzzle_id, user_id, *values)])
+            ])
+            # affected rows for an upsert: 1 inserted, 2 updated, 0 already identical
+            match rowcounts[-1]:
+                case 1:
+                    return rowcounts, EntryWriteResult.INSERTED
+                case 2:
+                    return rowcounts, EntryWriteResult.UPDATED
+                case _:
+                    return rowcounts, EntryWriteResult.UNCHANGED
+
+        rowcounts, result = await self._transaction(write_entry)
+        if self.__players_changed(rowcounts):
+            self._players_through(guild_id)
+        if result != EntryWriteResult.UNCHANGED:
+            self._write_through(guild_id, user_id, puzzle_id, values)
+        return result
+
+    def __players_changed(self, rowcounts: list[int]) -> bool:
+        # rowcounts of a users upsert followed by an entries upsert
+        return rowcounts[0] > 0 or (self._shared and rowcounts[1] > 0)
+
+    def _get_user_upsert(self, rows: list[tuple]) -> Upsert:
+        # (guild_id, user_id, name) rows; existing users keep their stored name
+        return Upsert('users', ['guild_id', 'user_id'], ['guild_id', 'user_id', 'name'], rows, update=False)
+
+    def _get_entry_upsert(self, rows: list[tuple]) -> Upsert:
+        # (guild_id, puzzle_id, user_id, *values) rows
+        column_names = [name for name, _ in self._entry_columns]
+        return self._get_scoped_upsert('entries', ['guild_id', 'user_id', 'puzzle_id'], ['guild_id', 'puzzle_id', 'user_id'] + column_names, rows)
+
+    ####################
+    #  QUERY METHODS   #
+    ####################
+
+    async def _fetchall(self, query: str, params: tuple = ()) -> list[tuple]:
+        await self.__ensure_connected()
+        with self._utils.perf.stage('sql', query=True), self._utils.metrics.time('nyt_sql_query_duration_seconds', game=self._game):
+            return await self._pool.fetchall(query, params)
+
+    async def _execute(self, query: str, params: tuple = ()) -> int:
+        return await self._transaction(lambda cur: self.__execute(cur, query, params))
+
+    async def _transaction(self, work: Callable[[Cursor], T]) -> T:
+        await self.__ensure_connected()
+        with self._utils.perf.stage('sql', query=True), self._utils.metrics.time('nyt_sql_query_duration_seconds', game=self._game):
+            return await self._pool.transaction(work)
+
+    def _get_in_clause(self, values: list) -> str:
+        return f"({','.join(['%s'] * len(values))})"
+
+    async def __ensure_connected(self) -> None:
+        if self._pool is None:
+            await self.connect()
+
+    def __create_pool(self) -> DatabasePool:
+        match self._storage:
+            case 'sqlite':
+                backend = SQLiteBackend(self._sqlite_path)
+            case _:
+                backend = MySQLBackend(self._mysql_host, self._mysql_user, self._mysql_pass, self._mysql_db_name)
+        return DatabasePool(backend, self._mysql_pool_size, self._mysql_db_name)
+
+    def __execute(self, cur: Cursor, query: str, params: tuple) -> int:
+        cur.execute(query, params)
+        return cur.rowcount
@@ -1,10 +1,16 @@
 import os, re
+import numpy as np
 from collections import Counter
 from datetime import date
+from typing import TYPE_CHECKING
 from data.base_data_handler import BaseDatabaseHandler
-from models.connections import ConnectionsPuzzleEntry
+from data.query_cache import QueryCache
+from models.connections import ConnectionsPlayerStats, ConnectionsPuzzleEntry
 from utils.bot_utilities import BotUtilities
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 class ConnectionsDatabaseHandler(BaseDatabaseHandler):
     def __init__(self, utils: BotUtilities) -> None:
         # init
@@ -19,60 +25,73 @@ class ConnectionsDatabaseHandler(BaseDatabaseHandler):
         self._mysql_user = os.environ.get('CONNECTIONS_MYSQL_USER', "root")
         self._mysql_pass = os.environ.get('CONNECTIONS_MYSQL_PASS', "")
         self._mysql_db_name = os.environ.get('CONNECTIONS_MYSQL_DB_NAME', "connections")
+        self._mysql_pool_size = int(os.environ.get('CONNECTIONS_MYSQL_POOL_SIZE', 4))
+
+        # storage backend: 'mysql' (default) or an embedded 'sqlite' database file
+        self._storage = os.environ.get('CONNECTIONS_STORAGE', "mysql").lower()
+        self._sqlite_path = os.environ.get('CONNECTIONS_SQLITE_PATH', "connections.db")
+
+        # one database for every game (SHARED_* settings) instead of this game's own
+        self._game = 'connections'
+        self._shared = os.environ.get('SHARED_DATABASE', "false").lower() in ['1', 'true', 'yes']
+
+        # in-memory caches
+        self._stats_type = ConnectionsPlayerStats
+        self._use_memory_store = os.environ.get('CONNECTIONS_MEMORY_STORE', "false").lower() in ['1', 'true', 'yes']
+        self._use_player_totals = os.environ.get('CONNECTIONS_PLAYER_TOTALS', "false").lower() in ['1', 'true', 'yes']
+        self._entry_columns = [('score', np.int8), ('puzzle_str', object)]
+
+        # leaderboard/missing/stats results, dropped when an entry for one of their puzzles changes
+        self._query_cache = QueryCache(int(os.environ.get('CONNECTIONS_QUERY_CACHE_SIZE', 128)), float(os.environ.get('CONNECTIONS_QUERY_CACHE_TTL', 300)))
+
+        # schema
+        self._entry_definitions = ['score tinyint unsigned not null', 'puzzle_str text not null']
 
     ####################
     #  PUZZLE METHODS  #
     ####################
 
-    def add_entry(self, user_id: str, title: str, puzzle: str) -> bool:
+    def parse_entry(self, title: str, puzzle: str) -> tuple[int, tuple]:
         puzzle_id_title = re.findall(r'[\d,]+', title)
         score = self.__get_score_from_puzzle(puzzle)
 
         if puzzle_id_title:
             puzzle_id = int(str(puzzle_id_title[0]).replace(',', ''))
         else:
-            return False
-
-        if not self._db.is_connected():
-            self.connect()
-
-        if not self.user_exists(user_id):
-            user_name = self._utils.get_nickname(user_id)
-            self._cur.execute("insert into users (user_id, name) values ('{}', '{}')".format(user_id, user_name))
-
-        if self.entry_exists(user_id, puzzle_id):
-            self._cur.execute(
-                f"update entries set score = {score}, puzzle_str = '{puzzle}' "
-                    + f"where user_id = '{user_id}' and puzzle_id = '{puzzle_id}'"
-            )
-            self._db.commit()
-            return True
-        else:
-            self._cur.execute(
-                "insert into entries (puzzle_id, user_id, score, puzzle_str) "
-                    + f"values ({puzzle_id}, {user_id}, {score}, '{puzzle}')"
-            )
-            self._db.commit()
-            return self._cur.rowcount > 0
+            return None
+
+        return puzzle_id, (score, puzzle)
 
     ####################
     #  PLAYER METHODS  #
     ####################
 
-    def get_entries_by_player(self, user_id: str, puzzle_list: list[int] = []) -> list[ConnectionsPuzzleEntry]:
-        if not self._db.is_connected():
-            self.connect()
+    async def get_entries_by_player(self, guild_id: int, user_id: str, puzzle_list: list[int] = []) -> list[ConnectionsPuzzleEntry]:
         if not puzzle_list or len(puzzle_list) == 0:
-            query = f"select puzzle_id, score, puzzle_str from entries where user_id = {user_id}"
+            query = f"select puzzle_id, score, puzzle_str from {self._entries_table} where guild_id = %s and user_id = %s"
         else:
-            puzzle_list_str = ','.join([str(p_id) for p_id in puzzle_list])
-            query = f"select puzzle_id, score, puzzle_str from entries where user_id = {user_id} and puzzle_id in ({puzzle_list_str})"
-        self._cur.execute(query)
+            query = f"select puzzle_id, score, puzzle_str from {self._entries_table} where guild_id = %s and user_id = %s and puzzle_id in {self._get_in_clause(puzzle_list)}"
         entries: list[ConnectionsPuzzleEntry] = []
-        for row in self._cur.fetchall():
+        for row in await self._get_rows_by_player(query, guild_id, user_id, puzzle_list):
             entries.append(ConnectionsPuzzleEntry(row[0], user_id, row[1], row[2]))
         return entries
 
+    async def _query_leaderboard(self, guild_id: int, puzzle_list: list[int]) -> list[ConnectionsPlayerStats]:
+        query = f"select user_id, count(*), sum(score) from {self._entries_table} " \
+            + f"where guild_id = %s and puzzle_id in {self._get_in_clause(puzzle_list)} and user_id in (select user_id from {self._players_table} where guild_id = %s)"
+        params = (guild_id, *puzzle_list, guild_id)
+        stats: list[ConnectionsPlayerStats] = []
+        for row in await self._fetchall(query + " group by user_id", params):
+            stats.append(ConnectionsPlayerStats(str(row[0]), len(puzzle_list), int(row[1]), int(row[2])))
+        return stats
+
+    def _get_totals_contribution(self, values: tuple) -> tuple:
+        score, _ = values
+        return 1, int(score)
+
+    def _get_totals_contributions(self, entries: 'pd.DataFrame') -> 'pd.DataFrame':
+        return entries[['score']].astype('int64').assign(entries=1)[['entries', 'score']]
+
     ####################
     #  HELPER METHODS  #
     ####################
@@ -0,0 +1,53 @@
+"""Copies the per-game databases into one shared database.
+
+Reads every configured game database (the *_MYSQL_* or *_STORAGE/*_SQLITE_PATH
+environment variables) and writes its users, entries and backfill marks into the
+database configured by the SHARED_* variables, in batches of BATCH_SIZE entries per
+transaction. Rows already present are overwritten, so the copy can be re-run.
+
+Run from the repository root, with the bot stopped:
+    python -m data.consolidate
+then start the bot with SHARED_DATABASE=true.
+"""
+import asyncio, os, time
+from data.base_data_handler import BaseDatabaseHandler
+from data.connections import ConnectionsDatabaseHandler
+from data.strands import StrandsDatabaseHandler
+from data.wordle import WordleDatabaseHandler
+from utils.bot_utilities import BotUtilities
+
+BATCH_SIZE = 1000
+HANDLERS = [('WORDLE', WordleDatabaseHandler), ('CONNECTIONS', ConnectionsDatabaseHandler), ('STRANDS', StrandsDatabaseHandler)]
+
+async def copy(name: str, source: BaseDatabaseHandler, target: BaseDatabaseHandler) -> None:
+    start = time.perf_counter()
+    users, entries, marks = await source.export_rows()
+    await target.import_rows(users, [], marks)
+    for i in range(0, len(entries), BATCH_SIZE):
+        await target.import_rows([], entries[i:i + BATCH_SIZE], [])
+
+    elapsed = time.perf_counter() - start
+    print(f"{name}: {len(users)} users, {len(entries)} entries, {len(marks)} backfill marks "
+        + f"in {elapsed:.1f}s ({len(entries) / max(elapsed, 1e-9):.0f} entries/s)")
+
+async def main() -> None:
+    utils = BotUtilities(None)
+    for name, handler_type in HANDLERS:
+        if not (os.environ.get(f'{name}_MYSQL_HOST') or os.environ.get(f'{name}_STORAGE', '').lower() == 'sqlite'):
+            continue
+
+        source, target = handler_type(utils), handler_type(utils)
+        source._shared, target._shared = False, True
+        # the copy never reads through the in-memory caches, so skip loading them
+        for db in (source, target):
+            db._use_memory_store, db._use_player_totals = False, False
+        try:
+            await source.connect()
+            await target.connect()
+            await copy(name, source, target)
+        finally:
+            source.close()
+            target.close()
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,130 @@
+import numpy as np
+
+class EntryStore():
+    INITIAL_CAPACITY: int = 1024
+
+    def __init__(self, columns: list[tuple[str, type]]) -> None:
+        self.columns: list[tuple[str, type]] = columns
+        self._size: int = 0
+        self._puzzle_ids: np.ndarray = np.empty(self.INITIAL_CAPACITY, dtype=np.int32)
+        self._user_indexes: np.ndarray = np.empty(self.INITIAL_CAPACITY, dtype=np.int32)
+        self._values: list[np.ndarray] = [np.empty(self.INITIAL_CAPACITY, dtype=dtype) for _, dtype in columns]
+
+        # user ids are stored once and referenced by index from the entry columns
+        self._user_ids: list[str] = []
+        self._user_index: dict[str, int] = {}
+        self._players: dict[str, None] = {}
+        self._rows: dict[tuple[int, int], int] = {}
+        # entries per user index, so a player's last entry can be recognised without a scan
+        self._entry_counts: dict[int, int] = {}
+        # who has entered each puzzle, so ?missing is a set difference rather than a column scan
+        self._puzzle_players: dict[int, set[str]] = {}
+
+    ####################
+    #     LOADING      #
+    ####################
+
+    def load(self, players: list[str], rows: list[tuple]) -> None:
+        for user_id in players:
+            self.add_player(user_id)
+        for row in rows:
+            self.upsert(row[0], row[1], row[2:])
+
+    ####################
+    #     WRITES       #
+    ####################
+
+    def add_player(self, user_id: str) -> None:
+        self._players[str(user_id)] = None
+
+    def upsert(self, puzzle_id: int, user_id: str, values: tuple) -> None:
+        user_index = self.__get_user_index(str(user_id))
+        row = self._rows.get((user_index, int(puzzle_id)))
+        if row is None:
+            if self._size == len(self._puzzle_ids):
+                self.__grow()
+            row = self._size
+            self._size += 1
+            self._puzzle_ids[row] = puzzle_id
+            self._user_indexes[row] = user_index
+            self._rows[(user_index, int(puzzle_id))] = row
+            self._entry_counts[user_index] = self._entry_counts.get(user_index, 0) + 1
+            self._puzzle_players.setdefault(int(puzzle_id), set()).add(str(user_id))
+        for column, value in zip(self._values, values):
+            column[row] = value
+
+    def remove(self, user_id: str, puzzle_id: int, drop_player: bool = False) -> bool:
+        # drop_player stops tracking a player once their last entry is gone, for players derived from entries
+        user_index = self._user_index.get(str(user_id))
+        row = self._rows.pop((user_index, int(puzzle_id)), None)
+        if row is None:
+            return False
+        self._puzzle_players[int(puzzle_id)].discard(str(user_id))
+        if len(self._puzzle_players[int(puzzle_id)]) == 0:
+            del self._puzzle_players[int(puzzle_id)]
+        self._entry_counts[user_index] -= 1
+        if self._entry_counts[user_index] == 0:
+            del self._entry_counts[user_index]
+            if drop_player:
+                self._players.pop(str(user_id), None)
+
+        # keep the columns dense by moving the last entry into the freed row
+        last = self._size - 1
+        if row != last:
+            self._puzzle_ids[row] = self._puzzle_ids[last]
+            self._user_indexes[row] = self._user_indexes[last]
+            for column in self._values:
+                column[row] = column[last]
+            self._rows[(int(self._user_indexes[row]), int(self._puzzle_ids[row]))] = row
+        self._size = last
+        return True
+
+    ####################
+    #     QUERIES      #
+    ####################
+
+    def get_all_players(self) -> list[str]:
+        return list(self._players)
+
+    def get_all_puzzles(self) -> list[int]:
+        return np.unique(self._puzzle_ids[:self._size]).tolist()
+
+    def get_puzzles_by_player(self, user_id: str) -> list[int]:
+        return self._puzzle_ids[:self._size][self.__get_player_mask(user_id)].tolist()
+
+    def get_players_by_puzzle_id(self, puzzle_id: int) -> list[str]:
+        user_indexes = self._user_indexes[:self._size][self._puzzle_ids[:self._size] == puzzle_id]
+        return [self._user_ids[i] for i in user_indexes]
+
+    def get_missing_players(self, puzzle_id: int) -> list[str]:
+        participants = self._puzzle_players.get(int(puzzle_id), set())
+        return [user_id for user_id in self._players if user_id not in participants]
+
+    def get_rows_by_player(self, user_id: str, puzzle_list: list[int] = []) -> list[tuple]:
+        mask = self.__get_player_mask(user_id)
+        if puzzle_list:
+            mask &= np.isin(self._puzzle_ids[:self._size], puzzle_list)
+        rows = np.flatnonzero(mask)
+        puzzle_ids = self._puzzle_ids[rows].tolist()
+        values = [column[rows].tolist() for column in self._values]
+        return list(zip(puzzle_ids, *values))
+
+    ####################
+    #     HELPERS      #
+    ####################
+
+    def __get_player_mask(self, user_id: str) -> np.ndarray:
+        user_index = self._user_index.get(str(user_id), -1)
+        return self._user_indexes[:self._size] == user_index
+
+    def __get_user_index(self, user_id: str) -> int:
+        if user_id not in self._user_index:
+            self._user_index[user_id] = len(self._user_ids)
+            self._user_ids.append(user_id)
+        return self._user_index[user_id]
+
+    def __grow(self) -> None:
+        capacity = len(self._puzzle_ids) * 2
+        self._puzzle_ids = np.resize(self._puzzle_ids, capacity)
+        self._user_indexes = np.resize(self._user_indexes, capacity)
+        self._values = [np.resize(column, capacity) for column in self._values]
@@ -0,0 +1,153 @@
+import os
+from typing import Callable
+from data.backends import Cursor, StorageBackend
+
+class Migration():
+    def __init__(self, version: int, description: str, apply: Callable[[Cursor, StorageBackend, list[str]], None]) -> None:
+        self.version: int = version
+        self.description: str = description
+        # receives a cursor, the storage backend and the game's entry column definitions, e.g. ['score tinyint not null', ...]
+        self.apply: Callable[[Cursor, StorageBackend, list[str]], None] = apply
+
+####################
+#    MIGRATIONS    #
+####################
+
+USER_COLUMNS: list[str] = ['user_id bigint unsigned not null', "name varchar(255) not null default ''"]
+ENTRY_KEY_COLUMNS: list[str] = ['puzzle_id int not null', 'user_id bigint unsigned not null']
+GUILD_COLUMN: str = 'guild_id bigint unsigned not null'
+
+def _create_keyed_tables(cur: Cursor, backend: StorageBackend, entry_definitions: list[str]) -> None:
+    # discord ids are snowflakes; older versions stored them as text and queried them both quoted
+    # and unquoted, which made every numeric comparison a full scan
+    def create_users(table: str) -> None:
+        backend.create_table(cur, table, USER_COLUMNS, primary_key=['user_id'])
+
+    def create_entries(table: str) -> None:
+        backend.create_table(cur, table, ENTRY_KEY_COLUMNS + entry_definitions,
+            primary_key=['user_id', 'puzzle_id'], indexes={'entries_puzzle_id': ['puzzle_id']})
+
+    column_names = [definition.split()[0] for definition in entry_definitions]
+
+    # existing tables can only come from the MySQL versions of the bot, so the copies use MySQL syntax
+    if not backend.table_exists(cur, 'users'):
+        create_users('users')
+    else:
+        _rebuild_table(cur, backend, 1, 'users', create_users,
+            "insert into users_migrating (user_id, name) "
+                + "select cast(user_id as unsigned), coalesce(max(name), '') from users "
+                + "where user_id regexp '^[0-9]+$' group by cast(user_id as unsigned)")
+
+    if not backend.table_exists(cur, 'entries'):
+        create_entries('entries')
+    else:
+        # duplicate (user_id, puzzle_id) rows collapse into one, the way an upsert would have left them
+        _rebuild_table(cur, backend, 1, 'entries', create_entries,
+            f"insert into entries_migrating (puzzle_id, user_id, {', '.join(column_names)}) "
+                + f"select puzzle_id, cast(user_id as unsigned), {', '.join(column_names)} from entries "
+                + "where user_id regexp '^[0-9]+$' "
+                + f"on duplicate key update {', '.join([f'{name} = values({name})' for name in column_names])}")
+
+def _create_backfill_marks(cur: Cursor, backend: StorageBackend, entry_definitions: list[str]) -> None:
+    if not backend.table_exists(cur, 'backfill_marks'):
+        backend.create_table(cur, 'backfill_marks', ['channel_id bigint unsigned not null', 'message_id bigint unsigned not null'],
+            primary_key=['channel_id'])
+
+def _add_guild_ids(cur: Cursor, backend: StorageBackend, entry_definitions: list[str]) -> None:
+    # players and entries belong to the guild they were posted in; the same player can be tracked in several
+    def create_users(table: str) -> None:
+        backend.create_table(cur, table, [GUILD_COLUMN] + USER_COLUMNS, primary_key=['guild_id', 'user_id'])
+
+    def create_entries(table: str) -> None:
+        backend.create_table(cur, table, [GUILD_COLUMN] + ENTRY_KEY_COLUMNS + entry_definitions,
+            primary_key=['guild_id', 'user_id', 'puzzle_id'], indexes={'entries_guild_puzzle_id': ['guild_id', 'puzzle_id']})
+
+    column_names = ', '.join([definition.split()[0] for definition in ENTRY_KEY_COLUMNS + entry_definitions])
+    guild_id = _get_legacy_guild_id(cur, ['users', 'entries'])
+    _rebuild_table(cur, backend, 3, 'users', create_users,
+        "insert into users_migrating (guild_id, user_id, name) select %s, user_id, name from users", (guild_id,))
+    _rebuild_table(cur, backend, 3, 'entries', create_entries,
+        f"insert into entries_migrating (guild_id, {column_names}) select %s, {column_names} from entries", (guild_id,))
+
+MIGRATIONS: list[Migration] = [
+    Migration(1, "typed users/entries tables keyed by (user_id, puzzle_id) with a puzzle_id index", _create_keyed_tables),
+    Migration(2, "backfill high-water marks", _create_backfill_marks),
+    Migration(3, "guild_id on users/entries, keyed by (guild_id, user_id, puzzle_id) with a (guild_id, puzzle_id) index", _add_guild_ids),
+]
+
+####################
+# SHARED DATABASE  #
+####################
+
+GAMES: list[str] = ['connections', 'strands', 'wordle']
+# every game's entry columns; each game leaves the others' null
+SHARED_ENTRY_COLUMNS: list[str] = [
+    'score tinyint unsigned', 'green tinyint unsigned', 'yellow tinyint unsigned', 'other tinyint unsigned',
+    'hints tinyint unsigned', 'puzzle_str text'
+]
+
+def _create_shared_tables(cur: Cursor, backend: StorageBackend, entry_definitions: list[str]) -> None:
+    backend.create_table(cur, 'users', USER_COLUMNS, primary_key=['user_id'])
+    backend.create_table(cur, 'entries', ['game varchar(16) not null'] + ENTRY_KEY_COLUMNS + SHARED_ENTRY_COLUMNS,
+        primary_key=['game', 'user_id', 'puzzle_id'], indexes={'entries_game_puzzle_id': ['game', 'puzzle_id']})
+    backend.create_table(cur, 'backfill_marks',
+        ['game varchar(16) not null', 'channel_id bigint unsigned not null', 'message_id bigint unsigned not null'],
+        primary_key=['game', 'channel_id'])
+
+def _create_game_views(cur: Cursor, backend: StorageBackend, entry_definitions: list[str]) -> None:
+    # the handlers read <game>_entries/<game>_players where a per-game database has entries/users
+    _create_views(cur, backend, ENTRY_KEY_COLUMNS, ['user_id'])
+
+def _add_shared_guild_ids(cur: Cursor, backend: StorageBackend, entry_definitions: list[str]) -> None:
+    def create_users(table: str) -> None:
+        backend.create_table(cur, table, [GUILD_COLUMN] + USER_COLUMNS, primary_key=['guild_id', 'user_id'])
+
+    def create_entries(table: str) -> None:
+        backend.create_table(cur, table, ['game varchar(16) not null', GUILD_COLUMN] + ENTRY_KEY_COLUMNS + SHARED_ENTRY_COLUMNS,
+            primary_key=['game', 'guild_id', 'user_id', 'puzzle_id'], indexes={'entries_game_guild_puzzle_id': ['game', 'guild_id', 'puzzle_id']})
+
+    column_names = ', '.join(['game'] + [definition.split()[0] for definition in ENTRY_KEY_COLUMNS + SHARED_ENTRY_COLUMNS])
+    guild_id = _get_legacy_guild_id(cur, ['users', 'entries'])
+    _rebuild_table(cur, backend, 3, 'users', create_users,
+        "insert into users_migrating (guild_id, user_id, name) select %s, user_id, name from users", (guild_id,))
+    _rebuild_table(cur, backend, 3, 'entries', create_entries,
+        f"insert into entries_migrating (guild_id, {column_names}) select %s, {column_names} from entries", (guild_id,))
+    _create_views(cur, backend, [GUILD_COLUMN] + ENTRY_KEY_COLUMNS, ['guild_id', 'user_id'])
+
+SHARED_MIGRATIONS: list[Migration] = [
+    Migration(1, "multi-game users/entries keyed by (game, user_id, puzzle_id) with a (game, puzzle_id) index", _create_shared_tables),
+    Migration(2, "per-game entries/players views", _create_game_views),
+    Migration(3, "guild_id on users/entries, keyed by (game, guild_id, user_id, puzzle_id) with a (game, guild_id, puzzle_id) index", _add_shared_guild_ids),
+]
+
+####################
+#     HELPERS      #
+####################
+
+def _rebuild_table(cur: Cursor, backend: StorageBackend, version: int, table: str, create: Callable[[str], None], copy_query: str, params: tuple = ()) -> None:
+    # the original table is kept as <table>_pre_v<version> in case anything was left behind. each migration
+    # has its own backup, so a later rebuild never replaces the copy of the rows an earlier one dropped
+    backup = f"{table}_pre_v{version}"
+    cur.execute(f"drop table if exists {table}_migrating")
+    create(f"{table}_migrating")
+    cur.execute(copy_query, params)
+    cur.execute(f"drop table if exists {backup}")
+    backend.rename_tables(cur, [(table, backup), (f"{table}_migrating", table)])
+
+def _create_views(cur: Cursor, backend: StorageBackend, key_columns: list[str], player_columns: list[str]) -> None:
+    column_names = ', '.join([definition.split()[0] for definition in key_columns + SHARED_ENTRY_COLUMNS])
+    for game in GAMES:
+        backend.create_view(cur, f"{game}_entries", f"select {column_names} from entries where game = '{game}'")
+        backend.create_view(cur, f"{game}_players", f"select distinct {', '.join(player_columns)} from entries where game = '{game}'")
+
+def _get_legacy_guild_id(cur: Cursor, tables: list[str]) -> int:
+    # rows from before guilds were tracked all came from the one guild the bot was run for, named by GUILD_ID.
+    # without it they would be assigned to a guild that doesn't exist, so the migration stops instead
+    guild_id = os.environ.get('GUILD_ID', '').strip()
+    if guild_id.isdigit() and int(guild_id) > 0:
+        return int(guild_id)
+    for table in tables:
+        cur.execute(f"select 1 from {table} limit 1")
+        if len(cur.fetchall()) > 0:
+            raise Exception(f"Environment variable GUILD_ID must be set to the server's id to assign the existing {table} rows to it")
+    return 0
@@ -0,0 +1,66 @@
+from typing import Callable
+
+class PlayerTotals():
+    def __init__(self, get_contribution: Callable[[tuple], tuple]) -> None:
+        # maps an entry's column values to what it adds to its player's totals,
+        # e.g. (1, score, green, yellow, other) for Wordle
+        self._get_contribution: Callable[[tuple], tuple] = get_contribution
+        self._totals: dict[str, list] = {}
+        self._contributions: dict[tuple[str, int], tuple] = {}
+        self._player_puzzles: dict[str, set[int]] = {}
+        self._puzzle_counts: dict[int, int] = {}
+
+    ####################
+    #     LOADING      #
+    ####################
+
+    def load(self, rows: list[tuple]) -> None:
+        for row in rows:
+            self.apply(row[1], row[0], row[2:])
+
+    ####################
+    #     WRITES       #
+    ####################
+
+    def apply(self, user_id: str, puzzle_id: int, values: tuple) -> None:
+        user_id, puzzle_id = str(user_id), int(puzzle_id)
+        # an update replaces the entry's previous contribution
+        self.remove(user_id, puzzle_id)
+
+        contribution = self._get_contribution(values)
+        totals = self._totals.setdefault(user_id, [0] * len(contribution))
+        for i, value in enumerate(contribution):
+            totals[i] += value
+        self._contributions[(user_id, puzzle_id)] = contribution
+        self._player_puzzles.setdefault(user_id, set()).add(puzzle_id)
+        self._puzzle_counts[puzzle_id] = self._puzzle_counts.get(puzzle_id, 0) + 1
+
+    def remove(self, user_id: str, puzzle_id: int) -> bool:
+        user_id, puzzle_id = str(user_id), int(puzzle_id)
+        contribution = self._contributions.pop((user_id, puzzle_id), None)
+        if contribution is None:
+            return False
+
+        totals = self._totals[user_id]
+        for i, value in enumerate(contribution):
+            totals[i] -= value
+        self._player_puzzles[user_id].discard(puzzle_id)
+        if len(self._player_puzzles[user_id]) == 0:
+            del self._totals[user_id]
+            del self._player_puzzles[user_id]
+        self._puzzle_counts[puzzle_id] -= 1
+        if self._puzzle_counts[puzzle_id] == 0:
+            del self._puzzle_counts[puzzle_id]
+        return True
+
+    ####################
+    #     QUERIES      #
+    ####################
+
+    def covers(self, puzzle_list: list[int]) -> bool:
+        # totals only answer queries whose puzzle set includes every puzzle they were built from
+        puzzles = set(puzzle_list)
+        return all(puzzle_id in puzzles for puzzle_id in self._puzzle_counts)
+
+    def get_totals(self) -> list[tuple[str, list]]:
+        return list(self._totals.items())
@@ -0,0 +1,142 @@
+import asyncio, os, threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, TypeVar
+from data.backends import Cursor, MySQLBackend, SQLiteBackend, StorageBackend
+from data.query_log import QueryLog, TracedCursor
+
+T = TypeVar('T')
+
+class DatabasePool():
+    def __init__(self, backend: StorageBackend, max_workers: int, name: str) -> None:
+        self.backend: StorageBackend = backend
+        self.max_workers: int = max_workers
+        self.name: str = name
+        self._executor: ThreadPoolExecutor = None
+        self._local: threading.local = threading.local()
+        self._connections: list[object] = []
+        self._connections_lock: threading.Lock = threading.Lock()
+        # every statement the workers run is timed and counted here
+        self.query_log: QueryLog = QueryLog(name)
+
+    async def open(self) -> None:
+        # open the first worker connection now so bad credentials/paths surface at startup
+        await self.run(self.__get_cursor)
+
+    async def run(self, func: Callable[..., T], *args) -> T:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, partial(func, *args))
+
+    async def fetchall(self, query: str, params: tuple = ()) -> list[tuple]:
+        return await self.run(self.__fetchall, query, params)
+
+    async def transaction(self, work: Callable[[Cursor], T]) -> T:
+        return await self.run(self.__transaction, work)
+
+    async def explain(self, query: str, params: tuple = ()) -> list[dict]:
+        return await self.run(self.__explain, query, params)
+
+    def close(self) -> None:
+        # handlers sharing the pool each close it, so this has to be safe to repeat
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        with self._connections_lock:
+            for db in self._connections:
+                self.backend.close(db)
+            self._connections.clear()
+
+    # everything below runs on a pool worker, each of which owns one connection
+
+    def __get_cursor(self) -> Cursor:
+        # no is_connected() ping per statement; a dropped connection is reopened by __with_reconnect
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = self.backend.connect()
+            with self._connections_lock:
+                self._connections.append(db)
+            self._local.db = db
+            self._local.cur = self.backend.get_cursor(db)
+        return self._local.cur
+
+    def __with_reconnect(self, func: Callable[[Cursor], T]) -> T:
+        try:
+            return func(self.__get_cursor())
+        except self.backend.disconnect_errors:
+            # the server closed this worker's connection (e.g. wait_timeout); retry once on a fresh one
+            self.__drop_connection()
+            return func(self.__get_cursor())
+
+    def __traced(self, func: Callable[[Cursor], T]) -> Callable[[Cursor], T]:
+        def run(cur: Cursor) -> T:
+            traced = TracedCursor(cur, self.query_log)
+            result = func(traced)
+            # explained after the work is done, so the plan doesn't clobber its results or rowcounts
+            for slow in traced.slow:
+                try:
+                    plan = self.backend.explain(cur, slow.query, slow.params)
+                except Exception:
+                    plan = None
+                self.query_log.log_slow(slow, plan)
+            return result
+        return run
+
+    def __drop_connection(self) -> None:
+        db = getattr(self._local, 'db', None)
+        self._local.db = None
+        self._local.cur = None
+        if db is not None:
+            with self._connections_lock:
+                self._connections.remove(db)
+            try:
+                self.backend.close(db)
+            except Exception:
+                pass
+
+    def __fetchall(self, query: str, params: tuple) -> list[tuple]:
+        def fetch(cur: Cursor) -> list[tuple]:
+            cur.execute(query, params)
+            return cur.fetchall()
+        return self.__with_reconnect(self.__traced(fetch))
+
+    def __explain(self, query: str, params: tuple) -> list[dict]:
+        return self.__with_reconnect(lambda cur: self.backend.explain(cur, query, params))
+
+    def __transaction(self, work: Callable[[Cursor], T]) -> T:
+        def run(cur: Cursor) -> T:
+            self.backend.begin(cur)
+            try:
+                result = work(cur)
+                self._local.db.commit()
+                return result
+            except self.backend.disconnect_errors:
+                # the server already rolled back whatever it saw of a lost connection
+                raise
+            except Exception:
+                self._local.db.rollback()
+                raise
+        return self.__with_reconnect(self.__traced(run))
+
+####################
+#   SHARED POOL    #
+####################
+
+_shared_pool: DatabasePool = None
+
+def get_shared_pool() -> DatabasePool:
+    # one database and one set of connections for every game, configured by the SHARED_* variables
+    global _shared_pool
+    if _shared_pool is None:
+        match os.environ.get('SHARED_STORAGE', "mysql").lower():
+            case 'sqlite':
+                backend = SQLiteBackend(os.environ.get('SHARED_SQLITE_PATH', "nyt_games.db"))
+            case _:
+                backend = MySQLBackend(
+                    os.environ.get('SHARED_MYSQL_HOST', None),
+                    os.environ.get('SHARED_MYSQL_USER', "root"),
+                    os.environ.get('SHARED_MYSQL_PASS', ""),
+                    os.environ.get('SHARED_MYSQL_DB_NAME', "nyt_games")
+                )
+        _shared_pool = DatabasePool(backend, int(os.environ.get('SHARED_MYSQL_POOL_SIZE', 8)), "shared")
+    return _shared_pool
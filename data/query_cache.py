@@ -0,0 +1,92 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+class QueryCache():
+    def __init__(self, max_entries: int, ttl_seconds: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.max_entries: int = max_entries
+        self.ttl_seconds: float = ttl_seconds
+        self._clock: Callable[[], float] = clock
+        # least recently used first; values are (result, expiry time, partition, puzzle ids the result was built from).
+        # a partition (a guild) only sees its own writes, so one guild's submissions keep every other guild's results
+        self._entries: OrderedDict[Hashable, tuple[object, float, Hashable, frozenset[int]]] = OrderedDict()
+        self._keys_by_puzzle: dict[tuple[Hashable, int], set[Hashable]] = {}
+        # results that can't be tied to a puzzle set and are dropped on every write to their partition
+        self._unscoped_keys: dict[Hashable, set[Hashable]] = {}
+
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self.expirations: int = 0
+        self.invalidations: int = 0
+
+    ####################
+    #     LOOKUPS      #
+    ####################
+
+    def get(self, key: Hashable) -> tuple[bool, object]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return False, None
+        if entry[1] <= self._clock():
+            self.__discard(key)
+            self.expirations += 1
+            self.misses += 1
+            return False, None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return True, entry[0]
+
+    def get_counters(self) -> dict[str, int]:
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations
+        }
+
+    ####################
+    #     WRITES       #
+    ####################
+
+    def put(self, key: Hashable, puzzle_ids: frozenset[int], value: object, partition: Hashable = None) -> None:
+        # puzzle_ids is None for a result that any write to the partition can change
+        if self.max_entries <= 0:
+            return
+        if key in self._entries:
+            self.__discard(key)
+        self._entries[key] = (value, self._clock() + self.ttl_seconds, partition, puzzle_ids)
+        if puzzle_ids is None:
+            self._unscoped_keys.setdefault(partition, set()).add(key)
+        for puzzle_id in puzzle_ids or ():
+            self._keys_by_puzzle.setdefault((partition, puzzle_id), set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self.__discard(next(iter(self._entries)))
+            self.evictions += 1
+
+    def invalidate_puzzle(self, puzzle_id: int, partition: Hashable = None) -> None:
+        # only results built from this puzzle, and those not tied to any puzzles, can have changed
+        for key in list(self._keys_by_puzzle.get((partition, int(puzzle_id)), ())) + list(self._unscoped_keys.get(partition, ())):
+            self.__discard(key)
+            self.invalidations += 1
+
+    def invalidate(self, matches: Callable[[Hashable], bool]) -> None:
+        for key in [key for key in self._entries if matches(key)]:
+            self.__discard(key)
+            self.invalidations += 1
+
+    def __discard(self, key: Hashable) -> None:
+        _, _, partition, puzzle_ids = self._entries.pop(key)
+        if puzzle_ids is None:
+            keys = self._unscoped_keys[partition]
+            keys.discard(key)
+            if len(keys) == 0:
+                del self._unscoped_keys[partition]
+        for puzzle_id in puzzle_ids or ():
+            keys = self._keys_by_puzzle[(partition, puzzle_id)]
+            keys.discard(key)
+            if len(keys) == 0:
+                del self._keys_by_puzzle[(partition, puzzle_id)]
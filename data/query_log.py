@@ -0,0 +1,103 @@
+import os, re, threading, time
+from data.backends import Cursor
+
+class QueryStats():
+    def __init__(self, fingerprint: str) -> None:
+        self.fingerprint: str = fingerprint
+        self.count: int = 0
+        self.total_ms: float = 0.0
+        self.max_ms: float = 0.0
+
+class SlowQuery():
+    def __init__(self, query: str, params: tuple, elapsed_ms: float) -> None:
+        self.query: str = query
+        self.params: tuple = params
+        self.elapsed_ms: float = elapsed_ms
+
+class QueryLog():
+    # per-fingerprint execution counts and timings for one DatabasePool, shared by its worker threads
+    STRING_PATTERN = re.compile(r"'(?:[^']|'')*'")
+    NUMBER_PATTERN = re.compile(r'\b\d+(?:\.\d+)?\b')
+    PLACEHOLDER_LIST_PATTERN = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+    VALUES_LIST_PATTERN = re.compile(r'(\(\.\.\.\))(?:\s*,\s*\(\.\.\.\))+')
+    WHITESPACE_PATTERN = re.compile(r'\s+')
+    # statements EXPLAIN accepts; begin, pragma and DDL are never looked at
+    EXPLAINABLE: tuple[str, ...] = ('select', 'insert', 'update', 'delete', 'with', 'replace')
+
+    def __init__(self, name: str, slow_query_ms: float = None) -> None:
+        self.name: str = name
+        # a negative threshold turns the slow-query log off
+        self.slow_query_ms: float = slow_query_ms if slow_query_ms is not None else float(os.environ.get('SQL_SLOW_QUERY_MS', 250))
+        self._stats: dict[str, QueryStats] = {}
+        self._fingerprints: dict[str, str] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    def fingerprint(self, query: str) -> str:
+        # the statement with its literals and placeholder lists collapsed, so every
+        # "puzzle_id in (%s,%s,...)" of any length counts as the same query
+        fingerprint = self._fingerprints.get(query)
+        if fingerprint is None:
+            fingerprint = self.WHITESPACE_PATTERN.sub(' ', query).strip().lower()
+            fingerprint = self.STRING_PATTERN.sub('?', fingerprint.replace('%s', '?'))
+            fingerprint = self.NUMBER_PATTERN.sub('?', fingerprint)
+            fingerprint = self.PLACEHOLDER_LIST_PATTERN.sub('(...)', fingerprint)
+            fingerprint = self.VALUES_LIST_PATTERN.sub(r'\1', fingerprint)
+            if len(self._fingerprints) < 10000:
+                self._fingerprints[query] = fingerprint
+        return fingerprint
+
+    def record(self, query: str, elapsed_ms: float) -> None:
+        fingerprint = self.fingerprint(query)
+        with self._lock:
+            stats = self._stats.get(fingerprint)
+            if stats is None:
+                stats = self._stats[fingerprint] = QueryStats(fingerprint)
+            stats.count += 1
+            stats.total_ms += elapsed_ms
+            stats.max_ms = max(stats.max_ms, elapsed_ms)
+
+    def is_slow(self, query: str, elapsed_ms: float) -> bool:
+        return 0 <= self.slow_query_ms <= elapsed_ms and query.lstrip()[:7].lower().startswith(self.EXPLAINABLE)
+
+    def log_slow(self, slow: SlowQuery, plan: list[dict]) -> None:
+        print(f"Slow query on {self.name} ({slow.elapsed_ms:.0f}ms): {self.fingerprint(slow.query)}")
+        if plan is None:
+            print("  plan: unavailable")
+        for row in plan or []:
+            print(f"  plan: {row.get('table')} {row.get('type')} key={row.get('key')} {row.get('Extra') or ''}".rstrip())
+
+    def get_stats(self) -> list[QueryStats]:
+        # most total time first
+        with self._lock:
+            return sorted(self._stats.values(), key=lambda stats: -stats.total_ms)
+
+class TracedCursor():
+    # times every statement a pool worker runs, and keeps the slow ones to EXPLAIN once the work is done
+    def __init__(self, cur: Cursor, log: QueryLog) -> None:
+        self._cur: Cursor = cur
+        self._log: QueryLog = log
+        self.slow: list[SlowQuery] = []
+
+    def __getattr__(self, name: str):
+        return getattr(self._cur, name)
+
+    def execute(self, query: str, params: tuple = (), **kwargs):
+        # a MySQL multi-statement execute runs lazily as it's iterated, so only its first statement is timed
+        start = time.perf_counter()
+        try:
+            return self._cur.execute(query, params, **kwargs)
+        finally:
+            self.__record(query, params, start)
+
+    def executemany(self, query: str, seq_params: list[tuple]):
+        start = time.perf_counter()
+        try:
+            return self._cur.executemany(query, seq_params)
+        finally:
+            self.__record(query, seq_params[0] if len(seq_params) > 0 else (), start)
+
+    def __record(self, query: str, params: tuple, start: float) -> None:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self._log.record(query, elapsed_ms)
+        if self._log.is_slow(query, elapsed_ms) and ';' not in query:
+            self.slow.append(SlowQuery(query, params, elapsed_ms))
@@ -1,9 +1,15 @@
 import os, re
+import numpy as np
 from datetime import date
+from typing import TYPE_CHECKING
 from data.base_data_handler import BaseDatabaseHandler
-from models.strands import StrandsPuzzleEntry
+from data.query_cache import QueryCache
+from models.strands import StrandsPlayerStats, StrandsPuzzleEntry
 from utils.bot_utilities import BotUtilities
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 class StrandsDatabaseHandler(BaseDatabaseHandler):
     def __init__(self, utils: BotUtilities) -> None:
         # init
@@ -18,56 +24,80 @@ class StrandsDatabaseHandler(BaseDatabaseHandler):
         self._mysql_user = os.environ.get('STRANDS_MYSQL_USER', "root")
         self._mysql_pass = os.environ.get('STRANDS_MYSQL_PASS', "")
         self._mysql_db_name = os.environ.get('STRANDS_MYSQL_DB_NAME', "strands")
+        self._mysql_pool_size = int(os.environ.get('STRANDS_MYSQL_POOL_SIZE', 4))
+
+        # storage backend: 'mysql' (default) or an embedded 'sqlite' database file
+        self._storage = os.environ.get('STRANDS_STORAGE', "mysql").lower()
+        self._sqlite_path = os.environ.get('STRANDS_SQLITE_PATH', "strands.db")
+
+        # one database for every game (SHARED_* settings) instead of this game's own
+        self._game = 'strands'
+        self._shared = os.environ.get('SHARED_DATABASE', "false").lower() in ['1', 'true', 'yes']
+
+        # in-memory caches
+        self._stats_type = StrandsPlayerStats
+        self._use_memory_store = os.environ.get('STRANDS_MEMORY_STORE', "false").lower() in ['1', 'true', 'yes']
+        self._use_player_totals = os.environ.get('STRANDS_PLAYER_TOTALS', "false").lower() in ['1', 'true', 'yes']
+        self._entry_columns = [('hints', np.int16), ('puzzle_str', object)]
+
+        # leaderboard/missing/stats results, dropped when an entry for one of their puzzles changes
+        self._query_cache = QueryCache(int(os.environ.get('STRANDS_QUERY_CACHE_SIZE', 128)), float(os.environ.get('STRANDS_QUERY_CACHE_TTL', 300)))
+
+        # schema
+        self._entry_definitions = ['hints tinyint unsigned not null', 'puzzle_str text not null']
 
     ####################
     #  PUZZLE METHODS  #
     ####################
 
-    def add_entry(self, user_id: str, title: str, puzzle: str) -> bool:
+    def parse_entry(self, title: str, puzzle: str) -> tuple[int, tuple]:
         puzzle_id_title = re.findall(r'[\d,]+', title)
         hints = puzzle.count('💡')
 
         if puzzle_id_title:
             puzzle_id = int(str(puzzle_id_title[0]).replace(',', ''))
         else:
-            return False
-
-        if not self._db.is_connected():
-            self.connect()
-
-        if not self.user_exists(user_id):
-            user_name = self._utils.get_nickname(user_id)
-            self._cur.execute("insert into users (user_id, name) values ('{}', '{}')".format(user_id, user_name))
-
-        if self.entry_exists(user_id, puzzle_id):
-            self._cur.execute(
-                f"update entries set hints = {hints}, puzzle_str = '{puzzle}' "
-                    + f"where user_id = '{user_id}' and puzzle_id = '{puzzle_id}'"
-            )
-            self._db.commit()
-            return True
-        else:
-            self._cur.execute(
-                "insert into entries (puzzle_id, user_id, hints, puzzle_str) "
-                    + f"values ({puzzle_id}, {user_id}, {hints}, '{puzzle}')"
-            )
-            self._db.commit()
-            return self._cur.rowcount > 0
+            return None
+
+        return puzzle_id, (hints, puzzle)
 
     ####################
     #  PLAYER METHODS  #
     ####################
 
-    def get_entries_by_player(self, user_id: str, puzzle_list: list[int] = []) -> list[StrandsPuzzleEntry]:
-        if not self._db.is_connected():
-            self.connect()
+    async def get_entries_by_player(self, guild_id: int, user_id: str, puzzle_list: list[int] = []) -> list[StrandsPuzzleEntry]:
         if not puzzle_list or len(puzzle_list) == 0:
-            query = f"select puzzle_id, hints, puzzle_str from entries where user_id = {user_id}"
+            query = f"select puzzle_id, hints, puzzle_str from {self._entries_table} where guild_id = %s and user_id = %s"
         else:
-            puzzle_list_str = ','.join([str(p_id) for p_id in puzzle_list])
-            query = f"select puzzle_id, hints, puzzle_str from entries where user_id = {user_id} and puzzle_id in ({puzzle_list_str})"
-        self._cur.execute(query)
+            query = f"select puzzle_id, hints, puzzle_str from {self._entries_table} where guild_id = %s and user_id = %s and puzzle_id in {self._get_in_clause(puzzle_list)}"
         entries: list[StrandsPuzzleEntry] = []
-        for row in self._cur.fetchall():
+        for row in await self._get_rows_by_player(query, guild_id, user_id, puzzle_list):
             entries.append(StrandsPuzzleEntry(row[0], user_id, row[1], row[2]))
         return entries
+
+    async def _query_leaderboard(self, guild_id: int, puzzle_list: list[int]) -> list[StrandsPlayerStats]:
+        # ratings are derived from the puzzle string, so rows are totalled here rather than in SQL
+        query = f"select user_id, puzzle_id, hints, puzzle_str from {self._entries_table} " \
+            + f"where guild_id = %s and puzzle_id in {self._get_in_clause(puzzle_list)} and user_id in (select user_id from {self._players_table} where guild_id = %s)"
+        params = (guild_id, *puzzle_list, guild_id)
+        return self._get_stats_from_rows(await self._fetchall(query, params), len(puzzle_list))
+
+    def _get_totals_contribution(self, values: tuple) -> tuple:
+        hints, puzzle_str = values
+        entry = StrandsPuzzleEntry(0, None, int(hints), puzzle_str)
+        has_spangram = entry.spangram_index > 0
+        return 1, entry.hints, entry.spangram_index if has_spangram else 0, 1 if has_spangram else 0, entry.rating
+
+    def _get_totals_contributions(self, entries: 'pd.DataFrame') -> 'pd.DataFrame':
+        # StrandsPuzzleEntry's spangram index and rating, for every entry at once
+        puzzle_strs = entries['puzzle_str'].str.strip().str.replace('\n', '').str.replace(' ', '')
+        spangram_index = puzzle_strs.str.find('🟡') + 1
+        spangram_index = spangram_index.where(spangram_index > 0, puzzle_strs.str.len() + 1)
+        word_count = puzzle_strs.str.count('🔵')
+        hints = entries['hints'].astype('int64')
+        hint_penalty = hints * StrandsPuzzleEntry.HINT_PENALTY
+        spangram_penalty = ((spangram_index - 1.0) / word_count.where(word_count > 0)) * StrandsPuzzleEntry.HINT_PENALTY
+        rating = (1.0 + spangram_penalty.fillna(0.0)) + hint_penalty
+        has_spangram = spangram_index > 0
+        return entries[[]].assign(entries=1, hints=hints, spangram_total=spangram_index.where(has_spangram, 0),
+            spangram_count=has_spangram.astype('int64'), rating=rating)
@@ -1,9 +1,15 @@
 import os, re
+import numpy as np
 from datetime import date
+from typing import TYPE_CHECKING
 from data.base_data_handler import BaseDatabaseHandler
-from models.wordle import WordlePuzzleEntry
+from data.query_cache import QueryCache
+from models.wordle import WordlePlayerStats, WordlePuzzleEntry
 from utils.bot_utilities import BotUtilities
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 class WordleDatabaseHandler(BaseDatabaseHandler):
     def __init__(self, utils: BotUtilities) -> None:
         # init
@@ -18,19 +24,40 @@ class WordleDatabaseHandler(BaseDatabaseHandler):
         self._mysql_user = os.environ.get('WORDLE_MYSQL_USER', "root")
         self._mysql_pass = os.environ.get('WORDLE_MYSQL_PASS', "")
         self._mysql_db_name = os.environ.get('WORDLE_MYSQL_DB_NAME', "wordle")
+        self._mysql_pool_size = int(os.environ.get('WORDLE_MYSQL_POOL_SIZE', 4))
+
+        # storage backend: 'mysql' (default) or an embedded 'sqlite' database file
+        self._storage = os.environ.get('WORDLE_STORAGE', "mysql").lower()
+        self._sqlite_path = os.environ.get('WORDLE_SQLITE_PATH', "wordle.db")
+
+        # one database for every game (SHARED_* settings) instead of this game's own
+        self._game = 'wordle'
+        self._shared = os.environ.get('SHARED_DATABASE', "false").lower() in ['1', 'true', 'yes']
+
+        # in-memory caches
+        self._stats_type = WordlePlayerStats
+        self._use_memory_store = os.environ.get('WORDLE_MEMORY_STORE', "false").lower() in ['1', 'true', 'yes']
+        self._use_player_totals = os.environ.get('WORDLE_PLAYER_TOTALS', "false").lower() in ['1', 'true', 'yes']
+        self._entry_columns = [('score', np.int8), ('green', np.int16), ('yellow', np.int16), ('other', np.int16)]
+
+        # leaderboard/missing/stats results, dropped when an entry for one of their puzzles changes
+        self._query_cache = QueryCache(int(os.environ.get('WORDLE_QUERY_CACHE_SIZE', 128)), float(os.environ.get('WORDLE_QUERY_CACHE_TTL', 300)))
+
+        # schema
+        self._entry_definitions = ['score tinyint unsigned not null', 'green tinyint unsigned not null', 'yellow tinyint unsigned not null', 'other tinyint unsigned not null']
 
     ####################
     #  PUZZLE METHODS  #
     ####################
 
-    def add_entry(self, user_id: str, title: str, puzzle: str) -> bool:
+    def parse_entry(self, title: str, puzzle: str) -> tuple[int, tuple]:
         if 'X/6' in title:
             reg_match = re.search(r'\d{1,3}(,\d{3})*', title)
             if reg_match:
                 puzzle_id = reg_match.group(0).replace(',', '')
                 score = 7
             else:
-                return False
+                return None
         else:
             reg_match = re.search(r'\d{1,3}(,\d{3})*', title)
             if reg_match:
@@ -39,9 +66,9 @@ class WordleDatabaseHandler(BaseDatabaseHandler):
                 if reg_match:
                     score = reg_match.group(1)
                 else:
-                    return False
+                    return None
             else:
-                return False
+                return None
 
         puzzle_id = int(puzzle_id)
         score = int(score)
@@ -50,42 +77,34 @@ class WordleDatabaseHandler(BaseDatabaseHandler):
         total_yellow = puzzle.count('🟨')
         total_other = puzzle.count('⬜') + puzzle.count('⬛')
 
-        if not self._db.is_connected():
-            self.connect()
-
-        if not self.user_exists(user_id):
-            user_name = self._utils.get_nickname(user_id)
-            self._cur.execute("insert into users (user_id, name) values ('{}', '{}')".format(user_id, user_name))
-
-        if self.entry_exists(user_id, puzzle_id):
-            self._cur.execute(
-                f"update entries set score = {score}, green = {total_green}, yellow = {total_yellow}, other = {total_other} "
-                    + f"where user_id = '{user_id}' and puzzle_id = '{puzzle_id}'"
-            )
-            self._db.commit()
-            return True
-        else:
-            self._cur.execute(
-                "insert into entries (puzzle_id, user_id, score, green, yellow, other) "
-                    + f"values ({puzzle_id}, {user_id}, {score}, {total_green}, {total_yellow}, {total_other})"
-            )
-            self._db.commit()
-            return self._cur.rowcount > 0
+        return puzzle_id, (score, total_green, total_yellow, total_other)
 
     ####################
     #  PLAYER METHODS  #
     ####################
 
-    def get_entries_by_player(self, user_id: str, puzzle_list: list[int] = []) -> list[WordlePuzzleEntry]:
-        if not self._db.is_connected():
-            self.connect()
+    async def get_entries_by_player(self, guild_id: int, user_id: str, puzzle_list: list[int] = []) -> list[WordlePuzzleEntry]:
         if not puzzle_list or len(puzzle_list) == 0:
-            query = f"select puzzle_id, score, green, yellow, other from entries where user_id = {user_id}"
+            query = f"select puzzle_id, score, green, yellow, other from {self._entries_table} where guild_id = %s and user_id = %s"
         else:
-            puzzle_list_str = ','.join([str(p_id) for p_id in puzzle_list])
-            query = f"select puzzle_id, score, green, yellow, other from entries where user_id = {user_id} and puzzle_id in ({puzzle_list_str})"
-        self._cur.execute(query)
+            query = f"select puzzle_id, score, green, yellow, other from {self._entries_table} where guild_id = %s and user_id = %s and puzzle_id in {self._get_in_clause(puzzle_list)}"
         entries: list[WordlePuzzleEntry] = []
-        for row in self._cur.fetchall():
+        for row in await self._get_rows_by_player(query, guild_id, user_id, puzzle_list):
             entries.append(WordlePuzzleEntry(row[0], user_id, row[1], row[2], row[3], row[4]))
         return entries
+
+    async def _query_leaderboard(self, guild_id: int, puzzle_list: list[int]) -> list[WordlePlayerStats]:
+        query = f"select user_id, count(*), sum(score), sum(green), sum(yellow), sum(other) from {self._entries_table} " \
+            + f"where guild_id = %s and puzzle_id in {self._get_in_clause(puzzle_list)} and user_id in (select user_id from {self._players_table} where guild_id = %s)"
+        params = (guild_id, *puzzle_list, guild_id)
+        stats: list[WordlePlayerStats] = []
+        for row in await self._fetchall(query + " group by user_id", params):
+            stats.append(WordlePlayerStats(str(row[0]), len(puzzle_list), int(row[1]), int(row[2]), int(row[3]), int(row[4]), int(row[5])))
+        return stats
+
+    def _get_totals_contribution(self, values: tuple) -> tuple:
+        score, green, yellow, other = values
+        return 1, int(score), int(green), int(yellow), int(other)
+
+    def _get_totals_contributions(self, entries: 'pd.DataFrame') -> 'pd.DataFrame':
+        return entries[['score', 'green', 'yellow', 'other']].astype('int64').assign(entries=1)[['entries', 'score', 'green', 'yellow', 'other']]
@@ -1,6 +1,7 @@
 from discord.ext import commands
 from typing import Protocol
 from data.base_data_handler import BaseDatabaseHandler
+from data.query_log import QueryLog
 from utils.bot_utilities import BotUtilities
 
 class BaseCommandHandler(Protocol):
@@ -13,15 +14,41 @@ class BaseCommandHandler(Protocol):
         self.utils = utils
         self.db = db
 
-    def connect(self) -> None:
-        self.db.connect()
+    async def connect(self) -> None:
+        await self.db.connect()
+
+    def close(self) -> None:
+        self.db.close()
 
     ######################
     #   MEMBER METHODS   #
     ######################
 
-    def add_entry(self, user_id: str, title: str, puzzle: str) -> bool:
-        return self.db.add_entry(user_id, title, puzzle)
+    async def add_entry(self, guild_id: int, user_id: str, title: str, puzzle: str) -> bool:
+        return await self.db.add_entry(guild_id, user_id, title, puzzle)
+
+    async def add_entries(self, guild_id: int, entries: list[tuple[str, str, str, str]], channel_id: int, message_id: int) -> int:
+        return await self.db.add_entries(guild_id, entries, channel_id, message_id)
+
+    async def add_submissions(self, submissions: list[tuple[int, str, str, str]]) -> list[bool]:
+        return await self.db.add_submissions(submissions)
+
+    async def get_backfill_mark(self, channel_id: int) -> int:
+        return await self.db.get_backfill_mark(channel_id)
+
+    async def refresh_player_names(self, guild_id: int, user_ids: list[str] = None) -> None:
+        # stored names are otherwise only written with a player's first entry; defaults to every player in the guild
+        if user_ids is None:
+            user_ids = await self.db.get_all_players(guild_id)
+        await self.utils.fetch_nicknames(guild_id, user_ids)
+        names = {user_id: self.utils.get_nickname(guild_id, user_id) for user_id in user_ids}
+        await self.db.update_player_names(guild_id, {user_id: name for user_id, name in names.items() if name != "?"})
+
+    async def load_guilds(self, guild_ids: list[int]) -> None:
+        await self.db.load_guilds(guild_ids)
+
+    def unload_guild(self, guild_id: int) -> None:
+        self.db.unload_guild(guild_id)
 
     async def get_ranks(self, ctx: commands.Context, *args: str) -> None:
         pass
@@ -47,3 +74,9 @@ class BaseCommandHandler(Protocol):
 
     async def add_score(self, ctx: commands.Context, *args: str) -> None:
         pass
+
+    def get_query_cache_counters(self) -> dict[str, int]:
+        return self.db.get_query_cache_counters()
+
+    def get_query_log(self) -> QueryLog:
+        return self.db.get_query_log()
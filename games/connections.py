@@ -1,7 +1,4 @@
 import discord, io, re
-import matplotlib.pyplot as plt
-import pandas as pd
-import seaborn as sns
 from datetime import timedelta
 from discord.ext import commands
 from data.connections import ConnectionsDatabaseHandler
@@ -9,6 +6,7 @@ from games.base_command_handler import BaseCommandHandler
 from models.base_game import PuzzleQueryType
 from models.connections import ConnectionsPlayerStats, ConnectionsPuzzleEntry
 from utils.bot_utilities import BotUtilities
+from utils.render_executor import BarChartSpec
 
 class ConnectionsCommandHandler(BaseCommandHandler):
     def __init__(self, utils: BotUtilities) -> None:
@@ -19,9 +17,11 @@ class ConnectionsCommandHandler(BaseCommandHandler):
     ######################
 
     async def get_ranks(self, ctx: commands.Context, *args: str) -> None:
+        import pandas as pd
+
         if len(args) == 0 or (len(args) == 1 and args[0] in ['alltime', 'all-time']):
             # ALL TIME
-            valid_puzzles = self.db.get_all_puzzles()
+            valid_puzzles = await self.db.get_all_puzzles(ctx.guild.id)
             explanation_str = "All-time"
             query_type = PuzzleQueryType.ALL_TIME
         elif len(args) == 1 and args[0] in ['week', 'weekly']:
@@ -62,12 +62,7 @@ class ConnectionsCommandHandler(BaseCommandHandler):
             await ctx.reply("Couldn't understand your command. Try `?help ranks`.")
             return
 
-        stats: list[ConnectionsPlayerStats] = []
-        for user_id in self.db.get_all_players():
-            player_puzzles = self.db.get_puzzles_by_player(user_id)
-            intersection = list(set(player_puzzles).intersection(valid_puzzles))
-            if len(intersection) > 0:
-                stats.append(ConnectionsPlayerStats(user_id, valid_puzzles, self.db))
+        stats: list[ConnectionsPlayerStats] = await self.db.get_leaderboard(ctx.guild.id, valid_puzzles)
 
         if len(stats) == 0:
             await ctx.reply(f"Sorry, no users could be found for this query.")
@@ -80,6 +75,9 @@ class ConnectionsCommandHandler(BaseCommandHandler):
             # for all-time queries, we must rank on the raw score (since adj. will be skewed)
             stats.sort(key = lambda p: (p.raw_mean))
 
+        # names are looked up for the rendered rows only
+        await self.utils.fetch_nicknames(ctx.guild.id, [player_stats.user_id for player_stats in stats[:self.MAX_DATAFRAME_ROWS + 1]])
+
         if query_type == PuzzleQueryType.SINGLE_PUZZLE:
             # stats for just 1 puzzle
             df = pd.DataFrame(columns=['Rank', 'User', 'Score'])
@@ -92,7 +90,7 @@ class ConnectionsCommandHandler(BaseCommandHandler):
                 if i <= self.MAX_DATAFRAME_ROWS:
                     df.loc[i] = [
                         player_stats.rank,
-                        self.utils.get_nickname(player_stats.user_id),
+                        self.utils.get_nickname(ctx.guild.id, player_stats.user_id),
                         f"{player_stats.raw_mean:d}/7"
                     ]
         elif query_type == PuzzleQueryType.MULTI_PUZZLE:
@@ -106,7 +104,7 @@ class ConnectionsCommandHandler(BaseCommandHandler):
                 if i <= self.MAX_DATAFRAME_ROWS:
                     df.loc[i] = [
                         player_stats.rank,
-                        self.utils.get_nickname(player_stats.user_id),
+                        self.utils.get_nickname(ctx.guild.id, player_stats.user_id),
                         f"{player_stats.adj_mean:.2f}/7 ({player_stats.raw_mean:.2f}/7)",
                         len(valid_puzzles) - player_stats.missed_games,
                         player_stats.missed_games
@@ -122,17 +120,15 @@ class ConnectionsCommandHandler(BaseCommandHandler):
                 if i <= self.MAX_DATAFRAME_ROWS:
                     df.loc[i] = [
                         player_stats.rank,
-                        self.utils.get_nickname(player_stats.user_id),
+                        self.utils.get_nickname(ctx.guild.id, player_stats.user_id),
                         f"{player_stats.raw_mean:.2f}/7",
                         len(valid_puzzles) - player_stats.missed_games
                     ]
 
-        ranks_img = self.utils.get_image_from_df(df)
+        ranks_img = await self.utils.get_image_from_df(df)
 
         if ranks_img is not None:
-            with io.BytesIO() as image_binary:
-                ranks_img.save(image_binary, 'PNG')
-                image_binary.seek(0)
+            with io.BytesIO(ranks_img) as image_binary:
                 await ctx.send(f"Leaderboard 🧩: {explanation_str}", \
                         file=discord.File(fp=image_binary, filename='image.png'))
         else:
@@ -147,7 +143,7 @@ class ConnectionsCommandHandler(BaseCommandHandler):
             await ctx.reply("Couldn't understand command. Try `?help missing`")
             return
 
-        missing_ids = [user_id for user_id in self.db.get_all_players() if user_id not in self.db.get_players_by_puzzle_id(puzzle_id)]
+        missing_ids = await self.db.get_missing_players(ctx.guild.id, puzzle_id)
         if len(missing_ids) == 0:
             await ctx.reply(f"All tracked players have submitted Puzzle #{puzzle_id}!")
         else:
@@ -162,8 +158,8 @@ class ConnectionsCommandHandler(BaseCommandHandler):
             await ctx.reply("Couldn't understand command. Try `?help entries`.")
             return
 
-        if user_id in self.db.get_all_players():
-            found_puzzles = [str(p_id) for p_id in self.db.get_puzzles_by_player(user_id)]
+        if user_id in await self.db.get_all_players(ctx.guild.id):
+            found_puzzles = [str(p_id) for p_id in await self.db.get_puzzles_by_player(ctx.guild.id, user_id)]
             if len(found_puzzles) == 0:
                 await ctx.reply(f"Couldn't find any recorded entries for <@{user_id}>.")
             elif len(found_puzzles) < 50:
@@ -174,6 +170,8 @@ class ConnectionsCommandHandler(BaseCommandHandler):
             await ctx.reply(f"Couldn't find any recorded entries for <@{user_id}>.")
 
     async def get_entry(self, ctx: commands.Context, *args: str) -> None:
+        import pandas as pd
+
         if len(args) >= 1:
             if self.utils.is_user(args[0]):
                 user_id = args[0].strip("<@!> ")
@@ -194,8 +192,9 @@ class ConnectionsCommandHandler(BaseCommandHandler):
 
         puzzle_ids.sort()
 
-        if user_id in self.db.get_all_players():
-            user_puzzles: list[ConnectionsPuzzleEntry] = self.db.get_entries_by_player(user_id)
+        if user_id in await self.db.get_all_players(ctx.guild.id):
+            user_puzzles: list[ConnectionsPuzzleEntry] = await self.db.get_entries_by_player(ctx.guild.id, user_id)
+            await self.utils.fetch_nicknames(ctx.guild.id, [user_id])
             df = pd.DataFrame(columns=['User', 'Puzzle', 'Score'])
             for i, puzzle_id in enumerate(puzzle_ids):
                 found_match = False
@@ -203,7 +202,7 @@ class ConnectionsCommandHandler(BaseCommandHandler):
                     if entry.puzzle_id == puzzle_id:
                         score_str = 'X' if entry.score == 8 else str(entry.score)
                         df.loc[i] = [
-                            self.utils.get_nickname(user_id),
+                            self.utils.get_nickname(ctx.guild.id, user_id),
                             f"#{puzzle_id}",
                             f"{score_str}/7",
                         ]
@@ -211,15 +210,13 @@ class ConnectionsCommandHandler(BaseCommandHandler):
                         break
                 if not found_match:
                     df.loc[i] = [
-                        self.utils.get_nickname(user_id),
+                        self.utils.get_nickname(ctx.guild.id, user_id),
                         f"#{puzzle_id}",
                         "?/7",
                     ]
-            entries_img = self.utils.get_image_from_df(df)
+            entries_img = await self.utils.get_image_from_df(df)
             if entries_img is not None:
-                with io.BytesIO() as image_binary:
-                    entries_img.save(image_binary, 'PNG')
-                    image_binary.seek(0)
+                with io.BytesIO(entries_img) as image_binary:
                     await ctx.reply(file=discord.File(fp=image_binary, filename='image.png'))
             else:
                 await ctx.reply("Sorry, failed to fetch stats.")
@@ -227,16 +224,20 @@ class ConnectionsCommandHandler(BaseCommandHandler):
             await ctx.reply(f"No records found for user <@{user_id}>.")
 
     async def get_stats(self, ctx: commands.Context, *args: str) -> None:
+        import pandas as pd
+
         missing_users_str = None
         if len(args) == 0:
             user_ids = [str(ctx.author.id)]
         else:
             user_ids = []
             unknown_ids = []
+            # one player lookup for every mention
+            all_players = set(await self.db.get_all_players(ctx.guild.id))
             for arg in args:
                 if self.utils.is_user(arg):
                     user_id = arg.strip("<@!> ")
-                    if user_id in self.db.get_all_players():
+                    if user_id in all_players:
                         user_ids.append(user_id)
                     else:
                         unknown_ids.append(str(user_id))
@@ -250,57 +251,45 @@ class ConnectionsCommandHandler(BaseCommandHandler):
                     await ctx.reply(f"Couldn't find user(s): <@{'>, <@'.join(unknown_ids)}>")
                     return
 
+        await self.utils.fetch_nicknames(ctx.guild.id, user_ids)
         df = pd.DataFrame(columns=['User', 'Avg Score', '🧩', '🚫'])
-        for i, user_id in enumerate(user_ids):
-            puzzle_list = self.db.get_puzzles_by_player(user_id)
-            player_stats = ConnectionsPlayerStats(user_id, puzzle_list, self.db)
+        # every player's stats over their own entries, totalled together
+        players_stats: list[ConnectionsPlayerStats] = await self.db.get_players_stats(ctx.guild.id, user_ids)
+        puzzle_count = len(await self.db.get_all_puzzles(ctx.guild.id))
+        for i, player_stats in enumerate(players_stats):
             df.loc[i] = [
-                self.utils.get_nickname(user_id),
+                self.utils.get_nickname(ctx.guild.id, player_stats.user_id),
                 f"{player_stats.raw_mean:.4f}",
-                len(puzzle_list),
-                len(self.db.get_all_puzzles()) - len(puzzle_list),
+                player_stats.entry_count,
+                puzzle_count - player_stats.entry_count,
             ]
 
-        stats_img = self.utils.get_image_from_df(df)
+        stats_img = await self.utils.get_image_from_df(df)
 
-        hist_img = None
         if len(user_ids) < 5:
             valid_scores = ['4/7', '5/7', '6/7', '7/7', 'X/7']
-            plt.rcParams.update({'font.size': 20})
 
             df = pd.DataFrame(columns=['Player', 'Score', 'Count'])
             for i, user_id in enumerate(user_ids):
                 score_counts = [0] * len(valid_scores)
-                entries: list[ConnectionsPuzzleEntry] = self.db.get_entries_by_player(user_id)
+                entries: list[ConnectionsPuzzleEntry] = await self.db.get_entries_by_player(ctx.guild.id, user_id)
                 for score in [entry.score for entry in entries]:
                     score_counts[score - 4] += 1
                 for j in range(0, len(valid_scores)):
                     df.loc[i*len(valid_scores) + j] = [
-                        self.utils.remove_emojis(self.utils.get_nickname(user_id)),
+                        self.utils.remove_emojis(self.utils.get_nickname(ctx.guild.id, user_id)),
                         valid_scores[j],
                         score_counts[j]
                     ]
-            g = sns.catplot(x='Score', y='Count', hue='Player', data=df, kind='bar')
-            for ax in g.axes.ravel():
-                for c in ax.containers:
-                    labels = ['%d' % v.get_height() for v in c]
-                    ax.bar_label(c, labels=labels, label_type='edge', fontsize=15)
-            fig = plt.gcf()
-            fig.subplots_adjust(bottom=0.2)
-            fig.set_size_inches(10, 5)
-            hist_img = self.utils.fig_to_image(fig)
-            hist_img = self.utils.resize_image(hist_img, width = stats_img.size[0])
-            plt.close()
-
-        if hist_img is not None:
-            stats_img = self.utils.combine_images(stats_img, hist_img)
+            hist_img = await self.utils.get_bar_chart(df, BarChartSpec(x='Score', y='Count', hue='Player', width=10, height=5))
+            stats_img = await self.utils.stack_images(stats_img, hist_img)
 
         if stats_img is not None:
-            stats_binary = self.utils.image_to_binary(stats_img)
-            if missing_users_str is None:
-                await ctx.reply(file=discord.File(fp=stats_binary, filename='image.png'))
-            else:
-                await ctx.reply(missing_users_str, file=discord.File(fp=stats_binary, filename='image.png'))
+            with io.BytesIO(stats_img) as stats_binary:
+                if missing_users_str is None:
+                    await ctx.reply(file=discord.File(fp=stats_binary, filename='image.png'))
+                else:
+                    await ctx.reply(missing_users_str, file=discord.File(fp=stats_binary, filename='image.png'))
         else:
             await ctx.reply("Sorry, an error occurred while trying to fetch stats.")
 
@@ -322,8 +311,8 @@ class ConnectionsCommandHandler(BaseCommandHandler):
             await ctx.reply("Could not understand command. Try `?remove <user> <puzzle #>`.")
             return
 
-        if user_id in self.db.get_all_players() and puzzle_id in self.db.get_all_puzzles():
-            if self.db.remove_entry(user_id, puzzle_id):
+        if user_id in await self.db.get_all_players(ctx.guild.id) and puzzle_id in await self.db.get_all_puzzles(ctx.guild.id):
+            if await self.db.remove_entry(ctx.guild.id, user_id, puzzle_id):
                 await ctx.message.add_reaction('✅')
             else:
                 await ctx.message.add_reaction('❌')
@@ -341,7 +330,7 @@ class ConnectionsCommandHandler(BaseCommandHandler):
                 title = f"{args[0]}\n{args[1]} {args[2]}"
                 content = '\n'.join(args[3:])
             if self.utils.is_connections_submission(title):
-                if self.db.add_entry(user_id, title, content):
+                if await self.db.add_entry(ctx.guild.id, user_id, title, content):
                     await ctx.message.add_reaction('✅')
                 else:
                     await ctx.message.add_reaction('❌')
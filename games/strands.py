@@ -1,7 +1,4 @@
 import discord, io, re
-import matplotlib.pyplot as plt
-import pandas as pd
-import seaborn as sns
 from datetime import timedelta
 from discord.ext import commands
 from data.strands import StrandsDatabaseHandler
@@ -9,6 +6,7 @@ from games.base_command_handler import BaseCommandHandler
 from models.base_game import PuzzleQueryType
 from models.strands import StrandsPlayerStats, StrandsPuzzleEntry
 from utils.bot_utilities import BotUtilities
+from utils.render_executor import BarChartSpec
 
 class StrandsCommandHandler(BaseCommandHandler):
     def __init__(self, utils: BotUtilities) -> None:
@@ -19,9 +17,11 @@ class StrandsCommandHandler(BaseCommandHandler):
     ######################
 
     async def get_ranks(self, ctx: commands.Context, *args: str) -> None:
+        import pandas as pd
+
         if len(args) == 0 or (len(args) == 1 and args[0] in ['alltime', 'all-time']):
             # ALL TIME
-            valid_puzzles = self.db.get_all_puzzles()
+            valid_puzzles = await self.db.get_all_puzzles(ctx.guild.id)
             explanation_str = "All-time"
             query_type = PuzzleQueryType.ALL_TIME
         elif len(args) == 1 and args[0] in ['week', 'weekly']:
@@ -62,12 +62,7 @@ class StrandsCommandHandler(BaseCommandHandler):
             await ctx.reply("Couldn't understand your command. Try `?help ranks`.")
             return
 
-        stats: list[StrandsPlayerStats] = []
-        for user_id in self.db.get_all_players():
-            player_puzzles = self.db.get_puzzles_by_player(user_id)
-            intersection = list(set(player_puzzles).intersection(valid_puzzles))
-            if len(intersection) > 0:
-                stats.append(StrandsPlayerStats(user_id, valid_puzzles, self.db))
+        stats: list[StrandsPlayerStats] = await self.db.get_leaderboard(ctx.guild.id, valid_puzzles)
 
         if len(stats) == 0:
             await ctx.reply(f"Sorry, no users could be found for this query.")
@@ -80,6 +75,9 @@ class StrandsCommandHandler(BaseCommandHandler):
             # for all-time queries, we must rank on the raw rating (since adj. will be skewed)
             stats.sort(key = lambda p: (p.avg_rating_raw))
 
+        # names are looked up for the rendered rows only
+        await self.utils.fetch_nicknames(ctx.guild.id, [player_stats.user_id for player_stats in stats[:self.MAX_DATAFRAME_ROWS + 1]])
+
         if query_type == PuzzleQueryType.SINGLE_PUZZLE:
             # stats for just 1 puzzle
             df = pd.DataFrame(columns=['Rank', 'User', 'Rating', 'Hints', '🟡 Index'])
@@ -92,7 +90,7 @@ class StrandsCommandHandler(BaseCommandHandler):
                 if i <= self.MAX_DATAFRAME_ROWS:
                     df.loc[i] = [
                         player_stats.rank,
-                        self.utils.get_nickname(player_stats.user_id),
+                        self.utils.get_nickname(ctx.guild.id, player_stats.user_id),
                         f"{player_stats.avg_rating_raw:.3f}",
                         f"{player_stats.avg_hints:d}",
                         f"{player_stats.avg_spangram_index:d}"
@@ -108,7 +106,7 @@ class StrandsCommandHandler(BaseCommandHandler):
                 if i <= self.MAX_DATAFRAME_ROWS:
                     df.loc[i] = [
                         player_stats.rank,
-                        self.utils.get_nickname(player_stats.user_id),
+                        self.utils.get_nickname(ctx.guild.id, player_stats.user_id),
                         f"{player_stats.avg_rating_adj:.3f} ({player_stats.avg_rating_raw:.3f})",
                         f"{player_stats.avg_hints:.2f}",
                         f"{player_stats.avg_spangram_index:.2f}",
@@ -126,7 +124,7 @@ class StrandsCommandHandler(BaseCommandHandler):
                 if i <= self.MAX_DATAFRAME_ROWS:
                     df.loc[i] = [
                         player_stats.rank,
-                        self.utils.get_nickname(player_stats.user_id),
+                        self.utils.get_nickname(ctx.guild.id, player_stats.user_id),
                         f"{player_stats.avg_rating_raw:.3f}",
                         f"{player_stats.avg_hints:.2f}",
                         f"{player_stats.avg_spangram_index:.2f}",
@@ -134,12 +132,10 @@ class StrandsCommandHandler(BaseCommandHandler):
                         player_stats.missed_games
                     ]
 
-        ranks_img = self.utils.get_image_from_df(df)
+        ranks_img = await self.utils.get_image_from_df(df)
 
         if ranks_img is not None:
-            with io.BytesIO() as image_binary:
-                ranks_img.save(image_binary, 'PNG')
-                image_binary.seek(0)
+            with io.BytesIO(ranks_img) as image_binary:
                 await ctx.send(f"Leaderboard 🧩: {explanation_str}", \
                         file=discord.File(fp=image_binary, filename='image.png'))
         else:
@@ -154,7 +150,7 @@ class StrandsCommandHandler(BaseCommandHandler):
             await ctx.reply("Couldn't understand command. Try `?help missing`")
             return
 
-        missing_ids = [user_id for user_id in self.db.get_all_players() if user_id not in self.db.get_players_by_puzzle_id(puzzle_id)]
+        missing_ids = await self.db.get_missing_players(ctx.guild.id, puzzle_id)
         if len(missing_ids) == 0:
             await ctx.reply(f"All tracked players have submitted Puzzle #{puzzle_id}!")
         else:
@@ -169,8 +165,8 @@ class StrandsCommandHandler(BaseCommandHandler):
             await ctx.reply("Couldn't understand command. Try `?help entries`.")
             return
 
-        if user_id in self.db.get_all_players():
-            found_puzzles = [str(p_id) for p_id in self.db.get_puzzles_by_player(user_id)]
+        if user_id in await self.db.get_all_players(ctx.guild.id):
+            found_puzzles = [str(p_id) for p_id in await self.db.get_puzzles_by_player(ctx.guild.id, user_id)]
             if len(found_puzzles) == 0:
                 await ctx.reply(f"Couldn't find any recorded entries for <@{user_id}>.")
             elif len(found_puzzles) < 50:
@@ -181,6 +177,8 @@ class StrandsCommandHandler(BaseCommandHandler):
             await ctx.reply(f"Couldn't find any recorded entries for <@{user_id}>.")
 
     async def get_entry(self, ctx: commands.Context, *args: str) -> None:
+        import pandas as pd
+
         if len(args) >= 1:
             if self.utils.is_user(args[0]):
                 user_id = args[0].strip("<@!> ")
@@ -201,15 +199,16 @@ class StrandsCommandHandler(BaseCommandHandler):
 
         puzzle_ids.sort()
 
-        if user_id in self.db.get_all_players():
-            user_puzzles: list[StrandsPuzzleEntry] = self.db.get_entries_by_player(user_id)
+        if user_id in await self.db.get_all_players(ctx.guild.id):
+            user_puzzles: list[StrandsPuzzleEntry] = await self.db.get_entries_by_player(ctx.guild.id, user_id)
+            await self.utils.fetch_nicknames(ctx.guild.id, [user_id])
             df = pd.DataFrame(columns=['User', 'Puzzle #', 'Rating', 'Hints', '🟡 Index', 'Puzzle'])
             for i, puzzle_id in enumerate(puzzle_ids):
                 found_match = False
                 for entry in user_puzzles:
                     if entry.puzzle_id == puzzle_id:
                         df.loc[i] = [
-                            self.utils.get_nickname(user_id),
+                            self.utils.get_nickname(ctx.guild.id, user_id),
                             f"#{puzzle_id}",
                             f"{entry.rating:.2f}",
                             f"{entry.hints:d}",
@@ -220,18 +219,16 @@ class StrandsCommandHandler(BaseCommandHandler):
                         break
                 if not found_match:
                     df.loc[i] = [
-                        self.utils.get_nickname(user_id),
+                        self.utils.get_nickname(ctx.guild.id, user_id),
                         f"#{puzzle_id}",
                         "?",
                         "?",
                         "?",
                         "?"
                     ]
-            entries_img = self.utils.get_image_from_df(df)
+            entries_img = await self.utils.get_image_from_df(df)
             if entries_img is not None:
-                with io.BytesIO() as image_binary:
-                    entries_img.save(image_binary, 'PNG')
-                    image_binary.seek(0)
+                with io.BytesIO(entries_img) as image_binary:
                     await ctx.reply(file=discord.File(fp=image_binary, filename='image.png'))
             else:
                 await ctx.reply("Sorry, failed to fetch stats.")
@@ -239,16 +236,20 @@ class StrandsCommandHandler(BaseCommandHandler):
             await ctx.reply(f"No records found for user <@{user_id}>.")
 
     async def get_stats(self, ctx: commands.Context, *args: str) -> None:
+        import pandas as pd
+
         missing_users_str = None
         if len(args) == 0:
             user_ids = [str(ctx.author.id)]
         else:
             user_ids = []
             unknown_ids = []
+            # one player lookup for every mention
+            all_players = set(await self.db.get_all_players(ctx.guild.id))
             for arg in args:
                 if self.utils.is_user(arg):
                     user_id = arg.strip("<@!> ")
-                    if user_id in self.db.get_all_players():
+                    if user_id in all_players:
                         user_ids.append(user_id)
                     else:
                         unknown_ids.append(str(user_id))
@@ -262,59 +263,47 @@ class StrandsCommandHandler(BaseCommandHandler):
                     await ctx.reply(f"Couldn't find user(s): <@{'>, <@'.join(unknown_ids)}>")
                     return
 
+        await self.utils.fetch_nicknames(ctx.guild.id, user_ids)
         df = pd.DataFrame(columns=['User', 'Avg Rating', 'Avg Hints', 'Avg 🟡 Index', '🧩', '🚫'])
-        for i, user_id in enumerate(user_ids):
-            puzzle_list = self.db.get_puzzles_by_player(user_id)
-            player_stats = StrandsPlayerStats(user_id, puzzle_list, self.db)
+        # every player's stats over their own entries, totalled together
+        players_stats: list[StrandsPlayerStats] = await self.db.get_players_stats(ctx.guild.id, user_ids)
+        puzzle_count = len(await self.db.get_all_puzzles(ctx.guild.id))
+        for i, player_stats in enumerate(players_stats):
             df.loc[i] = [
-                self.utils.get_nickname(user_id),
+                self.utils.get_nickname(ctx.guild.id, player_stats.user_id),
                 f"{player_stats.avg_rating_raw:.2f}",
                 f"{player_stats.avg_hints:.2f}",
                 f"{player_stats.avg_spangram_index:.2f}",
-                len(puzzle_list),
-                len(self.db.get_all_puzzles()) - len(puzzle_list),
+                player_stats.entry_count,
+                puzzle_count - player_stats.entry_count,
             ]
 
-        stats_img = self.utils.get_image_from_df(df)
+        stats_img = await self.utils.get_image_from_df(df)
 
-        hist_img = None
         if len(user_ids) < 5:
             valid_hints = ['0', '1', '2', '3', '4', '5', '6', '7']
-            plt.rcParams.update({'font.size': 20})
 
             df = pd.DataFrame(columns=['Player', 'Hints', 'Count'])
             for i, user_id in enumerate(user_ids):
                 hint_counts = [0] * len(valid_hints)
-                entries: list[StrandsPuzzleEntry] = self.db.get_entries_by_player(user_id)
+                entries: list[StrandsPuzzleEntry] = await self.db.get_entries_by_player(ctx.guild.id, user_id)
                 for hints in [entry.hints for entry in entries]:
                     hint_counts[hints] += 1
                 for j in range(0, len(valid_hints)):
                     df.loc[i*len(valid_hints) + j] = [
-                        self.utils.remove_emojis(self.utils.get_nickname(user_id)),
+                        self.utils.remove_emojis(self.utils.get_nickname(ctx.guild.id, user_id)),
                         valid_hints[j],
                         hint_counts[j]
                     ]
-            g = sns.catplot(x='Hints', y='Count', hue='Player', data=df, kind='bar')
-            for ax in g.axes.ravel():
-                for c in ax.containers:
-                    labels = ['%d' % v.get_height() for v in c]
-                    ax.bar_label(c, labels=labels, label_type='edge', fontsize=15)
-            fig = plt.gcf()
-            fig.subplots_adjust(bottom=0.2)
-            fig.set_size_inches(15, 5)
-            hist_img = self.utils.fig_to_image(fig)
-            hist_img = self.utils.resize_image(hist_img, width = stats_img.size[0])
-            plt.close()
-
-        if hist_img is not None:
-            stats_img = self.utils.combine_images(stats_img, hist_img)
+            hist_img = await self.utils.get_bar_chart(df, BarChartSpec(x='Hints', y='Count', hue='Player', width=15, height=5))
+            stats_img = await self.utils.stack_images(stats_img, hist_img)
 
         if stats_img is not None:
-            stats_binary = self.utils.image_to_binary(stats_img)
-            if missing_users_str is None:
-                await ctx.reply(file=discord.File(fp=stats_binary, filename='image.png'))
-            else:
-                await ctx.reply(missing_users_str, file=discord.File(fp=stats_binary, filename='image.png'))
+            with io.BytesIO(stats_img) as stats_binary:
+                if missing_users_str is None:
+                    await ctx.reply(file=discord.File(fp=stats_binary, filename='image.png'))
+                else:
+                    await ctx.reply(missing_users_str, file=discord.File(fp=stats_binary, filename='image.png'))
         else:
             await ctx.reply("Sorry, an error occurred while trying to fetch stats.")
 
@@ -336,8 +325,8 @@ class StrandsCommandHandler(BaseCommandHandler):
             await ctx.reply("Could not understand command. Try `?remove <user> <puzzle #>`.")
             return
 
-        if user_id in self.db.get_all_players() and puzzle_id in self.db.get_all_puzzles():
-            if self.db.remove_entry(user_id, puzzle_id):
+        if user_id in await self.db.get_all_players(ctx.guild.id) and puzzle_id in await self.db.get_all_puzzles(ctx.guild.id):
+            if await self.db.remove_entry(ctx.guild.id, user_id, puzzle_id):
                 await ctx.message.add_reaction('✅')
             else:
                 await ctx.message.add_reaction('❌')
@@ -355,7 +344,7 @@ class StrandsCommandHandler(BaseCommandHandler):
                 title = f"{args[0]} {args[1]}"
                 content = '\n'.join(args[2:])
             if self.utils.is_strands_submission(title):
-                if self.db.add_entry(user_id, title, content):
+                if await self.db.add_entry(ctx.guild.id, user_id, title, content):
                     await ctx.message.add_reaction('✅')
                 else:
                     await ctx.message.add_reaction('❌')
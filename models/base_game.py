@@ -8,9 +8,19 @@ class PuzzleQueryType(Enum):
 
 class BasePlayerStats(Protocol):
     user_id: str
+    entry_count: int
     missed_games: int
     rank: int
 
 class BasePuzzleEntry(Protocol):
     puzzle_id: int
     user_id: str
+
+# behaves like statistics.mean on the underlying values: integer totals that
+# divide evenly stay ints (the single-puzzle leaderboards format them with :d)
+def get_mean(total: int | float, count: int) -> int | float:
+    if count <= 0:
+        return 0
+    if isinstance(total, int) and total % count == 0:
+        return total // count
+    return total / count
@@ -1,23 +1,21 @@
-import statistics as stats
-from data.base_data_handler import BaseDatabaseHandler
-from models.base_game import BasePlayerStats, BasePuzzleEntry
+from models.base_game import BasePlayerStats, BasePuzzleEntry, get_mean
 
 class ConnectionsPlayerStats(BasePlayerStats):
     # connections-specific stats
     raw_mean: float
     adj_mean: float
 
-    def __init__(self, user_id: str, puzzle_list: list[int], db: BaseDatabaseHandler) -> None:
-        self.user_id = user_id
-
-        player_puzzles = db.get_puzzles_by_player(self.user_id)
-        player_entries: list[ConnectionsPuzzleEntry] = db.get_entries_by_player(self.user_id, puzzle_list)
+    # contants
+    MISSED_PENALTY: int = 8
 
-        self.missed_games = len([p for p in puzzle_list if p not in player_puzzles])
+    def __init__(self, user_id: str, puzzle_count: int = 0, entry_count: int = 0, score_total: int = 0) -> None:
+        self.user_id = user_id
+        self.entry_count = entry_count
+        self.missed_games = max(puzzle_count - entry_count, 0)
 
-        if len(player_entries) > 0:
-            self.raw_mean = stats.mean([e.score for e in player_entries])
-            self.adj_mean = stats.mean([e.score for e in player_entries] + ([8] * self.missed_games))
+        if entry_count > 0:
+            self.raw_mean = get_mean(score_total, entry_count)
+            self.adj_mean = get_mean(score_total + self.MISSED_PENALTY * self.missed_games, entry_count + self.missed_games)
         else:
             self.raw_mean = 0
             self.adj_mean = 0
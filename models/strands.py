@@ -1,6 +1,4 @@
-import statistics as stats
-from data.base_data_handler import BaseDatabaseHandler
-from models.base_game import BasePlayerStats, BasePuzzleEntry
+from models.base_game import BasePlayerStats, BasePuzzleEntry, get_mean
 
 class StrandsPlayerStats(BasePlayerStats):
     # strands-specific stats
@@ -9,19 +7,20 @@ class StrandsPlayerStats(BasePlayerStats):
     avg_rating_raw: float
     avg_rating_adj: float
 
-    def __init__(self, user_id: str, puzzle_list: list[int], db: BaseDatabaseHandler) -> None:
-        self.user_id = user_id
-
-        player_puzzles = db.get_puzzles_by_player(self.user_id)
-        player_entries: list[StrandsPuzzleEntry] = db.get_entries_by_player(self.user_id, puzzle_list)
+    # contants
+    MISSED_PENALTY: float = 2.0
 
-        self.missed_games = len([p for p in puzzle_list if p not in player_puzzles])
+    def __init__(self, user_id: str, puzzle_count: int = 0, entry_count: int = 0, hints_total: int = 0,
+                 spangram_total: int = 0, spangram_count: int = 0, rating_total: float = 0.0) -> None:
+        self.user_id = user_id
+        self.entry_count = entry_count
+        self.missed_games = max(puzzle_count - entry_count, 0)
 
-        if len(player_entries) > 0:
-            self.avg_hints = stats.mean([e.hints for e in player_entries])
-            self.avg_spangram_index = stats.mean([e.spangram_index for e in player_entries if e.spangram_index > 0])
-            self.avg_rating_raw = stats.mean([e.rating for e in player_entries])
-            self.avg_rating_adj = stats.mean([e.rating for e in player_entries] + ([2.0] * self.missed_games))
+        if entry_count > 0:
+            self.avg_hints = get_mean(hints_total, entry_count)
+            self.avg_spangram_index = get_mean(spangram_total, spangram_count)
+            self.avg_rating_raw = get_mean(rating_total, entry_count)
+            self.avg_rating_adj = get_mean(rating_total + self.MISSED_PENALTY * self.missed_games, entry_count + self.missed_games)
         else:
             self.avg_hints = 0.0
             self.avg_spangram_index = 0.0
@@ -1,6 +1,4 @@
-import statistics as stats
-from data.base_data_handler import BaseDatabaseHandler
-from models.base_game import BasePlayerStats, BasePuzzleEntry
+from models.base_game import BasePlayerStats, BasePuzzleEntry, get_mean
 
 class WordlePlayerStats(BasePlayerStats):
     # wordle-specific stats
@@ -10,20 +8,21 @@ class WordlePlayerStats(BasePlayerStats):
     raw_mean: float
     adj_mean: float
 
-    def __init__(self, user_id: str, puzzle_list: list[int], db: BaseDatabaseHandler) -> None:
-        self.user_id = user_id
-
-        player_puzzles = db.get_puzzles_by_player(self.user_id)
-        player_entries: list[WordlePuzzleEntry] = db.get_entries_by_player(self.user_id, puzzle_list)
+    # contants
+    MISSED_PENALTY: int = 7
 
-        self.missed_games = len([p for p in puzzle_list if p not in player_puzzles])
-
-        if len(player_entries) > 0:
-            self.raw_mean = stats.mean([e.score for e in player_entries])
-            self.adj_mean = stats.mean([e.score for e in player_entries] + ([7] * self.missed_games))
-            self.avg_green = stats.mean([e.green for e in player_entries])
-            self.avg_yellow = stats.mean([e.yellow for e in player_entries])
-            self.avg_other = stats.mean([e.other for e in player_entries])
+    def __init__(self, user_id: str, puzzle_count: int = 0, entry_count: int = 0, score_total: int = 0,
+                 green_total: int = 0, yellow_total: int = 0, other_total: int = 0) -> None:
+        self.user_id = user_id
+        self.entry_count = entry_count
+        self.missed_games = max(puzzle_count - entry_count, 0)
+
+        if entry_count > 0:
+            self.raw_mean = get_mean(score_total, entry_count)
+            self.adj_mean = get_mean(score_total + self.MISSED_PENALTY * self.missed_games, entry_count + self.missed_games)
+            self.avg_green = get_mean(green_total, entry_count)
+            self.avg_yellow = get_mean(yellow_total, entry_count)
+            self.avg_other = get_mean(other_total, entry_count)
         else:
             self.raw_mean = 0
             self.adj_mean = 0
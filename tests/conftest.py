@@ -0,0 +1,56 @@
+import os, pytest
+from data.backends import MySQLBackend
+from data.wordle import WordleDatabaseHandler
+from utils.bot_utilities import BotUtilities
+
+GUILD_ID = 10**18
+
+class FakeMember():
+    def __init__(self, user_id: int, display_name: str) -> None:
+        self.id: int = user_id
+        self.display_name: str = display_name
+
+class FakeGuild():
+    def __init__(self, guild_id: int, members: list[FakeMember]) -> None:
+        self.id: int = guild_id
+        self.members: list[FakeMember] = members
+
+    async def query_members(self, user_ids: list[int], limit: int, cache: bool) -> list[FakeMember]:
+        return []
+
+class FakeBot():
+    def __init__(self, guild: FakeGuild) -> None:
+        self.guild: FakeGuild = guild
+
+    def get_guild(self, guild_id: int) -> FakeGuild:
+        return self.guild if guild_id == self.guild.id else None
+
+def get_mysql_backend() -> MySQLBackend:
+    # MySQL tests run against the TEST_MYSQL_* database, and are skipped without one
+    if not os.environ.get('TEST_MYSQL_HOST'):
+        pytest.skip("TEST_MYSQL_HOST is not set")
+    return MySQLBackend(
+        os.environ['TEST_MYSQL_HOST'],
+        os.environ.get('TEST_MYSQL_USER', "root"),
+        os.environ.get('TEST_MYSQL_PASS', ""),
+        os.environ.get('TEST_MYSQL_DB_NAME', "nyt_games_test")
+    )
+
+@pytest.fixture
+def utils(monkeypatch) -> BotUtilities:
+    monkeypatch.setenv('TABLE_RENDERER', 'pillow')
+    utils = BotUtilities(FakeBot(FakeGuild(GUILD_ID, [FakeMember(111, "Player 111"), FakeMember(222, "Player 222")])))
+    yield utils
+    utils.close()
+
+@pytest.fixture
+def wordle_db(utils, tmp_path, monkeypatch) -> WordleDatabaseHandler:
+    # a per-game SQLite database with only the query cache in front of it
+    monkeypatch.setenv('WORDLE_STORAGE', 'sqlite')
+    monkeypatch.setenv('WORDLE_SQLITE_PATH', str(tmp_path / 'wordle.db'))
+    monkeypatch.setenv('SHARED_DATABASE', 'false')
+    monkeypatch.setenv('WORDLE_MEMORY_STORE', 'false')
+    monkeypatch.setenv('WORDLE_PLAYER_TOTALS', 'false')
+    db = WordleDatabaseHandler(utils)
+    yield db
+    db.close()
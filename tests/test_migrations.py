@@ -0,0 +1,110 @@
+import asyncio
+import pytest
+import data.base_data_handler
+from data.backends import Cursor, SQLiteBackend, StorageBackend
+from data.migrations import MIGRATIONS
+from data.pool import DatabasePool
+from data.wordle import WordleDatabaseHandler
+from tests.conftest import GUILD_ID, get_mysql_backend
+
+ENTRY_DEFINITIONS = ['score tinyint unsigned not null', 'green tinyint unsigned not null', 'yellow tinyint unsigned not null', 'other tinyint unsigned not null']
+MIGRATED_TABLES = ['schema_migrations', 'backfill_marks', 'users', 'entries', 'users_migrating', 'entries_migrating',
+    'users_pre_v1', 'entries_pre_v1', 'users_pre_v3', 'entries_pre_v3']
+
+def test_guild_migration_keeps_earlier_backups(tmp_path, monkeypatch) -> None:
+    # a legacy database can only be MySQL, so here the v1 backup is laid down by hand
+    monkeypatch.setenv('GUILD_ID', str(GUILD_ID))
+    backend = SQLiteBackend(str(tmp_path / 'migrations.db'))
+    pool = DatabasePool(backend, 1, "test")
+
+    def set_up_v2(cur: Cursor) -> None:
+        for migration in MIGRATIONS[:2]:
+            migration.apply(cur, backend, ENTRY_DEFINITIONS)
+        cur.execute("create table users_pre_v1 (user_id text, name text)")
+        cur.execute("insert into users_pre_v1 (user_id, name) values ('not-a-number', 'Legacy'), ('111', 'Player 111')")
+        cur.execute("insert into users (user_id, name) values (111, 'Player 111')")
+        cur.execute("insert into entries (puzzle_id, user_id, score, green, yellow, other) values (900, 111, 3, 6, 1, 8)")
+
+    async def run() -> None:
+        await pool.transaction(set_up_v2)
+        await pool.transaction(lambda cur: MIGRATIONS[2].apply(cur, backend, ENTRY_DEFINITIONS))
+        assert await pool.fetchall("select user_id, name from users_pre_v1 order by user_id") == [('111', 'Player 111'), ('not-a-number', 'Legacy')]
+        assert await pool.fetchall("select user_id, name from users_pre_v3") == [(111, 'Player 111')]
+        assert await pool.fetchall("select guild_id, user_id, name from users") == [(GUILD_ID, 111, 'Player 111')]
+        assert await pool.fetchall("select guild_id, puzzle_id, user_id from entries") == [(GUILD_ID, 900, 111)]
+
+    try:
+        asyncio.run(run())
+    finally:
+        pool.close()
+
+def test_legacy_upgrade_keeps_legacy_tables(utils, monkeypatch) -> None:
+    backend: StorageBackend = get_mysql_backend()
+    monkeypatch.setenv('GUILD_ID', str(GUILD_ID))
+    monkeypatch.setenv('SHARED_DATABASE', 'false')
+    monkeypatch.setenv('WORDLE_STORAGE', 'mysql')
+    monkeypatch.setenv('WORDLE_MYSQL_HOST', backend.host)
+    monkeypatch.setenv('WORDLE_MYSQL_USER', backend.user)
+    monkeypatch.setenv('WORDLE_MYSQL_PASS', backend.password)
+    monkeypatch.setenv('WORDLE_MYSQL_DB_NAME', backend.database)
+    pool = DatabasePool(backend, 1, "test")
+
+    def set_up_legacy(cur: Cursor) -> None:
+        # the baseline bot's text-keyed tables, with the rows v1 drops (non-numeric ids) and merges (duplicates)
+        for table in MIGRATED_TABLES:
+            cur.execute(f"drop table if exists {table}")
+        cur.execute("create table users (user_id varchar(32), name varchar(255))")
+        cur.execute("create table entries (puzzle_id int, user_id varchar(32), score int, green int, yellow int, other int)")
+        cur.execute("insert into users (user_id, name) values ('111', 'Player 111'), ('111', 'Player 111'), ('not-a-number', 'Legacy')")
+        cur.execute("insert into entries (puzzle_id, user_id, score, green, yellow, other) "
+            + "values (900, '111', 4, 5, 2, 10), (900, '111', 3, 6, 1, 8), (900, 'not-a-number', 3, 6, 1, 8)")
+
+    async def run() -> None:
+        await pool.transaction(set_up_legacy)
+        db = WordleDatabaseHandler(utils)
+        try:
+            await db.connect()
+        finally:
+            db.close()
+        assert len(await pool.fetchall("select 1 from users_pre_v1")) == 3
+        assert len(await pool.fetchall("select 1 from entries_pre_v1")) == 3
+        assert await pool.fetchall("select user_id from users_pre_v3") == [(111,)]
+        assert await pool.fetchall("select guild_id, user_id from users") == [(GUILD_ID, 111)]
+        assert await pool.fetchall("select guild_id, puzzle_id, user_id from entries") == [(GUILD_ID, 900, 111)]
+        await pool.transaction(lambda cur: [cur.execute(f"drop table if exists {table}") for table in MIGRATED_TABLES])
+
+    try:
+        asyncio.run(run())
+    finally:
+        pool.close()
+
+@pytest.mark.parametrize('guild_id', [None, '', 'not-a-number', '0'])
+def test_guild_migration_needs_guild_id_for_existing_rows(guild_id: str, wordle_db: WordleDatabaseHandler, monkeypatch) -> None:
+    if guild_id is None:
+        monkeypatch.delenv('GUILD_ID', raising=False)
+    else:
+        monkeypatch.setenv('GUILD_ID', guild_id)
+
+    async def run() -> None:
+        # a database from before guilds were tracked, with one entry in it
+        with monkeypatch.context() as m:
+            m.setattr(data.base_data_handler, 'MIGRATIONS', MIGRATIONS[:2])
+            await wordle_db.connect()
+        await wordle_db._transaction(lambda cur: cur.execute("insert into users (user_id, name) values (111, 'Player 111')"))
+        await wordle_db._transaction(lambda cur: cur.execute("insert into entries (puzzle_id, user_id, score, green, yellow, other) values (900, 111, 3, 6, 1, 8)"))
+
+        with pytest.raises(Exception, match='GUILD_ID'):
+            await wordle_db.connect()
+        assert await wordle_db._fetchall("select version from schema_migrations order by version") == [(1,), (2,)]
+        assert await wordle_db._fetchall("select puzzle_id, user_id from entries") == [(900, 111)]
+
+    asyncio.run(run())
+
+def test_guild_migration_of_empty_database_needs_no_guild_id(wordle_db: WordleDatabaseHandler, monkeypatch) -> None:
+    monkeypatch.delenv('GUILD_ID', raising=False)
+
+    async def run() -> None:
+        await wordle_db.connect()
+        assert await wordle_db._fetchall("select version from schema_migrations order by version") == [(1,), (2,), (3,)]
+
+    asyncio.run(run())
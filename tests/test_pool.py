@@ -0,0 +1,66 @@
+import asyncio, threading
+import pytest
+from data.backends import Cursor, SQLiteBackend, StorageBackend
+from data.pool import DatabasePool
+from tests.conftest import get_mysql_backend
+
+class BarrierBackend():
+    # holds each select until every worker has reached one, so a gathered set of reads runs on distinct workers
+    def __init__(self, backend: StorageBackend) -> None:
+        self.backend: StorageBackend = backend
+        self.disconnect_errors = backend.disconnect_errors
+        self.barrier: threading.Barrier = None
+
+    def __getattr__(self, name: str):
+        return getattr(self.backend, name)
+
+    def get_cursor(self, db) -> Cursor:
+        return BarrierCursor(self, self.backend.get_cursor(db))
+
+class BarrierCursor():
+    def __init__(self, backend: BarrierBackend, cur: Cursor) -> None:
+        self._backend: BarrierBackend = backend
+        self._cur: Cursor = cur
+
+    def __getattr__(self, name: str):
+        return getattr(self._cur, name)
+
+    def execute(self, query: str, params: tuple = (), **kwargs):
+        if self._backend.barrier is not None and query.lstrip().lower().startswith('select'):
+            self._backend.barrier.wait(timeout=5)
+        return self._cur.execute(query, params, **kwargs)
+
+@pytest.fixture(params=['sqlite', 'mysql'])
+def backend(request, tmp_path) -> StorageBackend:
+    if request.param == 'sqlite':
+        return SQLiteBackend(str(tmp_path / 'pool.db'))
+    return get_mysql_backend()
+
+def test_commit_is_visible_to_every_worker(backend: StorageBackend) -> None:
+    workers = 2
+    barrier_backend = BarrierBackend(backend)
+    pool = DatabasePool(barrier_backend, workers, "test")
+
+    async def read_on_every_worker() -> list[int]:
+        barrier_backend.barrier = threading.Barrier(workers)
+        try:
+            results = await asyncio.gather(*[pool.fetchall("select count(*) from pool_visibility") for _ in range(workers)])
+        finally:
+            barrier_backend.barrier = None
+        return [rows[0][0] for rows in results]
+
+    async def run() -> None:
+        await pool.transaction(lambda cur: cur.execute("drop table if exists pool_visibility"))
+        await pool.transaction(lambda cur: cur.execute("create table pool_visibility (id int not null)"))
+        try:
+            # every worker has read (and, on MySQL, would be holding a snapshot) before the write
+            assert await read_on_every_worker() == [0] * workers
+            await pool.transaction(lambda cur: cur.execute("insert into pool_visibility (id) values (1)"))
+            assert await read_on_every_worker() == [1] * workers
+        finally:
+            await pool.transaction(lambda cur: cur.execute("drop table if exists pool_visibility"))
+
+    try:
+        asyncio.run(run())
+    finally:
+        pool.close()
@@ -0,0 +1,35 @@
+import asyncio
+from data.wordle import WordleDatabaseHandler
+from tests.conftest import GUILD_ID
+
+PUZZLE_ID = 900
+TITLE = f"Wordle {PUZZLE_ID} 3/6"
+GRID = "\n⬜🟨⬜⬜⬜\n🟩🟩⬜🟨⬜\n🟩🟩🟩🟩🟩"
+
+def test_write_during_query_is_not_hidden_by_cache(wordle_db: WordleDatabaseHandler) -> None:
+    async def run() -> None:
+        await wordle_db.connect()
+        assert await wordle_db.add_entry(GUILD_ID, '111', TITLE, GRID)
+
+        # 222's entry commits after the leaderboard was read but before its result is cached
+        fetchall = wordle_db._fetchall
+        writes = []
+
+        async def fetchall_then_write(query: str, params: tuple = ()) -> list[tuple]:
+            rows = await fetchall(query, params)
+            if len(writes) == 0:
+                writes.append(await wordle_db.add_entry(GUILD_ID, '222', TITLE, GRID))
+            return rows
+
+        wordle_db._fetchall = fetchall_then_write
+        try:
+            stale = await wordle_db.get_leaderboard(GUILD_ID, [PUZZLE_ID])
+        finally:
+            wordle_db._fetchall = fetchall
+        assert writes == [True]
+        assert [stats.user_id for stats in stale] == ['111']
+
+        leaderboard = await wordle_db.get_leaderboard(GUILD_ID, [PUZZLE_ID])
+        assert sorted([stats.user_id for stats in leaderboard]) == ['111', '222']
+
+    asyncio.run(run())
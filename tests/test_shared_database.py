@@ -0,0 +1,56 @@
+import asyncio
+import pytest
+import data.pool
+from data.base_data_handler import BaseDatabaseHandler
+from data.connections import ConnectionsDatabaseHandler
+from data.strands import StrandsDatabaseHandler
+from data.wordle import WordleDatabaseHandler
+from tests.conftest import GUILD_ID
+
+# a first and second puzzle's result for each game
+RESULTS = {
+    'wordle': (WordleDatabaseHandler, [("Wordle 900 3/6", "\n⬜🟨⬜⬜⬜\n🟩🟩⬜🟨⬜\n🟩🟩🟩🟩🟩"), ("Wordle 901 2/6", "\n🟩🟨⬜⬜⬜\n🟩🟩🟩🟩🟩")]),
+    'connections': (ConnectionsDatabaseHandler, [("Connections\nPuzzle #300", "🟨🟨🟨🟨\n🟩🟩🟩🟩\n🟦🟦🟦🟦\n🟪🟪🟪🟪"),
+        ("Connections\nPuzzle #301", "🟨🟨🟩🟨\n🟨🟨🟨🟨\n🟩🟩🟩🟩\n🟦🟦🟦🟦\n🟪🟪🟪🟪")]),
+    'strands': (StrandsDatabaseHandler, [("Strands #100\n“Theme”", "🔵🔵🟡🔵\n🔵🔵🔵"), ("Strands #101\n“Theme”", "💡🔵🔵🟡\n🔵🔵🔵🔵")]),
+}
+
+@pytest.mark.parametrize('game', list(RESULTS))
+def test_removed_player_matches_with_and_without_store(game: str, utils, tmp_path, monkeypatch) -> None:
+    # with a shared database a game's players come from its entries, so removing a player's last one stops tracking them
+    prefix = game.upper()
+    monkeypatch.setattr(data.pool, '_shared_pool', None)
+    monkeypatch.setenv('SHARED_DATABASE', 'true')
+    monkeypatch.setenv('SHARED_STORAGE', 'sqlite')
+    monkeypatch.setenv('SHARED_SQLITE_PATH', str(tmp_path / 'nyt_games.db'))
+    monkeypatch.setenv(f'{prefix}_PLAYER_TOTALS', 'false')
+    handler_type, results = RESULTS[game]
+
+    monkeypatch.setenv(f'{prefix}_MEMORY_STORE', 'true')
+    stored: BaseDatabaseHandler = handler_type(utils)
+    monkeypatch.setenv(f'{prefix}_MEMORY_STORE', 'false')
+    unstored: BaseDatabaseHandler = handler_type(utils)
+
+    async def get_players(db: BaseDatabaseHandler, puzzle_id: int) -> tuple[list[str], list[str]]:
+        return sorted(await db.get_all_players(GUILD_ID)), sorted(await db.get_missing_players(GUILD_ID, puzzle_id))
+
+    async def run() -> None:
+        await stored.connect()
+        await unstored.connect()
+        (first_title, first_grid), (second_title, second_grid) = results
+        assert await stored.add_entry(GUILD_ID, '111', first_title, first_grid)
+        assert await stored.add_entry(GUILD_ID, '222', first_title, first_grid)
+        assert await stored.add_entry(GUILD_ID, '222', second_title, second_grid)
+        first_puzzle, second_puzzle = stored.parse_entry(first_title, first_grid)[0], stored.parse_entry(second_title, second_grid)[0]
+        # the store is built before the removal, so the write-through has to drop the player from it
+        assert await get_players(stored, second_puzzle) == (['111', '222'], ['111'])
+
+        assert await stored.remove_entry(GUILD_ID, '111', first_puzzle)
+        assert await get_players(stored, second_puzzle) == (['222'], [])
+        assert await get_players(unstored, second_puzzle) == (['222'], [])
+
+    try:
+        asyncio.run(run())
+    finally:
+        stored.close()
+        unstored.close()
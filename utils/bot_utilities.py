@@ -1,13 +1,15 @@
-import discord, io, re
-import matplotlib.pyplot as plt
-from bokeh.io.export import get_screenshot_as_png
-from bokeh.models import ColumnDataSource, DataTable, TableColumn
+import asyncio, discord, importlib, re
+import numpy as np
 from enum import Enum, auto
 from datetime import date, datetime, timedelta, timezone
 from discord.ext import commands
-from PIL import Image
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
+from PIL import Image, ImageOps
+from utils.driver_pool import ChromeDriverPool
+from utils.nickname_index import NicknameIndex
+from utils.metrics import Metrics
+from utils.perf import PerfRecorder
+from utils.render_executor import BarChartSpec, RenderExecutor, image_to_png, render_bar_chart, render_table, stack_images
+from utils.table_renderers import TableRenderer, get_table_renderer
 
 class NYTGame(Enum):
     CONNECTIONS = auto()
@@ -15,10 +17,40 @@ class NYTGame(Enum):
     WORDLE = auto()
     UNKNOWN = auto()
 
+class Submission():
+    def __init__(self, game: NYTGame, title: str, grid: str) -> None:
+        self.game: NYTGame = game
+        self.title: str = title
+        self.grid: str = grid
+
 class BotUtilities():
-    def __init__(self, client: discord.Client, bot: commands.Bot) -> None:
-        self.client: discord.Client = client
+    # imported by the command handlers on first use rather than at startup
+    LAZY_IMPORTS: list[str] = ['pandas']
+
+    # submission titles; every message in the guild is checked against these
+    SUBMISSION_PREFIXES: tuple[str, ...] = ('Wordle', 'Connections', 'Strands')
+    WORDLE_PATTERN = re.compile(r'^Wordle (\d+|\d{1,3}(,\d{3})*)( 🎉)? (\d|X)\/\d$')
+    CONNECTIONS_PATTERN = re.compile(r'^Connections *(\n)Puzzle #(\d+)')
+    STRANDS_PATTERN = re.compile(r'Strands #(\d+)')
+
+    def __init__(self, bot: commands.Bot) -> None:
         self.bot: commands.Bot = bot
+        self.driver_pool: ChromeDriverPool = ChromeDriverPool()
+        self.table_renderer: TableRenderer = get_table_renderer(self.driver_pool)
+        self.render_executor: RenderExecutor = RenderExecutor()
+        # one index per guild, since a member's display name differs between guilds
+        self.nicknames: dict[int, NicknameIndex] = {}
+        self.metrics: Metrics = Metrics()
+        self.perf: PerfRecorder = PerfRecorder(self.metrics)
+
+    def close(self) -> None:
+        self.render_executor.close()
+        self.driver_pool.close()
+
+    async def warm_up_imports(self) -> None:
+        # off the event loop, so the first command after a restart doesn't pay for the import
+        for module in self.LAZY_IMPORTS + self.table_renderer.lazy_imports:
+            await asyncio.to_thread(importlib.import_module, module)
 
     # GAME TYPE
 
@@ -35,12 +67,35 @@ class BotUtilities():
 
     # QUERIES
 
-    def get_nickname(self, user_id: str) -> str:
-        guild = self.bot.get_guild(self.bot.guild_id)
-        for member in guild.members:
-            if str(member.id) == str(user_id):
-                return member.display_name
-        return "?"
+    def get_nickname(self, guild_id: int, user_id: str) -> str:
+        name = self.get_nicknames(guild_id).get(int(user_id))
+        return name if name is not None else "?"
+
+    def get_nicknames(self, guild_id: int) -> NicknameIndex:
+        # built from the guild's member cache the first time one of its names is needed
+        nicknames = self.nicknames.get(guild_id)
+        if nicknames is None:
+            nicknames = self.nicknames[guild_id] = NicknameIndex()
+        if not nicknames.loaded:
+            guild = self.bot.get_guild(guild_id)
+            if guild is not None:
+                nicknames.load(guild.members)
+        return nicknames
+
+    def clear_nicknames(self, guild_id: int = None) -> None:
+        # names can have changed while the bot was away; defaults to every guild
+        if guild_id is None:
+            self.nicknames.clear()
+        else:
+            self.nicknames.pop(guild_id, None)
+
+    async def fetch_nicknames(self, guild_id: int, user_ids: list[str]) -> None:
+        # batch-fetches the members a following get_nickname() would miss
+        guild = self.bot.get_guild(guild_id)
+        if guild is None:
+            return
+        with self.perf.stage('nicknames'):
+            await self.get_nicknames(guild_id).fetch(guild, [int(user_id) for user_id in user_ids])
 
    # VALIDATION
 
@@ -57,13 +112,38 @@ class BotUtilities():
             return False
 
     def is_wordle_submission(self, line: str) -> str:
-        return re.match(r'^Wordle (\d+|\d{1,3}(,\d{3})*)( 🎉)? (\d|X)\/\d$', line)
+        return self.WORDLE_PATTERN.match(line)
 
     def is_connections_submission(self, lines: str) -> str:
-        return re.match(r'^Connections *(\n)Puzzle #\d+', lines)
+        return self.CONNECTIONS_PATTERN.match(lines)
 
     def is_strands_submission(self, lines: str) -> str:
-        return re.match(r'Strands #\d+', lines)
+        return self.STRANDS_PATTERN.match(lines)
+
+    # PARSING
+
+    def get_submission(self, content: str) -> Submission:
+        # returns the parsed submission if the message is a shared puzzle result, otherwise None.
+        # ordinary chat is turned away by the prefix check, before anything is split or matched
+        prefixes = self.SUBMISSION_PREFIXES
+        if not (content.startswith(prefixes) or content[:1].isspace() and content.lstrip().startswith(prefixes)):
+            return None
+        if content.count('\n') < 2:
+            return None
+        lines = content.splitlines()
+        first_line = lines[0].strip()
+        if first_line.startswith('Wordle'):
+            if self.WORDLE_PATTERN.match(first_line) is not None:
+                return Submission(NYTGame.WORDLE, first_line, '\n'.join(lines[1:]))
+        elif first_line.startswith('Connections'):
+            first_two_lines = f"{lines[0]}\n{lines[1]}"
+            if self.CONNECTIONS_PATTERN.match(first_two_lines) is not None:
+                return Submission(NYTGame.CONNECTIONS, first_two_lines, '\n'.join(lines[2:]))
+        else:
+            first_two_lines = f"{lines[0]}\n{lines[1]}"
+            if self.STRANDS_PATTERN.match(first_two_lines) is not None:
+                return Submission(NYTGame.STRANDS, first_two_lines, '\n'.join(lines[2:]))
+        return None
 
     # DATES/TIMES
 
@@ -92,83 +172,49 @@ class BotUtilities():
     def convert_date_to_str(self, query_date: date) -> str:
         return query_date.strftime(f'%m/%d/%Y')
 
-    # DATA FRAME TO IMAGE
+    # RENDERING
 
-    def get_image_from_df(self, df) -> Image.Image:
-        source = ColumnDataSource(df)
+    async def get_image_from_df(self, df) -> bytes:
+        with self.perf.stage('render'), self.metrics.time('nyt_render_duration_seconds', backend=self.table_renderer.name):
+            if self.table_renderer.process_safe:
+                return await self.render_executor.submit(render_table, df)
+            # browser renders mostly wait on Chrome, so a thread is enough
+            return await asyncio.to_thread(self._render_table, df)
 
-        df_columns = df.columns.values
-        columns_for_table=[]
-        for column in df_columns:
-            columns_for_table.append(TableColumn(field=column, title=column))
+    async def get_bar_chart(self, df, spec: BarChartSpec) -> bytes:
+        with self.perf.stage('chart'), self.metrics.time('nyt_render_duration_seconds', backend='matplotlib'):
+            return await self.render_executor.submit(render_bar_chart, df, spec)
 
-        data_table = DataTable(source=source, columns=columns_for_table, index_position=None, reorderable=False, autosize_mode="fit_columns")
+    async def stack_images(self, top_png: bytes, bottom_png: bytes) -> bytes:
+        with self.perf.stage('chart'):
+            return await self.render_executor.submit(stack_images, top_png, bottom_png)
 
-        chrome_options = webdriver.ChromeOptions()
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument('--headless')
-
-        service = Service(executable_path='/usr/bin/chromedriver')
-        driver = webdriver.Chrome(service=service, options=chrome_options)
-
-        generated: Image.Image = get_screenshot_as_png(data_table, driver=driver)
-        return self._trim_image(generated)
+    def _render_table(self, df) -> bytes:
+        generated: Image.Image = self.table_renderer.render(df)
+        if self.table_renderer.trim_whitespace:
+            generated = self._trim_image(generated)
+        return image_to_png(generated) if generated is not None else None
 
     def _trim_image(self, image: Image.Image) -> Image.Image:
         if image is None:
             return None
         rgb_image = image.convert('RGB')
         width, height = image.size
-        for y in reversed(range(height)):
-            for x in range(0, max(15, width)):
-                rgb = rgb_image.getpixel((x, y))
-                if rgb != (255, 255, 255):
-                    # account for differences in browsers
-                    if x < 10 and rgb in [(254, 254, 254), (240, 240, 240)]:
-                        return rgb_image.crop([5, 5, width, y])
-                    else:
-                        return rgb_image.crop([5, 5, width, y + 8])
-
-        return rgb_image
-
-    def fig_to_image(self, fig: plt.Figure) -> Image.Image:
-        buf = io.BytesIO()
-        fig.savefig(buf)
-        buf.seek(0)
-        img = Image.open(buf)
-        return img
-
-    def image_to_binary(self, img: Image.Image) -> io.BytesIO:
-        buf = io.BytesIO()
-        img.save(buf, 'PNG')
-        buf.seek(0)
-        return buf
-
-    def combine_images(self, img1: Image.Image, img2: Image.Image) -> Image.Image:
-        widths, heights = zip(*(i.size for i in [img1, img2]))
-        w = max(widths)
-        h = sum(heights)
-        combo = Image.new('RGBA', (w, h))
-        combo.paste(img1, (0, 0))
-        combo.paste(img2, (0, img1.size[1]))
-        return combo
-
-    def resize_image(self, image: Image.Image, width: int = None, height: int = None) -> Image.Image:
-        w, h = image.size
-        if width is None and height is None:
-            return image
-        if width is None:
-            r = height / float(h)
-            dim = (int(w * r), height)
+        # inverted, white becomes black, so the bounding box covers everything non-white
+        bbox = ImageOps.invert(rgb_image).getbbox()
+        if bbox is None:
+            return rgb_image
+
+        # bottom-most row with content, and the first non-white pixel in it
+        y = bbox[3] - 1
+        row = np.asarray(rgb_image.crop([0, y, width, y + 1]))[0]
+        x = int(np.argmax((row != 255).any(axis=1)))
+        rgb = tuple(int(c) for c in row[x])
+        # account for differences in browsers
+        if x < 10 and rgb in [(254, 254, 254), (240, 240, 240)]:
+            return rgb_image.crop([5, 5, width, y])
         else:
-            r = width / float(w)
-            dim = (width, int(h * r))
-        try:
-            return image.resize(dim)
-        except Exception as e:
-            print('Caught exception: ' + str(e))
-            return None
+            return rgb_image.crop([5, 5, width, y + 8])
 
     def remove_emojis(self, data: str) -> str:
         emoj = re.compile("["
@@ -0,0 +1,108 @@
+import os, queue, threading
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Iterator
+
+if TYPE_CHECKING:
+    from selenium import webdriver
+
+class PooledDriver():
+    def __init__(self, driver: 'webdriver.Chrome') -> None:
+        self.driver: 'webdriver.Chrome' = driver
+        self.renders: int = 0
+
+class ChromeDriverPool():
+    def __init__(self, max_drivers: int = None, max_renders: int = None, timeout: float = None) -> None:
+        self.max_drivers: int = max_drivers or int(os.environ.get('CHROME_POOL_SIZE', 2))
+        self.max_renders: int = max_renders or int(os.environ.get('CHROME_MAX_RENDERS', 50))
+        self.timeout: float = timeout or float(os.environ.get('CHROME_CHECKOUT_TIMEOUT', 30))
+        self._idle: queue.LifoQueue[PooledDriver] = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.max_drivers)
+        self._lock = threading.Lock()
+        self._live: list[PooledDriver] = []
+        self._closed = False
+
+    # CHECKOUT/CHECKIN
+
+    @contextmanager
+    def driver(self) -> Iterator['webdriver.Chrome']:
+        pooled = self.checkout()
+        healthy = False
+        try:
+            yield pooled.driver
+            healthy = True
+        finally:
+            self.checkin(pooled, healthy)
+
+    def checkout(self) -> PooledDriver:
+        if self._closed:
+            raise RuntimeError("Chrome driver pool has been closed")
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError(f"No Chrome driver became available within {self.timeout}s")
+        try:
+            # prefer the most recently used (warm) browser, replacing any that died while idle
+            while True:
+                try:
+                    pooled = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._start_driver()
+                if self._is_healthy(pooled):
+                    return pooled
+                self._quit_driver(pooled)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def checkin(self, pooled: PooledDriver, healthy: bool = True) -> None:
+        try:
+            pooled.renders += 1
+            if self._closed or not healthy or pooled.renders >= self.max_renders:
+                self._quit_driver(pooled)
+            else:
+                self._idle.put(pooled)
+        finally:
+            self._slots.release()
+
+    def close(self) -> None:
+        self._closed = True
+        with self._lock:
+            live = list(self._live)
+        for pooled in live:
+            self._quit_driver(pooled)
+
+    def live_count(self) -> int:
+        with self._lock:
+            return len(self._live)
+
+    # HELPERS
+
+    def _start_driver(self) -> PooledDriver:
+        # selenium is only needed once a browser render actually happens
+        from selenium import webdriver
+        from selenium.webdriver.chrome.service import Service
+
+        chrome_options = webdriver.ChromeOptions()
+        chrome_options.add_argument("--disable-dev-shm-usage")
+        chrome_options.add_argument("--no-sandbox")
+        chrome_options.add_argument('--headless')
+
+        service = Service(executable_path=os.environ.get('CHROMEDRIVER_PATH', '/usr/bin/chromedriver'))
+        pooled = PooledDriver(webdriver.Chrome(service=service, options=chrome_options))
+        with self._lock:
+            self._live.append(pooled)
+        return pooled
+
+    def _quit_driver(self, pooled: PooledDriver) -> None:
+        with self._lock:
+            if pooled in self._live:
+                self._live.remove(pooled)
+        try:
+            pooled.driver.quit()
+        except Exception as e:
+            print(f"Caught exception while closing Chrome: {e}")
+
+    def _is_healthy(self, pooled: PooledDriver) -> bool:
+        try:
+            pooled.driver.execute_script('return 1')
+            return True
+        except Exception:
+            return False
@@ -0,0 +1,92 @@
+import asyncio, os
+from games.base_command_handler import BaseCommandHandler
+
+class QueuedSubmission():
+    def __init__(self, handler: BaseCommandHandler, guild_id: int, user_id: str, title: str, grid: str, future: asyncio.Future) -> None:
+        self.handler: BaseCommandHandler = handler
+        self.guild_id: int = guild_id
+        self.user_id: str = user_id
+        self.title: str = title
+        self.grid: str = grid
+        self.future: asyncio.Future = future
+
+class IngestionQueue():
+    # pasted results are written by a few workers instead of inside on_message, and whatever is
+    # waiting when a worker comes round is committed to each game's database in one transaction,
+    # whichever guilds it came from
+    def __init__(self, max_size: int = None, workers: int = None, batch_size: int = None) -> None:
+        self.max_size: int = max_size or int(os.environ.get('INGESTION_QUEUE_SIZE', 1000))
+        self.workers: int = workers or int(os.environ.get('INGESTION_WORKERS', 2))
+        self.batch_size: int = batch_size or int(os.environ.get('INGESTION_BATCH_SIZE', 100))
+        self._queue: asyncio.Queue[QueuedSubmission] = None
+        self._tasks: list[asyncio.Task] = []
+        self._closing: bool = False
+
+    async def submit(self, handler: BaseCommandHandler, guild_id: int, user_id: str, title: str, grid: str) -> bool:
+        # resolves once the submission has been committed: whether it was a valid entry
+        if self._closing:
+            raise RuntimeError("ingestion queue is shutting down")
+        if self._queue is None:
+            self.start()
+        future = asyncio.get_running_loop().create_future()
+        # waits for room rather than dropping anything when the queue is full
+        await self._queue.put(QueuedSubmission(handler, guild_id, user_id, title, grid, future))
+        return await future
+
+    def start(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue(self.max_size)
+            self._tasks = [asyncio.create_task(self.__work()) for _ in range(self.workers)]
+
+    def get_depth(self) -> int:
+        return 0 if self._queue is None else self._queue.qsize()
+
+    async def close(self) -> None:
+        # stops taking submissions and waits for everything already queued to be written
+        self._closing = True
+        if self._queue is None:
+            return
+        await self._queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        # a submitter that was waiting for room can still have put its item in after the join
+        remaining = []
+        while not self._queue.empty():
+            remaining.append(self._queue.get_nowait())
+        if len(remaining) > 0:
+            await self.__write(remaining)
+        self._queue, self._tasks = None, []
+
+    ####################
+    #     WORKERS      #
+    ####################
+
+    async def __work(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await self.__write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def __write(self, batch: list[QueuedSubmission]) -> None:
+        by_handler: dict[BaseCommandHandler, list[QueuedSubmission]] = {}
+        for item in batch:
+            by_handler.setdefault(item.handler, []).append(item)
+
+        for handler, items in by_handler.items():
+            try:
+                results = await handler.add_submissions([(item.guild_id, item.user_id, item.title, item.grid) for item in items])
+            except Exception as e:
+                # the submitters report it
+                for item in items:
+                    if not item.future.done():
+                        item.future.set_exception(e)
+                continue
+            for item, result in zip(items, results):
+                if not item.future.done():
+                    item.future.set_result(result)
@@ -0,0 +1,172 @@
+import asyncio, bisect, math, os, time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Callable, Iterator
+
+if TYPE_CHECKING:
+    from aiohttp import web
+
+# seconds; covers a cached ?missing up to a cold all-time leaderboard render
+DEFAULT_BUCKETS: list[float] = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+LAG_BUCKETS: list[float] = [0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0]
+
+class Histogram():
+    def __init__(self, buckets: list[float]) -> None:
+        self.buckets: list[float] = buckets
+        self.counts: list[int] = [0] * len(buckets)
+        self.count: int = 0
+        self.sum: float = 0.0
+
+    def observe(self, value: float) -> None:
+        # values above the last bound only show up in the +Inf bucket
+        i = bisect.bisect_left(self.buckets, value)
+        if i < len(self.buckets):
+            self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+
+class Metrics():
+    # counters, histograms and scrape-time collectors, served in the Prometheus text format.
+    # only ever updated from the event loop, so nothing here needs a lock
+    DESCRIPTIONS: dict[str, tuple[str, str]] = {
+        'nyt_messages_classified_total': ('counter', "Guild messages checked for a pasted result, by the game it was for (none for chat)."),
+        'nyt_messages_ingested_total': ('counter', "Pasted results written, by game and whether they were a valid entry."),
+        'nyt_ingestion_duration_seconds': ('histogram', "Time from a result being queued to its entry being committed."),
+        'nyt_command_duration_seconds': ('histogram', "Command latency from dispatch to the last reply."),
+        'nyt_sql_query_duration_seconds': ('histogram', "Database round trips (queries and transactions) by game; _count is the query count."),
+        'nyt_render_duration_seconds': ('histogram', "Image rendering time by backend."),
+        'nyt_event_loop_lag_seconds': ('histogram', "Delay between a timer's deadline and the event loop running it."),
+    }
+
+    def __init__(self) -> None:
+        self._descriptions: dict[str, tuple[str, str]] = dict(self.DESCRIPTIONS)
+        self._counters: dict[str, dict[tuple, float]] = {}
+        self._histograms: dict[str, dict[tuple, Histogram]] = {}
+        self._buckets: dict[str, list[float]] = {'nyt_event_loop_lag_seconds': LAG_BUCKETS}
+        # name -> callback returning (labels, value) samples
+        self._collectors: dict[str, Callable[[], list[tuple[dict[str, str], float]]]] = {}
+        self._runner: 'web.AppRunner' = None
+        self._lag_task: asyncio.Task = None
+
+    ####################
+    #    RECORDING     #
+    ####################
+
+    def describe(self, name: str, kind: str, help_text: str, buckets: list[float] = None) -> None:
+        self._descriptions[name] = (kind, help_text)
+        if kind == 'histogram':
+            self._buckets[name] = buckets or DEFAULT_BUCKETS
+
+    def inc(self, name: str, amount: float = 1, **labels: str) -> None:
+        series = self._counters.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        series[key] = series.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        series = self._histograms.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram(self._buckets.get(name, DEFAULT_BUCKETS))
+        histogram.observe(value)
+
+    @contextmanager
+    def time(self, name: str, **labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def add_collector(self, name: str, kind: str, help_text: str, collect: Callable[[], list[tuple[dict[str, str], float]]]) -> None:
+        # for values something else already keeps (pool sizes, cache counters), read on every scrape
+        self.describe(name, kind, help_text)
+        self._collectors[name] = collect
+
+    ####################
+    #    EXPOSITION    #
+    ####################
+
+    def render(self) -> str:
+        lines = []
+        for name in sorted(set(self._descriptions) | set(self._counters) | set(self._histograms)):
+            kind, help_text = self._descriptions.get(name, ('untyped', ''))
+            samples = self.__get_samples(name, kind)
+            if samples is None:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines += samples
+        return '\n'.join(lines) + '\n'
+
+    def __get_samples(self, name: str, kind: str) -> list[str]:
+        if name in self._collectors:
+            try:
+                return [f"{name}{self.__format_labels(labels.items())} {self.__format_value(value)}" for labels, value in self._collectors[name]()]
+            except Exception as e:
+                print(f"Failed to collect metric '{name}': {e}")
+                return None
+        if name in self._histograms:
+            samples = []
+            for key, histogram in self._histograms[name].items():
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    samples.append(f"{name}_bucket{self.__format_labels(key + (('le', self.__format_value(bound)),))} {cumulative}")
+                samples.append(f"{name}_bucket{self.__format_labels(key + (('le', '+Inf'),))} {histogram.count}")
+                samples.append(f"{name}_sum{self.__format_labels(key)} {self.__format_value(histogram.sum)}")
+                samples.append(f"{name}_count{self.__format_labels(key)} {histogram.count}")
+            return samples
+        if name in self._counters:
+            return [f"{name}{self.__format_labels(key)} {self.__format_value(value)}" for key, value in self._counters[name].items()]
+        # described but nothing recorded yet
+        return None
+
+    def __format_labels(self, labels) -> str:
+        pairs = []
+        for key, value in labels:
+            escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+            pairs.append(f'{key}="{escaped}"')
+        return f"{{{','.join(pairs)}}}" if len(pairs) > 0 else ''
+
+    def __format_value(self, value: float) -> str:
+        if math.isinf(value):
+            return '+Inf' if value > 0 else '-Inf'
+        return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+    ####################
+    #      SERVER      #
+    ####################
+
+    async def start_server(self, host: str = None, port: int = None) -> None:
+        # only started when METRICS_PORT is set; aiohttp is already installed for discord.py
+        from aiohttp import web
+
+        port = port or int(os.environ.get('METRICS_PORT', 0))
+        if port == 0 or self._runner is not None:
+            return
+
+        async def get_metrics(request: web.Request) -> web.Response:
+            return web.Response(text=self.render(), content_type='text/plain', charset='utf-8', headers={'X-Content-Type-Options': 'nosniff'})
+
+        app = web.Application()
+        app.router.add_get('/metrics', get_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host or os.environ.get('METRICS_HOST', '127.0.0.1'), port).start()
+        self._lag_task = asyncio.create_task(self.__monitor_event_loop(float(os.environ.get('METRICS_LAG_INTERVAL', 1.0))))
+
+    async def stop_server(self) -> None:
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+            self._lag_task = None
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __monitor_event_loop(self, interval: float) -> None:
+        # how late a sleep wakes up is how long every other coroutine was kept waiting
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(interval)
+            self.observe('nyt_event_loop_lag_seconds', max(0.0, loop.time() - start - interval))
@@ -0,0 +1,49 @@
+import discord
+
+class NicknameIndex():
+    # guild display names by member id, kept current by the member events instead of scanning guild.members
+    FETCH_BATCH_SIZE: int = 100
+
+    def __init__(self) -> None:
+        self._names: dict[int, str] = {}
+        # ids a member fetch didn't find (e.g. players who left), so they aren't fetched on every lookup
+        self._unknown: set[int] = set()
+        self.loaded: bool = False
+
+    # LOOKUPS
+
+    def get(self, user_id: int) -> str:
+        return self._names.get(user_id)
+
+    def get_missing(self, user_ids: list[int]) -> list[int]:
+        return [user_id for user_id in dict.fromkeys(user_ids) if user_id not in self._names and user_id not in self._unknown]
+
+    # UPDATES
+
+    def load(self, members: list[discord.Member]) -> None:
+        self._names = {member.id: member.display_name for member in members}
+        self._unknown.clear()
+        self.loaded = True
+
+    def set(self, member: discord.Member) -> bool:
+        # returns whether the member's name changed
+        self._unknown.discard(member.id)
+        previous = self._names.get(member.id)
+        self._names[member.id] = member.display_name
+        return previous != member.display_name
+
+    def remove(self, user_id: int) -> None:
+        self._names.pop(user_id, None)
+
+    async def fetch(self, guild: discord.Guild, user_ids: list[int]) -> list[discord.Member]:
+        # members the gateway hasn't sent yet, in as few requests as it allows
+        fetched = []
+        missing = self.get_missing(user_ids)
+        for i in range(0, len(missing), self.FETCH_BATCH_SIZE):
+            batch = missing[i:i + self.FETCH_BATCH_SIZE]
+            members = await guild.query_members(user_ids=batch, limit=len(batch), cache=True)
+            for member in members:
+                self.set(member)
+            self._unknown.update(set(batch) - set([member.id for member in members]))
+            fetched += members
+        return fetched
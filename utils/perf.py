@@ -0,0 +1,114 @@
+import contextvars, os, time
+from collections import deque
+from contextlib import contextmanager
+from typing import Iterator
+from discord.ext import commands
+from utils.metrics import Metrics
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+class Invocation():
+    def __init__(self, command: str, game: str) -> None:
+        self.command: str = command
+        self.game: str = game
+        self.start: float = time.perf_counter()
+        self.total_ms: float = 0.0
+        # milliseconds spent in each stage; stages can overlap when work is gathered
+        self.stages: dict[str, float] = {}
+        self.queries: int = 0
+
+    def add(self, stage: str, elapsed_ms: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + elapsed_ms
+
+class PerfRecorder():
+    # per-command timings, kept for the last HISTORY_SIZE invocations of each command
+    HISTORY_SIZE: int = 1000
+    STAGES: list[str] = ['sql', 'nicknames', 'render', 'chart', 'discord']
+
+    def __init__(self, metrics: Metrics = None, history_size: int = None) -> None:
+        self.history_size: int = history_size or self.HISTORY_SIZE
+        self._metrics: Metrics = metrics
+        # commands declare extras={'query_budget': n}; in test mode going over it raises instead of warning
+        self.assert_query_budgets: bool = os.environ.get('QUERY_BUDGET_ASSERT', "false").lower() in ['1', 'true', 'yes']
+        self.started: float = time.time()
+        self._history: dict[str, deque[Invocation]] = {}
+        self._counts: dict[str, int] = {}
+        # the invocation whose task is running; DB queries and renders are charged to it
+        self._current: contextvars.ContextVar[Invocation] = contextvars.ContextVar('perf_invocation', default=None)
+
+    ####################
+    #    RECORDING     #
+    ####################
+
+    def start(self, ctx: commands.Context, game: str = None) -> None:
+        # called from a cog's before-invoke hook, which runs in the command's own task
+        invocation = Invocation(ctx.command.qualified_name if ctx.command is not None else '?', game)
+        self._current.set(invocation)
+        # Context.reply goes through send, so this times every message and upload the command makes
+        send = ctx.send
+
+        async def timed_send(*args, **kwargs):
+            with self.stage('discord'):
+                return await send(*args, **kwargs)
+
+        ctx.send = timed_send
+        ctx.perf_invocation = invocation
+
+    def finish(self, ctx: commands.Context) -> None:
+        invocation: Invocation = getattr(ctx, 'perf_invocation', None)
+        if invocation is None:
+            return
+        invocation.total_ms = (time.perf_counter() - invocation.start) * 1000
+        self._current.set(None)
+        self._history.setdefault(invocation.command, deque(maxlen=self.history_size)).append(invocation)
+        self._counts[invocation.command] = self._counts.get(invocation.command, 0) + 1
+        if self._metrics is not None:
+            self._metrics.observe('nyt_command_duration_seconds', invocation.total_ms / 1000, command=invocation.command, game=invocation.game or 'unknown')
+        budget = ctx.command.extras.get('query_budget') if ctx.command is not None else None
+        if budget is not None and invocation.queries > budget:
+            message = f"?{invocation.command} ran {invocation.queries} queries, over its budget of {budget}"
+            if self.assert_query_budgets:
+                raise QueryBudgetExceeded(message)
+            print(f"Warning: {message}")
+
+    @contextmanager
+    def stage(self, name: str, query: bool = False) -> Iterator[None]:
+        invocation = self._current.get()
+        if invocation is None:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            invocation.add(name, (time.perf_counter() - start) * 1000)
+            if query:
+                invocation.queries += 1
+
+    ####################
+    #    REPORTING     #
+    ####################
+
+    def get_commands(self) -> list[str]:
+        return sorted(self._history)
+
+    def get_count(self, command: str) -> int:
+        return self._counts.get(command, 0)
+
+    def get_percentiles(self, command: str, percentiles: list[float] = [50, 95, 99]) -> dict[str, list[float]]:
+        # per-stage percentiles in ms (plus 'total', 'other' and the query count) over the kept invocations;
+        # 'other' is the time outside every stage: parsing, stats and table building
+        invocations = list(self._history.get(command, []))
+        if len(invocations) == 0:
+            return {}
+        samples = {'total': [invocation.total_ms for invocation in invocations]}
+        for stage in self.STAGES:
+            samples[stage] = [invocation.stages.get(stage, 0.0) for invocation in invocations]
+        samples['other'] = [max(0.0, invocation.total_ms - sum(invocation.stages.values())) for invocation in invocations]
+        samples['queries'] = [float(invocation.queries) for invocation in invocations]
+        return {name: [self.__percentile(values, p) for p in percentiles] for name, values in samples.items()}
+
+    def __percentile(self, values: list[float], p: float) -> float:
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
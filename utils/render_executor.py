@@ -0,0 +1,136 @@
+import asyncio, io, multiprocessing, os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, TypeVar
+from PIL import Image
+
+T = TypeVar('T')
+
+class BarChartSpec():
+    def __init__(self, x: str, y: str, hue: str, width: float, height: float, font_size: int = 20, label_size: int = 15) -> None:
+        self.x: str = x
+        self.y: str = y
+        self.hue: str = hue
+        self.width: float = width
+        self.height: float = height
+        self.font_size: int = font_size
+        self.label_size: int = label_size
+
+class RenderExecutor():
+    def __init__(self, max_workers: int = None) -> None:
+        self.max_workers: int = max_workers or int(os.environ.get('RENDER_WORKERS', 2))
+        self._executor: ProcessPoolExecutor = None
+
+    async def submit(self, func: Callable[..., T], *args) -> T:
+        if self._executor is None:
+            self.start()
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def start(self) -> None:
+        if self._executor is None:
+            # forkserver children never inherit the bot's threads (gateway, DB pool) mid-lock
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('forkserver'),
+                initializer=_init_worker
+            )
+
+    async def warm_up(self) -> None:
+        await asyncio.gather(*[self.submit(_ping) for _ in range(self.max_workers)])
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+####################
+#   WORKER SETUP   #
+####################
+
+def _init_worker() -> None:
+    # import the plotting stack once per worker instead of once per chart
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot
+    import seaborn
+
+def _ping() -> bool:
+    return True
+
+####################
+#   RENDER JOBS    #
+####################
+
+_table_renderer = None
+
+def render_table(df) -> bytes:
+    global _table_renderer
+    if _table_renderer is None:
+        from utils.table_renderers import get_table_renderer
+        _table_renderer = get_table_renderer(None)
+    return image_to_png(_table_renderer.render(df))
+
+def render_bar_chart(df, spec: BarChartSpec) -> bytes:
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    plt.rcParams.update({'font.size': spec.font_size})
+    g = sns.catplot(x=spec.x, y=spec.y, hue=spec.hue, data=df, kind='bar')
+    for ax in g.axes.ravel():
+        for c in ax.containers:
+            labels = ['%d' % v.get_height() for v in c]
+            ax.bar_label(c, labels=labels, label_type='edge', fontsize=spec.label_size)
+    fig = g.figure
+    fig.subplots_adjust(bottom=0.2)
+    fig.set_size_inches(spec.width, spec.height)
+    try:
+        return image_to_png(fig_to_image(fig))
+    finally:
+        plt.close(fig)
+
+def stack_images(top_png: bytes, bottom_png: bytes) -> bytes:
+    top = Image.open(io.BytesIO(top_png))
+    bottom = resize_image(Image.open(io.BytesIO(bottom_png)), width=top.size[0])
+    if bottom is None:
+        return top_png
+    return image_to_png(combine_images(top, bottom))
+
+####################
+#  IMAGE HELPERS   #
+####################
+
+def fig_to_image(fig) -> Image.Image:
+    buf = io.BytesIO()
+    fig.savefig(buf)
+    buf.seek(0)
+    img = Image.open(buf)
+    return img
+
+def image_to_png(img: Image.Image) -> bytes:
+    buf = io.BytesIO()
+    img.save(buf, 'PNG')
+    return buf.getvalue()
+
+def combine_images(img1: Image.Image, img2: Image.Image) -> Image.Image:
+    widths, heights = zip(*(i.size for i in [img1, img2]))
+    w = max(widths)
+    h = sum(heights)
+    combo = Image.new('RGBA', (w, h))
+    combo.paste(img1, (0, 0))
+    combo.paste(img2, (0, img1.size[1]))
+    return combo
+
+def resize_image(image: Image.Image, width: int = None, height: int = None) -> Image.Image:
+    w, h = image.size
+    if width is None and height is None:
+        return image
+    if width is None:
+        r = height / float(h)
+        dim = (int(w * r), height)
+    else:
+        r = width / float(w)
+        dim = (width, int(h * r))
+    try:
+        return image.resize(dim)
+    except Exception as e:
+        print('Caught exception: ' + str(e))
+        return None
@@ -0,0 +1,196 @@
+import os, re
+from PIL import Image, ImageDraw, ImageFont
+from typing import Protocol
+from utils.driver_pool import ChromeDriverPool
+
+class TableRenderer(Protocol):
+    # backend name reported in the render metrics
+    name: str
+    # whether the output still has browser whitespace that needs trimming
+    trim_whitespace: bool
+    # whether it can run in a render worker process (no shared browser pool)
+    process_safe: bool
+    # heavy modules render() imports on first use, which the bot preloads once it is ready
+    lazy_imports: list[str]
+
+    def render(self, df) -> Image.Image:
+        pass
+
+class BokehTableRenderer(TableRenderer):
+    def __init__(self, driver_pool: ChromeDriverPool) -> None:
+        self.name = 'bokeh'
+        self.trim_whitespace = True
+        self.process_safe = False
+        self.lazy_imports = ['bokeh.io.export', 'bokeh.models', 'selenium.webdriver']
+        self.driver_pool: ChromeDriverPool = driver_pool
+
+    def render(self, df) -> Image.Image:
+        from bokeh.io.export import get_screenshot_as_png
+        from bokeh.models import ColumnDataSource, DataTable, TableColumn
+
+        source = ColumnDataSource(df)
+
+        df_columns = df.columns.values
+        columns_for_table=[]
+        for column in df_columns:
+            columns_for_table.append(TableColumn(field=column, title=column))
+
+        data_table = DataTable(source=source, columns=columns_for_table, index_position=None, reorderable=False, autosize_mode="fit_columns")
+
+        with self.driver_pool.driver() as driver:
+            return get_screenshot_as_png(data_table, driver=driver)
+
+class PillowTableRenderer(TableRenderer):
+    # layout (pixels)
+    FONT_SIZE: int = 13
+    ROW_HEIGHT: int = 25
+    CELL_PADDING: int = 6
+    MARGIN: int = 3
+
+    # colors, chosen to match the bokeh DataTable screenshots
+    BACKGROUND: tuple = (255, 255, 255)
+    HEADER_BACKGROUND: tuple = (240, 240, 240)
+    GRID_COLOR: tuple = (210, 210, 210)
+    TEXT_COLOR: tuple = (0, 0, 0)
+
+    # fallback glyphs for the emojis the bot uses, for hosts without a color emoji font
+    EMOJI_SHAPES: dict[str, tuple[str, tuple]] = {
+        '🟩': ('square', (106, 170, 100)),
+        '🟨': ('square', (201, 180, 88)),
+        '⬜': ('square', (211, 214, 218)),
+        '⬛': ('square', (120, 124, 126)),
+        '🟦': ('square', (176, 196, 239)),
+        '🟪': ('square', (186, 129, 197)),
+        '🔵': ('circle', (85, 172, 238)),
+        '🟡': ('circle', (253, 203, 88)),
+        '💡': ('circle', (255, 221, 103)),
+        '🧩': ('square', (59, 136, 195)),
+        '🚫': ('forbidden', (221, 46, 68)),
+    }
+    EMOJI_PATTERN = re.compile('([\U0001F000-\U0001FAFF\u2600-\u27BF\u2B00-\u2BFF])[\uFE0F\u200D]?')
+
+    def __init__(self, font_path: str = None, bold_font_path: str = None, emoji_font_path: str = None) -> None:
+        self.name = 'pillow'
+        self.trim_whitespace = False
+        self.process_safe = True
+        self.lazy_imports = []
+        self.font: ImageFont.FreeTypeFont = self._load_font(font_path or os.environ.get('TABLE_FONT', 'DejaVuSans.ttf'))
+        self.bold_font: ImageFont.FreeTypeFont = self._load_font(bold_font_path or os.environ.get('TABLE_BOLD_FONT', 'DejaVuSans-Bold.ttf'))
+        self.emoji_font: ImageFont.FreeTypeFont = self._load_emoji_font(emoji_font_path or os.environ.get('TABLE_EMOJI_FONT', 'NotoColorEmoji.ttf'))
+        self._emoji_cache: dict[str, Image.Image] = {}
+
+    def render(self, df) -> Image.Image:
+        headers = [str(column) for column in df.columns.values]
+        rows = [[str(value) for value in row] for row in df.itertuples(index=False, name=None)]
+
+        col_widths = []
+        for i, header in enumerate(headers):
+            cell_widths = [self._text_width(row[i], self.font) for row in rows]
+            col_widths.append(max([self._text_width(header, self.bold_font)] + cell_widths) + 2 * self.CELL_PADDING)
+
+        width = sum(col_widths) + 2 * self.MARGIN
+        height = (len(rows) + 1) * self.ROW_HEIGHT + 2 * self.MARGIN
+        image = Image.new('RGB', (width, height), self.BACKGROUND)
+        draw = ImageDraw.Draw(image)
+
+        table_right = width - self.MARGIN - 1
+        draw.rectangle([self.MARGIN, self.MARGIN, table_right, self.MARGIN + self.ROW_HEIGHT], fill=self.HEADER_BACKGROUND)
+        for row_index, row in enumerate([headers] + rows):
+            top = self.MARGIN + row_index * self.ROW_HEIGHT
+            font = self.bold_font if row_index == 0 else self.font
+            x = self.MARGIN
+            for col_index, cell in enumerate(row):
+                self._draw_text(image, draw, (x + self.CELL_PADDING, top), cell, font)
+                x += col_widths[col_index]
+            draw.line([self.MARGIN, top + self.ROW_HEIGHT, table_right, top + self.ROW_HEIGHT], fill=self.GRID_COLOR)
+
+        x = self.MARGIN
+        for col_width in col_widths[:-1]:
+            x += col_width
+            draw.line([x, self.MARGIN, x, self.MARGIN + self.ROW_HEIGHT], fill=self.GRID_COLOR)
+        draw.rectangle([self.MARGIN, self.MARGIN, table_right, height - self.MARGIN - 1], outline=self.GRID_COLOR)
+        return image
+
+    # TEXT
+
+    def _split_emojis(self, text: str) -> list[tuple[str, bool]]:
+        parts = []
+        last = 0
+        for match in self.EMOJI_PATTERN.finditer(text):
+            if match.start() > last:
+                parts.append((text[last:match.start()], False))
+            parts.append((match.group(1), True))
+            last = match.end()
+        if last < len(text):
+            parts.append((text[last:], False))
+        return parts
+
+    def _emoji_size(self) -> int:
+        return self.FONT_SIZE + 3
+
+    def _text_width(self, text: str, font: ImageFont.FreeTypeFont) -> int:
+        width = 0
+        for part, is_emoji in self._split_emojis(text):
+            width += self._emoji_size() + 1 if is_emoji else font.getlength(part)
+        return int(width) + 1
+
+    def _draw_text(self, image: Image.Image, draw: ImageDraw.ImageDraw, xy: tuple[int, int], text: str, font: ImageFont.FreeTypeFont) -> None:
+        x, top = xy
+        middle = top + self.ROW_HEIGHT // 2
+        for part, is_emoji in self._split_emojis(text):
+            if is_emoji:
+                size = self._emoji_size()
+                self._draw_emoji(image, draw, (int(x), middle - size // 2), part, size)
+                x += size + 1
+            else:
+                draw.text((x, middle), part, font=font, fill=self.TEXT_COLOR, anchor='lm')
+                x += font.getlength(part)
+
+    def _draw_emoji(self, image: Image.Image, draw: ImageDraw.ImageDraw, xy: tuple[int, int], emoji: str, size: int) -> None:
+        glyph = self._get_emoji_glyph(emoji, size)
+        if glyph is not None:
+            image.paste(glyph, xy, glyph)
+            return
+
+        x, y = xy
+        box = [x + 1, y + 1, x + size - 2, y + size - 2]
+        shape, color = self.EMOJI_SHAPES.get(emoji, ('square', self.GRID_COLOR))
+        if shape == 'square':
+            draw.rounded_rectangle(box, radius=2, fill=color)
+        elif shape == 'circle':
+            draw.ellipse(box, fill=color)
+        elif shape == 'forbidden':
+            draw.ellipse(box, outline=color, width=2)
+            draw.line([box[0] + 3, box[1] + 3, box[2] - 3, box[3] - 3], fill=color, width=2)
+
+    def _get_emoji_glyph(self, emoji: str, size: int) -> Image.Image:
+        if self.emoji_font is None:
+            return None
+        if emoji not in self._emoji_cache:
+            # color emoji fonts only ship bitmaps at a fixed size, so draw big and scale down
+            glyph = Image.new('RGBA', (136, 128), (0, 0, 0, 0))
+            ImageDraw.Draw(glyph).text((0, 0), emoji, font=self.emoji_font, embedded_color=True)
+            bbox = glyph.getbbox()
+            self._emoji_cache[emoji] = glyph.crop(bbox).resize((size, size)) if bbox else None
+        return self._emoji_cache[emoji]
+
+    # FONTS
+
+    def _load_font(self, path: str) -> ImageFont.FreeTypeFont:
+        try:
+            return ImageFont.truetype(path, self.FONT_SIZE)
+        except OSError:
+            return ImageFont.load_default(size=self.FONT_SIZE)
+
+    def _load_emoji_font(self, path: str) -> ImageFont.FreeTypeFont:
+        try:
+            return ImageFont.truetype(path, 109)
+        except OSError:
+            return None
+
+def get_table_renderer(driver_pool: ChromeDriverPool) -> TableRenderer:
+    match os.environ.get('TABLE_RENDERER', 'bokeh').lower():
+        case 'pillow':
+            return PillowTableRenderer()
+        case _:
+            return BokehTableRenderer(driver_pool)